@@ -3,14 +3,36 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import warnings
 import time
 import json
 import random
+import re
+import os
+import csv
+import hashlib
+import itertools
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import pickle
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:  # The columnar dataset cache is disabled without pyarrow
+    pa = None
+    warnings.warn("pyarrow is not installed: the dataset cache is disabled and sentiment tokenizing runs in Python")
+
 warnings.filterwarnings('ignore')
 
 # Enhanced Configuration System
@@ -18,6 +40,76 @@ class HealthConfig:
     APP_TITLE = "AGENTIC AI FOR HOSPITAL QUALITY SYSTEM"
     APP_VERSION = "10.1.0"
     
+    # Knowledge ingestion: documents are chunked into a persisted BM25 index
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    KNOWLEDGE_DOCS_DIR = os.environ.get("KNOWLEDGE_DOCS_DIR", os.path.join(BASE_DIR, "data", "knowledge"))
+    KNOWLEDGE_INDEX_DIR = os.environ.get("KNOWLEDGE_INDEX_DIR", os.path.join(BASE_DIR, ".cache", "knowledge_index"))
+    
+    # Shared LRU caches for multimodal analysis results, serialized figures and aggregate
+    # structures (time series store, department and OLAP cubes), each bounded by count and size
+    ANALYSIS_CACHE_SIZE = 32
+    ANALYSIS_CACHE_MAX_BYTES = 64 * 1024 ** 2
+    FIGURE_CACHE_SIZE = 32
+    FIGURE_CACHE_MAX_BYTES = 64 * 1024 ** 2
+    AGGREGATE_CACHE_SIZE = 24
+    AGGREGATE_CACHE_MAX_BYTES = 256 * 1024 ** 2
+    
+    # Point budgets for charts: WebGL above the first, a stratified sample above the second,
+    # server-side 2D binning above the third; line charts are reduced with LTTB
+    SCATTER_WEBGL_POINTS = 5_000
+    SCATTER_POINT_BUDGET = 50_000
+    SCATTER_DENSITY_POINTS = 1_000_000
+    DENSITY_BINS = 200
+    LINE_POINT_BUDGET = 5_000
+    
+    # OLAP cube: candidate slicing dimensions, skipped when too many members or cells
+    OLAP_DIMENSIONS = ['Department', 'Insurance_Type', 'Gender', 'WHO_Compliance', 'KEMKES_Rating']
+    OLAP_MAX_MEMBERS = 64
+    OLAP_MAX_CELLS = 1_000_000
+    
+    # Time series charts pick the finest rollup (daily/weekly/monthly) with at most this many buckets
+    TIME_SERIES_AUTO_POINTS = 200
+    
+    # Scenario runs above this many draws stream through sketches instead of holding samples;
+    # worker processes are capped so one session cannot occupy every core of a shared server
+    MC_STREAMING_THRESHOLD = 2_000_000
+    MC_WORKER_LIMIT = int(os.environ.get("MC_WORKER_LIMIT", 4))
+    MC_MAX_WORKERS = max(1, min(os.cpu_count() or 1, MC_WORKER_LIMIT))
+    
+    # Out-of-core analysis: large CSVs are streamed in row chunks instead of loaded whole
+    DATASETS_DIR = os.environ.get("HEALTH_DATASETS_DIR", os.path.join(BASE_DIR, "data", "datasets"))
+    CSV_CHUNK_ROWS = 250_000
+    STREAMING_UPLOAD_BYTES = 50 * 1024 * 1024
+    STREAMING_PREVIEW_ROWS = 1000
+    
+    # Uploads are converted once into memory-mapped Feather files keyed by content hash
+    DATASET_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "datasets"))
+    DATASET_CACHE_MAX_BYTES = 5 * 1024 ** 3
+    DATASET_MEMORY_ENTRIES = 8
+    
+    # Patient feedback sentiment lexicon: whole-word valences on a -4..4 scale, two-word phrases,
+    # negators (plus any "n't" contraction) and intensity modifiers
+    SENTIMENT_LEXICON = {
+        'excellent': 3.2, 'outstanding': 3.3, 'great': 3.1, 'good': 1.9, 'satisfied': 1.8,
+        'professional': 1.5, 'professionally': 1.5, 'caring': 2.0, 'helpful': 1.8, 'clean': 1.7,
+        'comfortable': 1.8, 'impressed': 2.1, 'responsive': 1.5, 'attentive': 1.7, 'thorough': 1.3,
+        'effective': 1.6, 'efficient': 1.6, 'safe': 1.5, 'friendly': 2.2, 'kind': 2.0,
+        'bad': -2.5, 'poor': -2.1, 'terrible': -3.1, 'awful': -3.0, 'worst': -3.1, 'slow': -1.3,
+        'problem': -1.7, 'problems': -1.7, 'disappointed': -2.2, 'frustrated': -2.0, 'dirty': -1.9,
+        'rude': -2.2, 'unprofessional': -2.3, 'confusing': -1.3, 'delayed': -1.2, 'painful': -1.8,
+        'ignored': -1.9, 'unsafe': -2.0
+    }
+    SENTIMENT_PHRASES = {'long wait': -1.8, 'well informed': 1.6, 'could be': -0.4}
+    SENTIMENT_NEGATORS = ['not', 'no', 'never', 'none', 'nothing', 'nobody', 'neither', 'nor',
+                          'without', 'hardly', 'cannot', 'cant', 'dont', 'wasnt', 'didnt', 'isnt']
+    SENTIMENT_INTENSIFIERS = {
+        'very': 0.293, 'extremely': 0.293, 'really': 0.293, 'so': 0.293, 'incredibly': 0.293,
+        'highly': 0.293, 'absolutely': 0.293, 'truly': 0.293,
+        'slightly': -0.293, 'somewhat': -0.293, 'barely': -0.293, 'marginally': -0.293
+    }
+    SENTIMENT_MEMO_SIZE = 10_000
+    SENTIMENT_COLORS = {"Positive": "#00ff88", "Negative": "#ff3d71", "Neutral": "#ff6b35", "Unknown": "#666666"}
+    
     # Enhanced Feature Set
     FEATURES = {
         "ai_assistant": "🤖 Intelligent Healthcare AI Assistant",
@@ -66,7 +158,8 @@ class HealthConfig:
             "success": "#00ff88",
             "warning": "#ff6b35",
             "error": "#ff3d71",
-            "info": "#17a2b8"
+            "info": "#17a2b8",
+            "plotly_template": "plotly_dark"
         },
         "Light": {
             "bg_primary": "#ffffff",
@@ -79,7 +172,8 @@ class HealthConfig:
             "success": "#28a745",
             "warning": "#fd7e14",
             "error": "#dc3545",
-            "info": "#17a2b8"
+            "info": "#17a2b8",
+            "plotly_template": "plotly_white"
         },
         "Medical": {
             "bg_primary": "#f0f8ff",
@@ -92,7 +186,8 @@ class HealthConfig:
             "success": "#38a169",
             "warning": "#d69e2e",
             "error": "#e53e3e",
-            "info": "#3182ce"
+            "info": "#3182ce",
+            "plotly_template": "plotly_white"
         }
     }
 
@@ -523,16 +618,1710 @@ def load_enhanced_css(theme_name):
     </style>
     """, unsafe_allow_html=True)
 
+class DocumentIngestor:
+    """Streams hospital documents from disk into retrievable passages.
+    
+    loaders maps extra file suffixes (or overrides built-in ones) to callable(path) ->
+    iterable of (title, lines), e.g. {".pdf": load_pdf_pages}.
+    """
+    
+    def __init__(self, retriever, loaders=None):
+        self.retriever = retriever
+        # Loaders map a file suffix to a generator of (title, lines)
+        self.loaders = {
+            ".md": self._load_text,
+            ".markdown": self._load_text,
+            ".txt": self._load_text,
+            ".csv": self._load_csv
+        }
+        for suffix, loader in (loaders or {}).items():
+            self.register_loader(suffix, loader)
+    
+    def register_loader(self, suffix, loader):
+        """Register a loader callable(path) -> iterable of (title, lines)"""
+        self.loaders[suffix.lower()] = loader
+    
+    def loader_names(self):
+        """Sorted 'suffix=module.loader' entries identifying the registered loaders"""
+        return sorted(
+            f"{suffix}={getattr(loader, '__module__', '')}.{getattr(loader, '__qualname__', type(loader).__name__)}"
+            for suffix, loader in self.loaders.items()
+        )
+    
+    def discover(self, directory):
+        """Sorted supported files under a directory"""
+        if not directory or not os.path.isdir(directory):
+            return []
+        paths = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in self.loaders:
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+    
+    def iter_passages(self, directory):
+        """Yield passage dicts for every supported document, one file at a time"""
+        for path in self.discover(directory):
+            key = os.path.relpath(path, directory)
+            loader = self.loaders[os.path.splitext(path)[1].lower()]
+            for title, lines in loader(path):
+                for text in self.retriever.iter_passages(lines):
+                    yield {"key": key, "title": title, "text": text}
+    
+    @staticmethod
+    def _default_title(path):
+        return os.path.splitext(os.path.basename(path))[0].replace("_", " ").replace("-", " ").title()
+    
+    def _load_text(self, path):
+        """Markdown/plain text: title from the first heading, lines streamed from disk"""
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            first = handle.readline()
+            if first.lstrip().startswith("#"):
+                yield first.strip("# \n") or self._default_title(path), handle
+            else:
+                yield self._default_title(path), self._prepend(first, handle)
+    
+    def _load_csv(self, path):
+        """CSV: each row becomes a 'column: value' paragraph"""
+        with open(path, encoding="utf-8", errors="replace", newline="") as handle:
+            reader = csv.DictReader(handle)
+            yield self._default_title(path), self._csv_lines(reader)
+    
+    @staticmethod
+    def _prepend(first, lines):
+        yield first
+        yield from lines
+    
+    @staticmethod
+    def _csv_lines(reader):
+        for row in reader:
+            for column, value in row.items():
+                if column and value:
+                    yield f"{column}: {value}"
+            yield ""
+
+class KnowledgeRetriever:
+    """BM25 retrieval index over knowledge base passages"""
+    
+    INDEX_FORMAT_VERSION = 2
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+    STOP_WORDS = frozenset([
+        "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+        "how", "i", "in", "is", "it", "of", "on", "or", "our", "should", "that", "the", "this",
+        "to", "using", "we", "what", "when", "which", "why", "with", "you", "your"
+    ])
+    INDEX_ARRAYS = ["postings_ptr", "postings_doc", "postings_weight",
+                    "passage_offsets", "passage_source", "passage_text"]
+    
+    def __init__(self, k1=1.5, b=0.75, max_passage_words=80):
+        self.k1 = k1
+        self.b = b
+        self.max_passage_words = max_passage_words
+        self.vocabulary = {}
+        self.sources = []
+        # Compressed postings: term i owns postings_ptr[i]:postings_ptr[i+1]
+        self.postings_ptr = np.zeros(1, dtype=np.int64)
+        self.postings_doc = np.zeros(0, dtype=np.int32)
+        self.postings_weight = np.zeros(0, dtype=np.float32)
+        # Passage i is passage_text[passage_offsets[i]:passage_offsets[i+1]] (UTF-8)
+        self.passage_offsets = np.zeros(1, dtype=np.int64)
+        self.passage_source = np.zeros(0, dtype=np.int32)
+        self.passage_text = np.zeros(0, dtype=np.uint8)
+    
+    @property
+    def n_passages(self):
+        return len(self.passage_offsets) - 1
+    
+    @staticmethod
+    def stem(token):
+        """Light suffix stripping so inflections share a term (reducing/reduces/reduction -> reduc)"""
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        for suffix in ("ation", "tion", "ing", "ed"):
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                if len(token) > 3 and token[-1] == token[-2] and token[-1] not in "lsz":
+                    token = token[:-1]  # planned -> plan
+                break
+        if len(token) > 4 and token.endswith("e"):
+            token = token[:-1]
+        return token
+    
+    @classmethod
+    def tokenize(cls, text):
+        """Lowercase, lightly stemmed word tokens without stop words"""
+        return [cls.stem(token) for token in cls.TOKEN_PATTERN.findall(text.lower()) if token not in cls.STOP_WORDS]
+    
+    def iter_passages(self, lines):
+        """Group an iterable of lines into passages of roughly max_passage_words"""
+        buffer = []
+        buffer_words = 0
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                # Paragraph boundary - close the passage once it is reasonably sized
+                if buffer_words >= self.max_passage_words // 2:
+                    yield "\n".join(buffer)
+                    buffer, buffer_words = [], 0
+                elif buffer and buffer[-1]:
+                    buffer.append("")
+                continue
+            
+            n_words = len(stripped.split())
+            if buffer and buffer_words + n_words > self.max_passage_words:
+                yield "\n".join(buffer).strip()
+                buffer, buffer_words = [], 0
+            buffer.append(stripped)
+            buffer_words += n_words
+        
+        if buffer:
+            yield "\n".join(buffer).strip()
+    
+    def iter_knowledge_passages(self, knowledge_base):
+        """Passages from the built-in knowledge base entries"""
+        for key, entry in knowledge_base.items():
+            for text in self.iter_passages(entry.get("content", "").splitlines()):
+                yield {"key": key, "title": entry.get("title", key), "text": text}
+    
+    def build(self, knowledge_base):
+        """Chunk knowledge base entries and build the inverted index"""
+        self.build_from_passages(self.iter_knowledge_passages(knowledge_base))
+        return self
+    
+    def build_from_passages(self, passages):
+        """Build BM25 postings with precomputed per-posting impact weights"""
+        vocabulary, source_ids, sources = {}, {}, []
+        term_ids, doc_ids, term_freqs = [], [], []
+        doc_lengths, passage_source, encoded = [], [], []
+        
+        for doc_id, passage in enumerate(passages):
+            source = (passage["key"], passage["title"])
+            if source not in source_ids:
+                source_ids[source] = len(sources)
+                sources.append({"key": source[0], "title": source[1]})
+            passage_source.append(source_ids[source])
+            encoded.append(passage["text"].encode("utf-8"))
+            
+            tokens = self.tokenize(f"{passage['title']} {passage['text']}")
+            doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(count)
+        
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        term_freqs = np.asarray(term_freqs, dtype=np.float64)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        
+        # Group postings by term (stable sort keeps documents ascending)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, doc_ids, term_freqs = term_ids[order], doc_ids[order], term_freqs[order]
+        doc_freqs = np.bincount(term_ids, minlength=len(vocabulary))
+        
+        n_docs = max(len(doc_lengths), 1)
+        avg_length = max(doc_lengths.mean(), 1.0) if len(doc_lengths) else 1.0
+        idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths[doc_ids] / avg_length)
+        weights = idf[term_ids] * term_freqs * (self.k1 + 1) / (term_freqs + length_norm)
+        
+        self.vocabulary = vocabulary
+        self.sources = sources
+        self.postings_ptr = np.concatenate([[0], np.cumsum(doc_freqs)]).astype(np.int64)
+        self.postings_doc = doc_ids
+        self.postings_weight = weights.astype(np.float32)
+        self.passage_offsets = np.concatenate([[0], np.cumsum([len(text) for text in encoded])]).astype(np.int64)
+        self.passage_source = np.asarray(passage_source, dtype=np.int32)
+        self.passage_text = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    
+    def get_passage(self, idx):
+        """Passage dict (key, title, text) for a passage id"""
+        start, end = self.passage_offsets[idx], self.passage_offsets[idx + 1]
+        source = self.sources[self.passage_source[idx]]
+        return {**source, "text": self.passage_text[start:end].tobytes().decode("utf-8")}
+    
+    def search(self, query, top_k=3):
+        """Return the top_k passages ranked by BM25 score"""
+        if not self.n_passages:
+            return []
+        
+        scores = np.zeros(self.n_passages, dtype=np.float32)
+        matched = False
+        for token in set(self.tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.postings_ptr[term_id], self.postings_ptr[term_id + 1]
+            scores[self.postings_doc[start:end]] += self.postings_weight[start:end]
+            matched = True
+        
+        if not matched:
+            return []
+        
+        k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            {**self.get_passage(idx), "score": float(scores[idx])}
+            for idx in candidates if scores[idx] > 0
+        ]
+    
+    def save(self, directory, signature):
+        """Persist the index as .npy arrays plus a JSON manifest"""
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".index-", dir=parent)
+        try:
+            for name in self.INDEX_ARRAYS:
+                np.save(os.path.join(staging, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(staging, "vocabulary.txt"), "w", encoding="utf-8") as handle:
+                handle.write("\n".join(sorted(self.vocabulary, key=self.vocabulary.get)))
+            manifest = {
+                "format_version": self.INDEX_FORMAT_VERSION,
+                "signature": signature,
+                "k1": self.k1,
+                "b": self.b,
+                "max_passage_words": self.max_passage_words,
+                "n_passages": self.n_passages,
+                "sources": self.sources
+            }
+            # Manifest last: an index directory without one is never loaded
+            with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as handle:
+                json.dump(manifest, handle)
+            # Swap by renames so a complete index is on disk at every point except between them
+            retired = None
+            if os.path.isdir(directory):
+                retired = tempfile.mkdtemp(prefix=".index-old-", dir=parent)
+                os.rmdir(retired)
+                os.replace(directory, retired)
+            try:
+                os.replace(staging, directory)
+            except OSError:
+                if retired is not None:
+                    os.replace(retired, directory)
+                raise
+            if retired is not None:
+                shutil.rmtree(retired, ignore_errors=True)
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+    
+    @classmethod
+    def load(cls, directory, signature=None):
+        """Memory-map a saved index; None when missing, incomplete or built from other sources"""
+        try:
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(manifest, dict) or manifest.get("format_version") != cls.INDEX_FORMAT_VERSION:
+            return None
+        if signature is not None and manifest.get("signature") != signature:
+            return None
+        if any(key not in manifest for key in ("k1", "b", "max_passage_words", "sources")):
+            return None  # Incomplete manifest - rebuild rather than fail
+        
+        retriever = cls(manifest["k1"], manifest["b"], manifest["max_passage_words"])
+        try:
+            for name in cls.INDEX_ARRAYS:
+                setattr(retriever, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+            with open(os.path.join(directory, "vocabulary.txt"), encoding="utf-8") as handle:
+                terms = handle.read().split("\n")
+        except (OSError, ValueError):
+            return None
+        retriever.vocabulary = {term: idx for idx, term in enumerate(terms) if term}
+        retriever.sources = manifest["sources"]
+        return retriever
+    
+    @classmethod
+    def load_or_build(cls, knowledge_base, docs_dir=None, index_dir=None, loaders=None):
+        """Load the persisted index if it matches its sources, else rebuild and persist it.
+        
+        loaders registers extra document loaders by suffix (see DocumentIngestor).
+        """
+        retriever = cls()
+        ingestor = DocumentIngestor(retriever, loaders)
+        signature = cls.source_signature(knowledge_base, ingestor.discover(docs_dir), retriever,
+                                         ingestor.loader_names())
+        
+        if index_dir:
+            cached = cls.load(index_dir, signature)
+            if cached is not None:
+                return cached
+        
+        passages = itertools.chain(
+            retriever.iter_knowledge_passages(knowledge_base),
+            ingestor.iter_passages(docs_dir)
+        )
+        retriever.build_from_passages(passages)
+        
+        if index_dir:
+            try:
+                retriever.save(index_dir, signature)
+            except OSError:
+                pass  # Read-only deployments keep the in-memory index
+        return retriever
+    
+    @classmethod
+    def source_signature(cls, knowledge_base, paths, retriever, loader_names=()):
+        """Hash of the built-in knowledge, document stats, registered loaders and index parameters"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(
+            [cls.INDEX_FORMAT_VERSION, retriever.k1, retriever.b, retriever.max_passage_words, knowledge_base,
+             list(loader_names)],
+            sort_keys=True, default=str
+        ).encode("utf-8"))
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and optionally by size"""
+    
+    def __init__(self, max_entries=32, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.total_bytes += size
+            # Evict least recently used entries, always keeping the newest one
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+            ):
+                evicted, _ = self._entries.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(evicted)
+        return value
+    
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing it on a miss"""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.put(key, compute())
+        return value
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+def _column_pieces(values):
+    """One column (or index) as row-order pieces plus dtype-level bytes (e.g. categories).
+    
+    Each piece is (rows, payload) where payload(start, stop) returns the value bytes and the
+    length bytes of those rows, so hashing never depends on how the column is chunked.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        array = np.ascontiguousarray(values.to_numpy())
+        return [(len(array), lambda start, stop: (array[start:stop], b""))], b""
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = np.ascontiguousarray(values.cat.codes.to_numpy())
+        categories = _digest_column(pd.Series(values.cat.categories))[0]
+        return [(len(codes), lambda start, stop: (codes[start:stop], b""))], categories
+    if hasattr(values.array, "__arrow_array__"):
+        arrow = values.array.__arrow_array__()
+        chunks = getattr(arrow, "chunks", [arrow])
+        if len(chunks) > 1 and len(arrow) < 65536 * len(chunks):
+            chunks = [arrow.combine_chunks()]  # Many small chunks (e.g. after concat) - one copy beats per-chunk overhead
+        if all(pa.types.is_string(chunk.type) or pa.types.is_large_string(chunk.type) for chunk in chunks):
+            # Arrow strings: the bytes each row spans plus per-row lengths (-1 for missing)
+            def string_payload(chunk):
+                offset_type = np.int64 if pa.types.is_large_string(chunk.type) else np.int32
+                _, offset_buffer, data_buffer = chunk.buffers()
+                offsets = np.frombuffer(offset_buffer, dtype=offset_type)[chunk.offset:chunk.offset + len(chunk) + 1]
+                valid = chunk.is_valid().to_numpy(zero_copy_only=False) if chunk.null_count else None
+                data = memoryview(data_buffer) if data_buffer is not None else memoryview(b"")
+                
+                def payload(start, stop):
+                    lengths = np.diff(offsets[start:stop + 1])
+                    if valid is not None:
+                        lengths[~valid[start:stop]] = -1
+                    return data[offsets[start]:offsets[stop]], lengths
+                return payload
+            return [(len(chunk), string_payload(chunk)) for chunk in chunks], b""
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    return [(len(hashes), lambda start, stop: (hashes[start:stop], b""))], b""
+
+def _digest_column(values, split=None):
+    """Digest of one column in row order, plus the digest of its first `split` rows from the same pass"""
+    pieces, extra = _column_pieces(values)
+    streams = [hashlib.blake2b(digest_size=16), hashlib.blake2b(digest_size=16)]
+    
+    def finish():
+        digest = hashlib.blake2b(extra, digest_size=16)
+        for stream in streams:
+            digest.update(stream.digest())
+        return digest.digest()
+    
+    def feed(payload, start, stop):
+        for stream, part in zip(streams, payload(start, stop)):
+            stream.update(part.view(np.uint8) if isinstance(part, np.ndarray) else part)
+    
+    prefix, row = None, 0
+    for rows, payload in pieces:
+        if split is not None and prefix is None and row + rows >= split:
+            feed(payload, 0, split - row)
+            prefix = finish()
+            feed(payload, split - row, rows)
+        else:
+            feed(payload, 0, rows)
+        row += rows
+    full = finish()
+    if split is not None and prefix is None:
+        prefix = full  # Empty column
+    return full, prefix
+
+def dataframe_fingerprint(data, prefix_rows=None):
+    """Fast content hash of a DataFrame: values, index, column names and dtypes.
+    
+    With prefix_rows, returns (fingerprint, fingerprint of data.iloc[:prefix_rows]) from one pass.
+    """
+    names, dtypes = list(data.columns), [str(dtype) for dtype in data.dtypes]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((names, dtypes, data.shape)).encode("utf-8"))
+    prefix = None
+    if prefix_rows is not None:
+        prefix = hashlib.blake2b(digest_size=16)
+        prefix.update(repr((names, dtypes, (prefix_rows, data.shape[1]))).encode("utf-8"))
+    
+    if isinstance(data.index, pd.RangeIndex):
+        digest.update(repr((data.index.start, data.index.stop, data.index.step)).encode("utf-8"))
+        if prefix is not None:
+            head = data.index[:prefix_rows]
+            prefix.update(repr((head.start, head.stop, head.step)).encode("utf-8"))
+        parts = []
+    else:
+        parts = [data.index.to_series()]
+    parts.extend(column for _, column in data.items())
+    for values in parts:
+        full, head = _digest_column(values, prefix_rows)
+        digest.update(full)
+        if prefix is not None:
+            prefix.update(head)
+    return digest.hexdigest() if prefix is None else (digest.hexdigest(), prefix.hexdigest())
+
+def categorical_columns(data):
+    """Text-like columns: object, pandas string and category dtypes"""
+    return data.columns[[
+        dtype == object or isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype)) for dtype in data.dtypes
+    ]]
+
+def optimize_dataframe_dtypes(data, max_category_ratio=0.5, max_categories=1024):
+    """Lossless dtype pass: low-cardinality text to category, numerics to the smallest exact type.
+    
+    Integers are downcast within their value range, integral floats without missing values
+    become integers and other floats drop to float32 only where every value round-trips
+    exactly. Returns the optimised frame and a memory report.
+    """
+    memory_before = int(data.memory_usage(deep=True).sum())
+    optimized = data.copy()
+    conversions = {}
+    for col in data.columns:
+        column = data[col]
+        dtype = column.dtype
+        converted = None
+        if col in categorical_columns(data) and not isinstance(dtype, pd.CategoricalDtype):
+            n_unique = column.nunique(dropna=True)
+            if (n_unique <= max_categories and n_unique <= max_category_ratio * max(len(column), 1)
+                    and pd.api.types.infer_dtype(column, skipna=True) == "string"):
+                converted = column.astype("category")
+        elif pd.api.types.is_bool_dtype(dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            converted = pd.to_numeric(column, downcast="integer")
+        elif pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype) and len(column):
+            values = column.to_numpy()
+            if (np.isfinite(values).all() and np.abs(values).max() <= 2 ** 53
+                    and np.array_equal(values, np.round(values))):
+                converted = pd.to_numeric(column.astype(np.int64), downcast="integer")
+            elif dtype != np.float32:
+                with np.errstate(over="ignore"):
+                    as_float32 = values.astype(np.float32)
+                if np.array_equal(as_float32.astype(dtype), values, equal_nan=True):
+                    converted = pd.Series(as_float32, index=column.index, name=col)
+        
+        if converted is not None and converted.dtype != dtype:
+            optimized[col] = converted
+            conversions[col] = f"{dtype} → {converted.dtype}"
+    
+    memory_after = int(optimized.memory_usage(deep=True).sum())
+    return optimized, {"memory_before": memory_before, "memory_after": memory_after, "conversions": conversions}
+
+class DatasetCache:
+    """Uploaded datasets converted once into uncompressed Feather files named by content hash.
+    
+    Reloads memory-map the file, so numeric buffers and Arrow-backed string columns are read
+    from the page cache rather than parsed again, and sessions that open the same extract share
+    one mapped frame through the in-memory LRU. Treat returned frames as read-only.
+    """
+    
+    FORMAT_VERSION = 1
+    
+    def __init__(self, directory, max_bytes=None, memory_entries=8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.frames = LRUCache(max_entries=memory_entries)
+    
+    @property
+    def enabled(self):
+        return pa is not None
+    
+    def key_for(self, raw_bytes, name=""):
+        digest = hashlib.sha256(f"v{self.FORMAT_VERSION}:{os.path.splitext(name)[1].lower()}:".encode("utf-8"))
+        digest.update(raw_bytes)
+        return digest.hexdigest()
+    
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.feather")
+    
+    def load(self, raw_bytes, name, parse):
+        """DataFrame for an upload: shared in memory, else mapped from disk, else parse(BytesIO)
+        and converted. Returns (frame, source) with source 'memory', 'disk' or 'parsed'."""
+        if not self.enabled:
+            return parse(BytesIO(raw_bytes)), "parsed"
+        key = self.key_for(raw_bytes, name)
+        frame = self.frames.get(key)
+        if frame is not None:
+            return frame, "memory"
+        
+        path = self.path_for(key)
+        source = "disk"
+        if not os.path.exists(path):
+            frame = parse(BytesIO(raw_bytes))
+            try:
+                self._write(frame, path)
+            except (pa.ArrowException, ValueError, TypeError, OSError):
+                # Mixed-type object columns cannot be stored columnar - share the parsed frame only
+                return self.frames.put(key, frame), "parsed"
+            source = "parsed"
+        frame = self._read(path)
+        self.frames.put(key, frame)
+        return frame, source
+    
+    def _write(self, frame, path):
+        os.makedirs(self.directory, exist_ok=True)
+        table = pa.Table.from_pandas(frame, preserve_index=None)
+        staging = tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False)
+        staging.close()
+        try:
+            feather.write_feather(table, staging.name, compression="uncompressed")
+            os.replace(staging.name, path)
+        finally:
+            if os.path.exists(staging.name):
+                os.remove(staging.name)
+        self._prune(keep=path)
+    
+    @staticmethod
+    def _read(path):
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+    
+    def _prune(self, keep):
+        """Drop the least recently written files beyond max_bytes"""
+        if self.max_bytes is None:
+            return
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".feather")]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                total -= os.path.getsize(path)
+                os.remove(path)
+
+class RunningMoments:
+    """Mergeable per-column count, mean and M2 accumulator (Welford/Chan)"""
+    
+    def __init__(self, n_columns=1):
+        self.count = np.zeros(n_columns, dtype=np.float64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+    
+    def update(self, values):
+        """Fold a block of rows into the running moments, ignoring NaNs"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        if not len(values):
+            return self
+        missing = np.isnan(values)
+        if missing.any():
+            count = (~missing).sum(axis=0).astype(np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+        else:
+            count = np.full(values.shape[1], float(len(values)))
+            mean = values.mean(axis=0)
+            m2 = ((values - mean) ** 2).sum(axis=0)
+        return self.merge_stats(count, mean, m2)
+    
+    def merge_stats(self, count, mean, m2):
+        """Chan et al. pairwise combination of two partial results"""
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+        return self
+    
+    def merge(self, other):
+        return self.merge_stats(other.count, other.mean, other.m2)
+    
+    def remove_stats(self, count, mean, m2):
+        """Inverse of merge_stats: take a previously merged partial result back out"""
+        remaining = self.count - count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            kept_mean = np.where(remaining > 0, (self.count * self.mean - count * mean) / remaining, 0.0)
+            delta = mean - kept_mean
+            kept_m2 = self.m2 - m2 - delta ** 2 * remaining * count / self.count
+            self.m2 = np.where(remaining > 0, np.maximum(kept_m2, 0.0), 0.0)
+        self.mean = kept_mean
+        self.count = np.maximum(remaining, 0.0)
+        return self
+    
+    def variance(self, ddof=0):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+    
+    def std(self, ddof=0):
+        return np.sqrt(self.variance(ddof))
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch: memory grows with log(n), not n"""
+    
+    def __init__(self, capacity=2048, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        # Items stored at level h each stand for 2**h observations
+        self.levels = []
+        self._rng = np.random.default_rng(seed)
+    
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._append(0, values)
+        self._compact()
+        return self
+    
+    def merge(self, other):
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for level, items in enumerate(other.levels):
+            self._append(level, items)
+        self._compact()
+        return self
+    
+    def _append(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.zeros(0, dtype=np.float64))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+    
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                # An odd item out stays behind; every other item is promoted at double weight
+                keep = items[len(items) - len(items) % 2:]
+                paired = items[:len(items) - len(items) % 2]
+                self.levels[level] = keep
+                self._append(level + 1, paired[self._rng.integers(2)::2])
+            level += 1
+    
+    def _weighted_items(self):
+        items = np.concatenate(self.levels) if self.levels else np.zeros(0)
+        weights = np.concatenate([
+            np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)
+        ]) if self.levels else np.zeros(0)
+        return items, weights
+    
+    def quantiles(self, qs):
+        """Approximate quantiles for an array of probabilities"""
+        qs = np.asarray(qs, dtype=np.float64)
+        items, weights = self._weighted_items()
+        if not len(items):
+            return np.full(qs.shape, np.nan)
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        return items[np.clip(idx, 0, len(items) - 1)]
+    
+    def histogram(self, bins=50):
+        """Approximate (counts, edges) histogram over the observed range"""
+        items, weights = self._weighted_items()
+        if not len(items):
+            return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+        counts, edges = np.histogram(items, bins=bins, range=(self.min, self.max), weights=weights)
+        return np.rint(counts).astype(np.int64), edges
+
+class MonteCarloEngine:
+    """Batched Monte Carlo sampler with Gaussian-copula correlated parameters"""
+    
+    PERCENTILES = {"5th": 0.05, "25th": 0.25, "50th": 0.50, "75th": 0.75, "95th": 0.95}
+    HISTOGRAM_BINS = 50
+    
+    def __init__(self, base_params, correlation=None, chunk_size=1_000_000):
+        self.base_params = base_params
+        self.correlation = correlation
+        self.names = list(base_params)
+        self.configs = [base_params[name] for name in self.names]
+        self.chunk_size = chunk_size
+        self.cholesky = self._cholesky(correlation, len(self.names))
+    
+    @staticmethod
+    def _cholesky(correlation, n_params):
+        if correlation is None:
+            return None
+        corr = np.asarray(correlation, dtype=np.float64)
+        if corr.shape != (n_params, n_params):
+            raise ValueError(f"Correlation matrix must be {n_params}x{n_params}")
+        if not np.allclose(corr, corr.T) or not np.allclose(np.diag(corr), 1.0):
+            raise ValueError("Correlation matrix must be symmetric with a unit diagonal")
+        try:
+            return np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix must be positive definite")
+    
+    @staticmethod
+    def _draw_marginal(config, rng, size):
+        distribution = config.get("distribution", "normal")
+        if distribution == "uniform":
+            return rng.uniform(config["min"], config["max"], size)
+        if distribution == "beta":
+            return rng.beta(config["alpha"], config["beta"], size)
+        return rng.normal(config.get("mean", 100), config.get("std", 10), size)
+    
+    def sample_chunk(self, rng, size, out=None):
+        """Draw a (size, n_params) block; correlated draws share one Gaussian copula"""
+        if out is None:
+            out = np.empty((size, len(self.names)), dtype=np.float64)
+        if self.cholesky is None:
+            for j, config in enumerate(self.configs):
+                out[:, j] = self._draw_marginal(config, rng, size)
+            return out
+        
+        z = rng.standard_normal((size, len(self.names))) @ self.cholesky.T
+        for j, config in enumerate(self.configs):
+            if config.get("distribution", "normal") == "normal":
+                out[:, j] = config.get("mean", 100) + config.get("std", 10) * z[:, j]
+            else:
+                # Non-normal marginals: reorder independent draws to follow the copula ranks
+                out[np.argsort(z[:, j]), j] = np.sort(self._draw_marginal(config, rng, size))
+        return out
+    
+    def run(self, n_simulations, rng=None, dtype=np.float32):
+        """All samples as an (n_simulations, n_params) array, generated chunk by chunk"""
+        rng = rng if rng is not None else np.random.default_rng()
+        # Column-major so each parameter's samples are one contiguous buffer
+        samples = np.empty((n_simulations, len(self.names)), dtype=dtype, order="F")
+        for start in range(0, n_simulations, self.chunk_size):
+            stop = min(start + self.chunk_size, n_simulations)
+            self.sample_chunk(rng, stop - start, out=samples[start:stop])
+        return samples
+    
+    def simulate_blocks(self, block_seeds, block_sizes, sketch_capacity=2048):
+        """Simulate seeded blocks in order and merge them into one partial result"""
+        moments, sketches = RunningMoments(len(self.names)), None
+        for block_seed, size in zip(block_seeds, block_sizes):
+            rng = np.random.default_rng(block_seed)
+            block = self.sample_chunk(rng, size)
+            moments.update(block)
+            block_sketches = [
+                QuantileSketch(sketch_capacity, seed=rng.integers(2 ** 32)).update(block[:, j])
+                for j in range(len(self.names))
+            ]
+            if sketches is None:
+                sketches = block_sketches
+            else:
+                for sketch, block_sketch in zip(sketches, block_sketches):
+                    sketch.merge(block_sketch)
+        return moments, sketches
+    
+    def run_streaming(self, n_simulations, seed=None, progress_callback=None, n_workers=1,
+                      sketch_capacity=2048, blocks_per_task=4):
+        """Stream seeded blocks into running moments and quantile sketches with bounded memory.
+        
+        Every block draws from its own SeedSequence child and blocks are merged in a fixed
+        order, so a given seed reproduces the same result for any number of workers.
+        """
+        block_sizes = [min(self.chunk_size, n_simulations - start) for start in range(0, n_simulations, self.chunk_size)]
+        block_seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+        tasks = [
+            (self.base_params, self.correlation, self.chunk_size,
+             block_seeds[i:i + blocks_per_task], block_sizes[i:i + blocks_per_task], sketch_capacity)
+            for i in range(0, len(block_sizes), blocks_per_task)
+        ]
+        
+        reported = 0
+        
+        def merge_partials(partials):
+            nonlocal reported
+            moments, sketches, done = RunningMoments(len(self.names)), None, 0
+            for task, (partial_moments, partial_sketches) in zip(tasks, partials):
+                moments.merge(partial_moments)
+                if sketches is None:
+                    sketches = partial_sketches
+                else:
+                    for sketch, partial in zip(sketches, partial_sketches):
+                        sketch.merge(partial)
+                done += sum(task[4])
+                # A fallback rerun repeats blocks already reported; progress never moves backwards
+                if progress_callback is not None and done > reported:
+                    reported = done
+                    progress_callback(done, n_simulations)
+            return moments, sketches
+        
+        if n_workers and n_workers > 1 and len(tasks) > 1:
+            # Never fork the multithreaded server process: workers start from a clean interpreter
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            try:
+                with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks)), mp_context=context) as pool:
+                    return merge_partials(pool.map(_simulate_block_group, tasks))
+            except (OSError, NotImplementedError, BrokenProcessPool, pickle.PicklingError):
+                pass  # No usable process pool here - the same blocks run in-process below
+        return merge_partials(map(_simulate_block_group, tasks))
+    
+    def summarize_streaming(self, moments, sketches):
+        """Same result layout as summarize(), built from streaming accumulators"""
+        stds = moments.std()
+        results = {}
+        for j, name in enumerate(self.names):
+            quantiles = sketches[j].quantiles(list(self.PERCENTILES.values()))
+            counts, edges = sketches[j].histogram(self.HISTOGRAM_BINS)
+            results[name] = {
+                "mean": float(moments.mean[j]),
+                "std": float(stds[j]),
+                "percentiles": {label: float(quantiles[q]) for q, label in enumerate(self.PERCENTILES)},
+                "histogram": {"counts": counts, "edges": edges}
+            }
+        return results
+    
+    def summarize(self, samples, keep_samples=True):
+        """Per-parameter mean, std, percentiles and pre-binned histogram"""
+        means = samples.mean(axis=0, dtype=np.float64)
+        stds = samples.std(axis=0, dtype=np.float64)
+        quantiles = np.quantile(samples, list(self.PERCENTILES.values()), axis=0)
+        results = {}
+        for j, name in enumerate(self.names):
+            counts, edges = np.histogram(samples[:, j], bins=self.HISTOGRAM_BINS)
+            results[name] = {
+                "mean": float(means[j]),
+                "std": float(stds[j]),
+                "percentiles": {label: float(quantiles[q, j]) for q, label in enumerate(self.PERCENTILES)},
+                "histogram": {"counts": counts, "edges": edges}
+            }
+            if keep_samples:
+                results[name]["samples"] = samples[:, j]
+        return results
+
+def _simulate_block_group(task):
+    """Process-pool worker: simulate a group of Monte Carlo blocks"""
+    base_params, correlation, chunk_size, block_seeds, block_sizes, sketch_capacity = task
+    engine = MonteCarloEngine(base_params, correlation=correlation, chunk_size=chunk_size)
+    return engine.simulate_blocks(block_seeds, block_sizes, sketch_capacity)
+
+class IncrementalStatistics:
+    """Additive statistics behind the multimodal analysis, updated in O(changed rows).
+    
+    Pairwise-complete Pearson correlation comes from shifted sums over rows where both
+    columns are present (M^T M, X0^T M, (X0 * X0)^T M and X0^T X0 with X0 = X - shift, zero where
+    missing); per-group mean/std from RunningMoments; missing counts per column. Every term is
+    a sum over rows, so blocks can be folded in or taken back out, and memory depends on the
+    column count only.
+    """
+    
+    def __init__(self, numeric_columns, group_column=None, all_columns=None):
+        self.columns = list(numeric_columns)
+        self.group_column = group_column
+        self.all_columns = list(all_columns) if all_columns is not None else list(self.columns)
+        k = len(self.columns)
+        self.n_rows = 0
+        self.shift = None
+        self.pair_count = np.zeros((k, k))
+        self.sum_x = np.zeros((k, k))
+        self.sum_xx = np.zeros((k, k))
+        self.sum_xy = np.zeros((k, k))
+        self.missing = np.zeros(len(self.all_columns), dtype=np.int64)
+        self.groups = {}
+    
+    def compatible(self, data, numeric_columns, group_column=None):
+        return (list(data.columns) == self.all_columns and list(numeric_columns) == self.columns
+                and group_column == self.group_column)
+    
+    @staticmethod
+    def _group_sums(codes, values, n_groups):
+        """(n_groups, n_columns) column sums per group code in one bincount"""
+        k = values.shape[1]
+        flat = (codes[:, None] * k + np.arange(k)).ravel()
+        return np.bincount(flat, weights=values.ravel(), minlength=n_groups * k).reshape(n_groups, k)
+    
+    def _accumulate(self, rows, sign):
+        values = rows[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        if self.shift is None:
+            counts = present.sum(axis=0)
+            self.shift = np.divide(np.where(present, values, 0.0).sum(axis=0), counts,
+                                   out=np.zeros(len(self.columns)), where=counts > 0)
+        
+        shifted = np.where(present, values - self.shift, 0.0)
+        mask = present.astype(np.float64)
+        self.pair_count += sign * (mask.T @ mask)
+        self.sum_x += sign * (shifted.T @ mask)
+        self.sum_xx += sign * ((shifted * shifted).T @ mask)
+        self.sum_xy += sign * (shifted.T @ shifted)
+        self.missing += sign * rows[self.all_columns].isna().sum().to_numpy(dtype=np.int64)
+        self.n_rows += sign * len(rows)
+        
+        if self.group_column is not None:
+            codes, uniques = pd.factorize(rows[self.group_column])
+            valid = codes >= 0
+            codes, group_values, group_present = codes[valid], values[valid], present[valid]
+            count = self._group_sums(codes, group_present.astype(np.float64), len(uniques))
+            totals = self._group_sums(codes, np.where(group_present, group_values, 0.0), len(uniques))
+            mean = np.divide(totals, count, out=np.zeros_like(totals), where=count > 0)
+            deviations = np.where(group_present, group_values - mean[codes], 0.0)
+            m2 = self._group_sums(codes, deviations ** 2, len(uniques))
+            for g, key in enumerate(uniques):
+                moments = self.groups.setdefault(key, RunningMoments(len(self.columns)))
+                if sign > 0:
+                    moments.merge_stats(count[g], mean[g], m2[g])
+                else:
+                    moments.remove_stats(count[g], mean[g], m2[g])
+    
+    def update(self, rows):
+        """Fold a block of rows into the statistics"""
+        self._accumulate(rows, 1)
+        return self
+    
+    def remove(self, rows):
+        """Take previously absorbed rows back out (e.g. rows dropped by a filter)"""
+        self._accumulate(rows, -1)
+        return self
+    
+    def correlation(self):
+        """Pairwise-complete Pearson correlation matrix, as DataFrame.corr() computes it"""
+        n = self.pair_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x, mean_y = self.sum_x / n, self.sum_x.T / n
+            covariance = self.sum_xy / n - mean_x * mean_y
+            var_x = self.sum_xx / n - mean_x ** 2
+            var_y = self.sum_xx.T / n - mean_y ** 2
+            corr = covariance / np.sqrt(var_x * var_y)
+        corr = np.where((n > 1) & (var_x > 0) & (var_y > 0), np.clip(corr, -1.0, 1.0), np.nan)
+        np.fill_diagonal(corr, np.where((np.diag(n) > 1) & (np.diag(var_x) > 0), 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+    
+    def group_summary(self):
+        """Per-group mean and std (ddof=1) laid out like groupby().agg(['mean', 'std'])"""
+        keys = pd.Index(list(self.groups), name=self.group_column)
+        keys = keys[[bool(self.groups[key].count.max() > 0) for key in keys]].sort_values()
+        frame = {}
+        for j, col in enumerate(self.columns):
+            moments = [self.groups[key] for key in keys]
+            frame[(col, "mean")] = [m.mean[j] if m.count[j] > 0 else np.nan for m in moments]
+            frame[(col, "std")] = [m.std(ddof=1)[j] for m in moments]
+        return pd.DataFrame(frame, index=keys)
+    
+    def means(self):
+        """Overall mean of every numeric column over its non-missing rows"""
+        count = np.diag(self.pair_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(count > 0, np.diag(self.sum_x) / count + self.shift, np.nan)
+        return dict(zip(self.columns, means))
+    
+    def missing_counts(self):
+        return {col: int(count) for col, count in zip(self.all_columns, self.missing)}
+
+class TimeSeriesStore:
+    """Metrics over a datetime column, parsed and sorted once, served from precomputed rollups.
+    
+    One pass over the sorted rows collects per-day count, sum and sum of squares for every
+    numeric column (shifted by the column mean for stability); weekly and monthly rollups are
+    sums of the daily ones. Charts read whichever resolution fits the requested span.
+    """
+    RESOLUTIONS = {"D": "Daily", "W": "Weekly", "M": "Monthly"}
+    PERIODS = {"D": "D", "W": "W-SUN", "M": "M"}
+    
+    def __init__(self, data, date_column, value_columns=None):
+        self.date_column = date_column
+        dates = pd.to_datetime(data[date_column], errors="coerce")
+        if value_columns is None:
+            value_columns = [col for col in data.select_dtypes(include=[np.number]).columns if col != date_column]
+        self.columns = list(value_columns)
+        self.n_rows = len(data)
+        
+        stamps = dates.to_numpy(dtype="datetime64[ns]")
+        valid = ~np.isnat(stamps)
+        order = np.argsort(stamps[valid], kind="stable")
+        self.index = pd.DatetimeIndex(stamps[valid][order])
+        self.n_dated = len(self.index)
+        values = data[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)[valid][order]
+        
+        with np.errstate(invalid="ignore"):
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+        finite = np.isfinite(values)
+        centered = np.where(finite, values - self.shift, 0.0)
+        days = self.index.normalize()
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.array([], dtype=np.int64)
+        
+        self.rollups = {}
+        if len(starts):
+            daily = (days[starts],
+                     np.add.reduceat(finite.astype(np.int64), starts),
+                     np.add.reduceat(centered, starts),
+                     np.add.reduceat(centered * centered, starts))
+            for resolution, period in self.PERIODS.items():
+                self.rollups[resolution] = self._roll_up(daily, period)
+    
+    @property
+    def nbytes(self):
+        return self.index.nbytes + sum(
+            arrays[0].nbytes + sum(array.nbytes for array in arrays[1:]) for arrays in self.rollups.values()
+        )
+    
+    @staticmethod
+    def _roll_up(daily, period):
+        """Sum daily statistics into calendar buckets, including empty ones"""
+        days, count, total, sumsq = daily
+        labels = days.to_period(period)
+        buckets = pd.period_range(labels[0], labels[-1], freq=period)
+        # Period ordinals are consecutive, so they double as positions in the full range
+        ordinals = labels.asi8
+        starts = np.flatnonzero(np.r_[True, ordinals[1:] != ordinals[:-1]])
+        positions = ordinals[starts] - ordinals[0]
+        
+        def bucket_sums(values):
+            out = np.zeros((len(buckets), values.shape[1]), dtype=values.dtype)
+            out[positions] = np.add.reduceat(values, starts)
+            return out
+        return buckets.start_time, bucket_sums(count), bucket_sums(total), bucket_sums(sumsq)
+    
+    @staticmethod
+    def detect_date_column(data):
+        """First datetime column, else a text column named like a date that parses as one"""
+        for col in data.columns:
+            if pd.api.types.is_datetime64_any_dtype(data[col]):
+                return col
+        for col in categorical_columns(data):
+            if "date" in str(col).lower() or "time" in str(col).lower():
+                sample = data[col].dropna().head(1000)
+                if len(sample) and pd.to_datetime(sample.astype(str), errors="coerce").notna().mean() >= 0.9:
+                    return col
+        return None
+    
+    @classmethod
+    def from_data(cls, data, date_column=None):
+        """Store for data, or None when it has no usable datetime column"""
+        date_column = date_column or cls.detect_date_column(data)
+        if date_column is None:
+            return None
+        store = cls(data, date_column)
+        return store if store.n_dated else None
+    
+    def resolution_for(self, max_points, start=None, end=None):
+        """Finest resolution with at most max_points buckets over [start, end]"""
+        for resolution in self.RESOLUTIONS:
+            buckets = self.rollups[resolution][0]
+            in_span = (buckets >= pd.Timestamp(start or buckets[0])) & (buckets <= pd.Timestamp(end or buckets[-1]))
+            if in_span.sum() <= max_points:
+                return resolution
+        return "M"
+    
+    def rollup(self, column, resolution="D", start=None, end=None):
+        """Per-bucket count, mean and sample std of column"""
+        buckets, count, total, sumsq = self.rollups[resolution]
+        c = self.columns.index(column)
+        n = count[:, c].astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total[:, c] / n
+            variance = np.maximum(sumsq[:, c] - total[:, c] * mean, 0.0) / (n - 1)
+        frame = pd.DataFrame({
+            "count": count[:, c],
+            "mean": np.where(n > 0, mean + self.shift[c], np.nan),
+            "std": np.where(n > 1, np.sqrt(variance), np.nan)
+        }, index=pd.DatetimeIndex(buckets, name=self.date_column))
+        return frame.loc[start:end] if start is not None or end is not None else frame
+    
+    def series(self, column, resolution="D", rolling_window=7, start=None, end=None):
+        """Rollup plus rolling mean and individuals (XmR) control limits on the bucket means"""
+        frame = self.rollup(column, resolution, start, end)
+        frame["rolling_mean"] = frame["mean"].rolling(rolling_window, min_periods=1).mean()
+        means = frame["mean"].dropna().to_numpy()
+        center = means.mean() if len(means) else np.nan
+        # Average moving range / d2 (1.128 for pairs) estimates short-term sigma
+        sigma = np.abs(np.diff(means)).mean() / 1.128 if len(means) > 1 else np.nan
+        frame["center"] = center
+        frame["ucl"] = center + 3 * sigma
+        frame["lcl"] = center - 3 * sigma
+        frame["out_of_control"] = (frame["mean"] > frame["ucl"]) | (frame["mean"] < frame["lcl"])
+        return frame
+
+class DepartmentCube:
+    """Group × metric aggregate cube built from one sort of the rows.
+    
+    Rows are factorized by the group column and stably sorted once, making every group a
+    contiguous segment: count, sum, sum of squares, min and max are segment reductions, M2 uses
+    deviations from each group mean, and quantiles interpolate within per-segment sorted values.
+    The sorted segments are kept so box plots can place Tukey whiskers on real observations.
+    Without a group column the whole frame is a single group, which still serves totals.
+    """
+    QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+    
+    def __init__(self, data, group_column="Department", metrics=None, quantiles=None):
+        self.group_column = group_column if group_column in data.columns else None
+        if metrics is None:
+            metrics = data.select_dtypes(include=[np.number]).columns
+        self.metrics = list(metrics)
+        self.quantile_levels = tuple(quantiles or self.QUANTILES)
+        self.n_rows = len(data)
+        
+        if self.group_column is None:
+            codes, groups = np.zeros(len(data), dtype=np.int64), pd.Index(["All"])[:1 if len(data) else 0]
+        else:
+            # Missing departments form their own group so totals still cover every row
+            codes, groups = pd.factorize(data[self.group_column], sort=True, use_na_sentinel=False)
+        self.groups = pd.Index(groups, name=self.group_column)
+        self.sizes = np.bincount(codes, minlength=len(self.groups))
+        starts = np.cumsum(self.sizes) - self.sizes
+        
+        k, g = len(self.metrics), len(self.groups)
+        # Metric-major layout keeps every segment reduction on contiguous memory
+        order = np.argsort(codes, kind="stable")
+        values = np.ascontiguousarray(data[self.metrics].to_numpy(dtype=np.float64, na_value=np.nan).T[:, order])
+        self.quantiles = np.full((g, k, len(self.quantile_levels)), np.nan)
+        self.starts, self.ordered = starts, values
+        if not g or not k:
+            self.count = np.zeros((g, k), dtype=np.int64)
+            self.sum, self.sumsq, self.min, self.max, self.m2 = (np.zeros((g, k)) for _ in range(5))
+            return
+        
+        finite = np.isfinite(values)
+        filled = np.where(finite, values, 0.0)
+        self.count = np.add.reduceat(finite.astype(np.int64), starts, axis=1).T
+        self.sum = np.add.reduceat(filled, starts, axis=1).T
+        self.sumsq = np.add.reduceat(filled * filled, starts, axis=1).T
+        self.min = np.fmin.reduceat(values, starts, axis=1).T
+        self.max = np.fmax.reduceat(values, starts, axis=1).T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.count
+        deviations = np.where(finite, values - np.repeat(mean.T, self.sizes, axis=1), 0.0)
+        self.m2 = np.add.reduceat(deviations * deviations, starts, axis=1).T
+        
+        # Sort each metric within its segments (missing values last) and interpolate linearly
+        levels = np.asarray(self.quantile_levels)
+        for c in range(k):
+            ordered = values[c]
+            for start, size in zip(starts, self.sizes):
+                ordered[start:start + size].sort()
+            n = self.count[:, c]
+            position = starts[:, None] + levels[None, :] * np.maximum(n - 1, 0)[:, None]
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, (starts + np.maximum(n - 1, 0))[:, None])
+            fraction = position - lower
+            result = ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+            self.quantiles[:, c, :] = np.where(n[:, None] > 0, result, np.nan)
+    
+    @property
+    def nbytes(self):
+        arrays = (self.ordered, self.quantiles, self.count, self.sum, self.sumsq, self.min, self.max, self.m2)
+        return sum(array.nbytes for array in arrays)
+    
+    def _frame(self, values):
+        frame = pd.DataFrame(values, index=self.groups, columns=self.metrics)
+        if self.group_column is not None:
+            frame = frame[self.groups.notna()]
+        return frame
+    
+    def stat(self, name):
+        """Group × metric table of count, sum, sumsq, min, max, mean, m2, var or std"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            derived = {
+                "mean": np.where(self.count > 0, self.sum / self.count, np.nan),
+                "var": np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+            }
+        derived["std"] = np.sqrt(derived["var"])
+        values = derived[name] if name in derived else getattr(self, name)
+        return self._frame(values)
+    
+    def quantile(self, q):
+        """Group × metric table of one of the precomputed quantile levels"""
+        return self._frame(self.quantiles[:, :, self.quantile_levels.index(q)])
+    
+    def group_sizes(self):
+        """Rows per group, whether or not their metrics are present"""
+        sizes = pd.Series(self.sizes, index=self.groups, name="rows")
+        return sizes[self.groups.notna()] if self.group_column is not None else sizes
+    
+    def summary(self):
+        """Per-group mean and std (ddof=1) laid out like groupby().agg(['mean', 'std'])"""
+        mean, std = self.stat("mean"), self.stat("std")
+        observed = self.stat("count").max(axis=1) > 0
+        frame = {}
+        for col in self.metrics:
+            frame[(col, "mean")] = mean[col][observed]
+            frame[(col, "std")] = std[col][observed]
+        return pd.DataFrame(frame)
+    
+    def totals(self, metric):
+        """Count, mean and std of a metric over all rows, merged from the group aggregates"""
+        c = self.metrics.index(metric)
+        count = self.count[:, c]
+        n = int(count.sum())
+        if n == 0:
+            return {"count": 0, "mean": np.nan, "std": np.nan}
+        mean = self.sum[:, c].sum() / n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            group_means = np.where(count > 0, self.sum[:, c] / count, 0.0)
+        m2 = self.m2[:, c].sum() + (count * (group_means - mean) ** 2).sum()
+        return {"count": n, "mean": mean, "std": np.sqrt(m2 / (n - 1)) if n > 1 else np.nan}
+    
+    def box_stats(self, metric):
+        """Precomputed box plot inputs per group: quartiles, mean, Tukey whiskers and outliers.
+        
+        Whiskers end at the most extreme observations inside q1 - 1.5 IQR and q3 + 1.5 IQR,
+        found by binary search in the group's sorted segment; everything beyond them is returned
+        as that group's outliers.
+        """
+        c = self.metrics.index(metric)
+        q1, median, q3 = (self.quantiles[:, c, self.quantile_levels.index(q)] for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        lower, upper = np.full(len(self.groups), np.nan), np.full(len(self.groups), np.nan)
+        outliers = np.empty(len(self.groups), dtype=object)
+        for g, (start, n) in enumerate(zip(self.starts, self.count[:, c])):
+            segment = self.ordered[c, start:start + n]
+            if not n:
+                outliers[g] = segment
+                continue
+            low = np.searchsorted(segment, q1[g] - 1.5 * iqr[g], side="left")
+            high = np.searchsorted(segment, q3[g] + 1.5 * iqr[g], side="right")
+            lower[g], upper[g] = segment[low], segment[high - 1]
+            outliers[g] = np.concatenate([segment[:low], segment[high:]])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self.count[:, c] > 0, self.sum[:, c] / self.count[:, c], np.nan)
+        frame = pd.DataFrame({
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+            "mean": mean,
+            "lowerfence": lower,
+            "upperfence": upper,
+            "outliers": outliers,
+            "count": self.count[:, c]
+        }, index=self.groups)
+        return frame[self.groups.notna()] if self.group_column is not None else frame
+
+class OLAPCube:
+    """Additive measures for every combination of a few low-cardinality dimensions.
+    
+    Each row maps to a mixed-radix cell code over the dimension members, and bincounts fill the
+    dense base cuboid with row count, value count, sum and M2 (squared deviations from the cell
+    mean); min and max come from one groupby on the cell code. A roll-up sums counts and sums over the dropped
+    axes and merges M2 with Chan's formula; a slice/dice first selects members along its axes,
+    so queries never rescan the rows.
+    Unfiltered roll-ups are materialized on first use and kept, one per set of grouped
+    dimensions, so the memo never outgrows the bound reported by nbytes.
+    """
+    STATISTICS = ("mean", "sum", "count", "std", "min", "max")
+    
+    def __init__(self, data, dimensions=None, measures=None, max_members=None, max_cells=None):
+        max_members = max_members or HealthConfig.OLAP_MAX_MEMBERS
+        max_cells = max_cells or HealthConfig.OLAP_MAX_CELLS
+        self.dimensions, self.members, codes = [], [], []
+        n_cells = 1
+        for dim in dimensions or HealthConfig.OLAP_DIMENSIONS:
+            if dim not in data.columns:
+                continue
+            dim_codes, members = pd.factorize(data[dim], sort=True, use_na_sentinel=False)
+            if len(members) > max_members or n_cells * len(members) > max_cells:
+                continue
+            self.dimensions.append(dim)
+            self.members.append(pd.Index(members, name=dim))
+            codes.append(dim_codes)
+            n_cells *= len(members)
+        if measures is None:
+            measures = [col for col in data.select_dtypes(include=[np.number]).columns if col not in self.dimensions]
+        self.measures = list(measures)
+        self.shape = tuple(len(members) for members in self.members)
+        self.n_rows = len(data)
+        self.n_cells = n_cells
+        
+        # Mixed-radix cell code, first dimension most significant
+        cell = np.zeros(len(data), dtype=np.int64)
+        for dim_codes, size in zip(codes, self.shape):
+            cell = cell * size + dim_codes
+        values = np.ascontiguousarray(data[self.measures].to_numpy(dtype=np.float64, na_value=np.nan).T)
+        finite = np.isfinite(values)
+        filled = np.where(finite, values, 0.0)
+        
+        def per_cell(weights):
+            if not len(weights):
+                return np.zeros((n_cells, 0))
+            return np.stack([np.bincount(cell, weights=w, minlength=n_cells) for w in weights], axis=-1)
+        base = {
+            "rows": np.bincount(cell, minlength=n_cells).astype(np.float64),
+            "count": per_cell(finite.astype(np.float64)),
+            "sum": per_cell(filled)
+        }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cell_mean = np.where(base["count"] > 0, base["sum"] / base["count"], 0.0)
+        deviations = np.where(finite, values - cell_mean[cell].T, 0.0)
+        base["m2"] = per_cell(deviations * deviations)
+        base["min"] = np.full((n_cells, len(self.measures)), np.nan)
+        base["max"] = np.full((n_cells, len(self.measures)), np.nan)
+        if len(data) and len(self.measures):
+            grouped = pd.DataFrame(values.T).groupby(cell)
+            extremes = grouped.agg(["min", "max"])
+            base["min"][extremes.index] = extremes.xs("min", axis=1, level=1).to_numpy()
+            base["max"][extremes.index] = extremes.xs("max", axis=1, level=1).to_numpy()
+        self.base = {name: array.reshape(self.shape + array.shape[1:]) for name, array in base.items()}
+        self._cuboids = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def nbytes(self):
+        """Upper bound on base plus memoized cuboids: every subset of dimensions together has
+        prod(members + 1) cells"""
+        cell_bytes = sum(array.nbytes for array in self.base.values()) // max(self.n_cells, 1)
+        return int(np.prod([size + 1 for size in self.shape])) * cell_bytes
+    
+    def _aggregate(self, group_by, filters):
+        """Base arrays diced by filters and rolled up onto group_by (in that axis order)"""
+        arrays = dict(self.base)
+        members = list(self.members)
+        for axis, dim in enumerate(self.dimensions):
+            if dim in filters:
+                keep = members[axis].isin(list(filters[dim]))
+                members[axis] = members[axis][keep]
+                arrays = {name: np.compress(keep, array, axis=axis) for name, array in arrays.items()}
+        
+        dropped = tuple(axis for axis, dim in enumerate(self.dimensions) if dim not in group_by)
+        kept = [dim for dim in self.dimensions if dim in group_by]
+        order = [kept.index(dim) for dim in group_by]
+        if dropped:
+            # Chan et al.: pooled M2 = sum of cell M2 + n_cell * (cell mean - pooled mean)^2
+            count, total = arrays["count"], arrays["sum"]
+            pooled_count = count.sum(axis=dropped, keepdims=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cell_mean = np.where(count > 0, total / count, 0.0)
+                pooled_mean = np.where(pooled_count > 0, total.sum(axis=dropped, keepdims=True) / pooled_count, 0.0)
+            arrays["m2"] = arrays["m2"] + count * (cell_mean - pooled_mean) ** 2
+        
+        rolled = {}
+        for name, array in arrays.items():
+            if name in ("min", "max"):
+                reduce = np.fmin if name == "min" else np.fmax
+                array = reduce.reduce(array, axis=dropped, initial=np.nan) if dropped else array
+            else:
+                array = array.sum(axis=dropped) if dropped else array
+            rolled[name] = np.transpose(array, order + list(range(len(order), array.ndim)))
+        return rolled, [members[self.dimensions.index(dim)] for dim in group_by]
+    
+    def query(self, group_by=(), filters=None, statistic="mean", measures=None):
+        """KPI table for one slice/dice: a row per non-empty combination of the group_by members
+        (restricted to the members listed per dimension in filters), 'Rows' plus one column per measure"""
+        group_by = [dim for dim in group_by if dim in self.dimensions]
+        filters = {dim: members for dim, members in (filters or {}).items() if dim in self.dimensions}
+        measures = list(measures) if measures is not None else self.measures
+        if statistic not in self.STATISTICS:
+            raise ValueError(f"Unknown statistic: {statistic}")
+        
+        if filters:
+            arrays, members = self._aggregate(group_by, filters)
+        else:
+            # Memoized in dimension order and transposed per query, so orderings share a cuboid
+            key = tuple(dim for dim in self.dimensions if dim in group_by)
+            with self._lock:
+                rolled = self._cuboids.get(key)
+            if rolled is None:
+                rolled = self._aggregate(key, {})
+                with self._lock:
+                    rolled = self._cuboids.setdefault(key, rolled)
+            order = [key.index(dim) for dim in group_by]
+            arrays = {name: np.transpose(array, order + list(range(len(order), array.ndim)))
+                      for name, array in rolled[0].items()}
+            members = [rolled[1][axis] for axis in order]
+        
+        k = len(self.measures)
+        count = arrays["count"].reshape(-1, k)
+        total = arrays["sum"].reshape(-1, k)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / count, np.nan)
+            variance = np.where(count > 1, arrays["m2"].reshape(-1, k) / (count - 1), np.nan)
+        values = {
+            "mean": mean,
+            "sum": total,
+            "count": count,
+            "std": np.sqrt(variance),
+            "min": arrays["min"].reshape(-1, k),
+            "max": arrays["max"].reshape(-1, k)
+        }[statistic]
+        
+        if members:
+            index = pd.MultiIndex.from_product(members) if len(members) > 1 else members[0]
+        else:
+            index = pd.Index(["All"])
+        columns = [self.measures.index(measure) for measure in measures]
+        frame = pd.DataFrame(values[:, columns], index=index, columns=measures)
+        frame.insert(0, "Rows", arrays["rows"].reshape(-1).astype(np.int64))
+        return frame[frame["Rows"] > 0]
+
+class SensitivityEngine:
+    """Rank stability of a weighted-sum decision model under criteria weight perturbations.
+    
+    Scores are alternative_priorities @ (weights * cluster_shares): for ANP the shares are the
+    fraction of each criterion column that flows to the alternatives cluster, for AHP all ones.
+    """
+    
+    def __init__(self, criteria_weights, alternative_priorities, cluster_shares=None):
+        self.weights = np.asarray(criteria_weights, dtype=np.float64)
+        self.priorities = np.asarray(alternative_priorities, dtype=np.float64)
+        shares = np.ones_like(self.weights) if cluster_shares is None else np.asarray(cluster_shares, dtype=np.float64)
+        # Fold the shares into the priorities so every score is one matrix product
+        self.contributions = self.priorities * shares
+        self.base_scores = self.scores(self.weights)
+        self.base_order = np.argsort(-self.base_scores, kind="stable")
+    
+    def scores(self, weights):
+        """Scores for one (n_criteria,) or a stack of (k, n_criteria) weight vectors"""
+        return np.asarray(weights) @ self.contributions.T
+    
+    @staticmethod
+    def ranks(scores):
+        """0-based rank of every alternative (0 = best) along the last axis"""
+        order = np.argsort(-scores, axis=-1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(scores.shape[-1]), axis=-1)
+        return ranks
+    
+    def monte_carlo(self, n_perturbations=10000, concentration=50.0, rng=None):
+        """Dirichlet weight perturbations centred on the base weights, solved in one batch"""
+        rng = rng if rng is not None else np.random.default_rng()
+        alpha = np.maximum(self.weights * concentration, 1e-6)
+        weights = rng.dirichlet(alpha, size=n_perturbations)
+        scores = self.scores(weights)
+        ranks = self.ranks(scores)
+        n_alternatives = scores.shape[1]
+        
+        rank_probabilities = np.stack([
+            np.bincount(ranks[:, a], minlength=n_alternatives) for a in range(n_alternatives)
+        ]) / n_perturbations
+        # outranks[a, b]: share of perturbations in which a scores above b
+        outranks = (scores[:, :, None] > scores[:, None, :]).mean(axis=0)
+        base_ranks = self.ranks(self.base_scores)
+        return {
+            "rank_probabilities": rank_probabilities,
+            "rank_first_probability": rank_probabilities[:, 0],
+            "outrank_matrix": outranks,
+            # Probability that the pair swaps relative to the base ranking
+            "reversal_matrix": np.where(base_ranks[:, None] < base_ranks[None, :], outranks.T, outranks),
+            "ranking_change_probability": float((ranks != base_ranks).any(axis=1).mean()),
+            "top_change_probability": float((ranks[:, self.base_order[0]] != 0).mean())
+        }
+    
+    def one_at_a_time_weights(self, grid):
+        """(n_criteria, len(grid), n_criteria) weights with one criterion set to each grid value
+        and the others rescaled proportionally to fill the remainder"""
+        grid = np.asarray(grid, dtype=np.float64)
+        n = len(self.weights)
+        others = np.divide(self.weights, 1 - self.weights[:, None], out=np.zeros((n, n)),
+                           where=self.weights[:, None] < 1)
+        np.fill_diagonal(others, 0.0)
+        weights = (1 - grid)[None, :, None] * others[:, None, :]
+        weights[np.arange(n), :, np.arange(n)] = grid
+        return weights
+    
+    def sweep(self, grid_points=101):
+        """Normalised scores as each criterion weight sweeps 0..1: (n_criteria, grid_points, n_alternatives)"""
+        grid = np.linspace(0.0, 1.0, grid_points)
+        scores = self.scores(self.one_at_a_time_weights(grid))
+        totals = scores.sum(axis=-1, keepdims=True)
+        return grid, np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+    
+    def thresholds(self):
+        """Exact one-at-a-time weights at which the top alternative changes.
+        
+        With one weight at t and the rest rescaled, every score is linear in t, so the
+        crossing with each rival is the root of a straight line.
+        """
+        n = len(self.weights)
+        top = self.base_order[0]
+        # score(t) = t * C[:, i] + (1 - t) * R[:, i]
+        rest = np.divide(
+            (self.contributions @ self.weights)[:, None] - self.contributions * self.weights,
+            1 - self.weights, out=np.zeros_like(self.contributions), where=self.weights < 1
+        )
+        alpha = self.contributions[top] - self.contributions
+        beta = rest[top] - rest
+        denominator = beta - alpha
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = np.where(np.abs(denominator) > 1e-15, beta / denominator, np.nan)
+        crossing[top] = np.nan
+        crossing[(crossing < 0) | (crossing > 1)] = np.nan
+        
+        below = np.where(crossing < self.weights, crossing, -np.inf)
+        above = np.where(crossing > self.weights, crossing, np.inf)
+        results = []
+        for i in range(n):
+            lower_alt, upper_alt = int(np.argmax(below[:, i])), int(np.argmin(above[:, i]))
+            lower, upper = below[lower_alt, i], above[upper_alt, i]
+            results.append({
+                "weight": float(self.weights[i]),
+                "lower": float(lower) if np.isfinite(lower) else None,
+                "lower_winner": lower_alt if np.isfinite(lower) else None,
+                "upper": float(upper) if np.isfinite(upper) else None,
+                "upper_winner": upper_alt if np.isfinite(upper) else None
+            })
+        return results
+
+class SharedHealthcareResources:
+    """Immutable state built once per process and shared by every session"""
+    
+    def __init__(self, knowledge_base, config=None, loaders=None):
+        self.config = config or HealthConfig()
+        self.knowledge_base = knowledge_base
+        self.retriever = KnowledgeRetriever.load_or_build(
+            knowledge_base,
+            docs_dir=self.config.KNOWLEDGE_DOCS_DIR,
+            index_dir=self.config.KNOWLEDGE_INDEX_DIR,
+            loaders=loaders
+        )
+        self.analysis_cache = LRUCache(
+            max_entries=self.config.ANALYSIS_CACHE_SIZE,
+            max_bytes=self.config.ANALYSIS_CACHE_MAX_BYTES,
+            sizeof=lambda analysis: len(pickle.dumps(analysis, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+        self.aggregate_cache = LRUCache(
+            max_entries=self.config.AGGREGATE_CACHE_SIZE,
+            max_bytes=self.config.AGGREGATE_CACHE_MAX_BYTES,
+            sizeof=lambda structure: structure.nbytes if structure is not None else 0
+        )
+        self.figure_cache = LRUCache(
+            max_entries=self.config.FIGURE_CACHE_SIZE,
+            max_bytes=self.config.FIGURE_CACHE_MAX_BYTES,
+            sizeof=len
+        )
+        self.dataset_cache = DatasetCache(
+            self.config.DATASET_CACHE_DIR,
+            max_bytes=self.config.DATASET_CACHE_MAX_BYTES,
+            memory_entries=self.config.DATASET_MEMORY_ENTRIES
+        )
+
 class EnhancedHealthcareAI:
     """Enhanced AI system with multiple analysis capabilities"""
     
-    def __init__(self):
-        self.config = HealthConfig()
+    SAATY_SCALE = np.concatenate([1 / np.arange(9, 1, -1), np.arange(1, 10)])
+    
+    def __init__(self, shared=None):
+        # Heavy, read-only state lives in the shared resources; only the model choice is per session
+        self.shared = shared if shared is not None else self.build_shared_resources()
         self.current_model = "expert"
-        self.knowledge_base = self._initialize_comprehensive_knowledge()
-        self.analysis_cache = {}
+        self._last_fingerprint = None
+        self._incremental = None
+    
+    @classmethod
+    def build_shared_resources(cls, loaders=None):
+        return SharedHealthcareResources(cls._initialize_comprehensive_knowledge(), loaders=loaders)
+    
+    @property
+    def config(self):
+        return self.shared.config
+    
+    @property
+    def knowledge_base(self):
+        return self.shared.knowledge_base
+    
+    @property
+    def retriever(self):
+        return self.shared.retriever
+    
+    @property
+    def analysis_cache(self):
+        return self.shared.analysis_cache
+    
+    @property
+    def aggregate_cache(self):
+        return self.shared.aggregate_cache
+    
+    @property
+    def dataset_cache(self):
+        return self.shared.dataset_cache
+    
+    @property
+    def figure_cache(self):
+        return self.shared.figure_cache
+    
+    def load_dataset(self, raw_bytes, name):
+        """Uploaded CSV/Excel bytes as a DataFrame via the shared columnar cache"""
+        read = pd.read_csv if name.lower().endswith('.csv') else pd.read_excel
+        return self.dataset_cache.load(raw_bytes, name, lambda buffer: self.ingest_dataframe(read(buffer)))
+    
+    def ingest_dataframe(self, data):
+        """Ingest stage for new datasets: compact dtypes, keeping the memory report in attrs"""
+        data, report = optimize_dataframe_dtypes(data)
+        data.attrs["dtype_report"] = report
+        return data
     
-    def _initialize_comprehensive_knowledge(self):
+    @staticmethod
+    def _initialize_comprehensive_knowledge():
         return {
             "anp_analysis": {
                 "title": "ANP (Analytic Network Process) Analysis",
@@ -681,108 +2470,624 @@ Integrate multiple data sources for comprehensive healthcare insights.
 • Predictive modeling
                 """,
                 "methods": ["Data Fusion", "Statistical Modeling", "Pattern Recognition"]
+            },
+            
+            "readmission_reduction": {
+                "title": "Reducing Hospital Readmission Rates",
+                "description": "Data-driven strategies for lowering 30-day readmissions",
+                "content": """
+**Data Analytics Approach:**
+• **Predictive Modeling**: Identify high-risk patients using historical data
+• **Risk Stratification**: Segment patients by readmission probability
+• **Discharge Planning**: Use data to optimize discharge processes
+• **Follow-up Protocols**: Implement data-driven follow-up schedules
+
+**Key Strategies:**
+• Medication reconciliation and education
+• Transitional care programs
+• Patient engagement initiatives
+• Care coordination improvements
+• Social determinants integration
+
+**Analytics Tools:**
+- Machine learning for risk prediction
+- Time series analysis for trend identification
+- Statistical process control for monitoring
+- Dashboard development for real-time tracking
+                """,
+                "methods": ["Predictive Modeling", "Risk Stratification", "Care Transitions"]
             }
         }
     
+    def search_knowledge(self, query, top_k=3):
+        """Retrieve the most relevant knowledge base passages"""
+        return self.retriever.search(query, top_k=top_k)
+    
+    def generate_rag_response(self, query, top_k=3):
+        """Compose an answer from retrieved passages, or None when nothing matches"""
+        start = time.perf_counter()
+        hits = self.search_knowledge(query, top_k=top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if not hits:
+            return None
+        
+        sections = [f"**{hit['title']}**\n\n{hit['text']}" for hit in hits]
+        sources = ", ".join(dict.fromkeys(hit['title'] for hit in hits))
+        return (
+            "**Knowledge Base Insights:**\n\n"
+            + "\n\n".join(sections)
+            + f"\n\n*Sources: {sources} • retrieved in {elapsed_ms:.2f} ms*"
+        )
+    
     def switch_model(self, model_name):
         if model_name in self.config.AI_MODELS:
             self.current_model = model_name
             return f"Switched to {self.config.AI_MODELS[model_name]['name']}"
         return "Model not found"
     
-    def get_current_model(self):
-        return self.config.AI_MODELS[self.current_model]
+    def get_current_model(self):
+        return self.config.AI_MODELS[self.current_model]
+    
+    def perform_anp_analysis(self, criteria, alternatives, dependencies=None, seed=None):
+        """ANP analysis: weighted supermatrix with criteria dependencies and its limit matrix.
+        
+        dependencies maps a criterion to the criteria that influence it, e.g.
+        {"Cost Effectiveness": ["Patient Safety", "Staff Impact"]}, or is a list of
+        (source, target) pairs.
+        """
+        try:
+            n_criteria = len(criteria)
+            n_alternatives = len(alternatives)
+            
+            # Generate pairwise comparison matrices
+            rng = np.random.default_rng(seed)
+            criteria_matrix = self._generate_comparison_matrix(n_criteria, rng)
+            alternative_matrices = self._generate_comparison_matrices(n_criteria, n_alternatives, rng)
+            
+            # Local priorities: criteria weights and alternatives under each criterion (columns)
+            criteria_priority = self._calculate_priority_vectors(criteria_matrix)
+            local_criteria_weights = criteria_priority["weights"]
+            alternative_priority = self._calculate_priority_vectors(alternative_matrices)
+            alternative_priorities = alternative_priority["weights"].T
+            
+            # Inner dependence: priorities of the criteria influencing each criterion,
+            # solved in one batch per number of influencing criteria
+            influences = {}
+            targets_by_size = {}
+            for target, sources in self._normalize_dependencies(criteria, dependencies).items():
+                targets_by_size.setdefault(len(sources), []).append((target, sources))
+            for size, group in targets_by_size.items():
+                matrices = self._generate_comparison_matrices(len(group), size, rng)
+                weights = self._calculate_priority_vectors(matrices)["weights"]
+                for (target, sources), priorities in zip(group, weights):
+                    influences[target] = (sources, priorities)
+            
+            supermatrix = self._build_weighted_supermatrix(
+                local_criteria_weights, alternative_priorities, influences
+            )
+            limit_matrix, converged, iterations = self._calculate_limit_matrix(supermatrix)
+            
+            # Every column of the limit matrix holds the same limiting priorities
+            limit_priorities = limit_matrix.mean(axis=1)
+            criteria_weights = limit_priorities[:n_criteria] / limit_priorities[:n_criteria].sum()
+            final_scores = limit_priorities[n_criteria:] / limit_priorities[n_criteria:].sum()
+            
+            # Create results
+            results = {
+                "criteria": criteria,
+                "alternatives": alternatives,
+                "criteria_weights": criteria_weights.tolist(),
+                "local_criteria_weights": local_criteria_weights.tolist(),
+                "alternative_priorities": alternative_priorities,
+                "final_scores": final_scores.tolist(),
+                "ranking": sorted(zip(alternatives, final_scores), key=lambda x: x[1], reverse=True),
+                "dependencies": {criteria[t]: [criteria[i] for i in src] for t, (src, _) in influences.items()},
+                "supermatrix": supermatrix,
+                "limit_matrix": limit_matrix,
+                "converged": converged,
+                "iterations": iterations,
+                "lambda_max": float(criteria_priority["lambda_max"]),
+                "consistency_ratio": float(criteria_priority["cr"]),
+                "alternative_consistency_ratios": alternative_priority["cr"].tolist()
+            }
+            
+            return results
+            
+        except Exception as e:
+            return {"error": f"ANP Analysis error: {str(e)}"}
+    
+    @staticmethod
+    def _normalize_dependencies(criteria, dependencies):
+        """Map target criterion index -> sorted indices of the criteria influencing it"""
+        if not dependencies:
+            return {}
+        pairs = (
+            [(source, target) for target, sources in dependencies.items() for source in sources]
+            if isinstance(dependencies, dict) else list(dependencies)
+        )
+        index = {name: i for i, name in enumerate(criteria)}
+        influences = {}
+        for source, target in pairs:
+            if source in index and target in index:
+                influences.setdefault(index[target], set()).add(index[source])
+        return {target: sorted(sources) for target, sources in influences.items()}
+    
+    @staticmethod
+    def _build_weighted_supermatrix(criteria_weights, alternative_priorities, influences,
+                                    dependency_weight=0.5):
+        """Column-stochastic supermatrix over [criteria..., alternatives...].
+        
+        A criterion's column splits its weight between the alternatives cluster and, when it
+        has dependencies, the criteria influencing it. Alternatives feed back to the criteria
+        with the local criteria weights.
+        """
+        n_criteria, n_alternatives = len(criteria_weights), alternative_priorities.shape[0]
+        n = n_criteria + n_alternatives
+        supermatrix = np.zeros((n, n))
+        
+        supermatrix[n_criteria:, :n_criteria] = alternative_priorities
+        for target, (sources, priorities) in influences.items():
+            supermatrix[n_criteria:, target] *= 1 - dependency_weight
+            supermatrix[sources, target] = dependency_weight * priorities
+        supermatrix[:n_criteria, n_criteria:] = np.asarray(criteria_weights)[:, None]
+        
+        return supermatrix / supermatrix.sum(axis=0, keepdims=True)
+    
+    @staticmethod
+    def _calculate_limit_matrix(supermatrix, tol=1e-10, max_squarings=64):
+        """Limit matrix by repeated squaring of the lazy supermatrix (W + I) / 2.
+        
+        The lazy form has the same limiting priorities as W but is aperiodic, so cyclic
+        criteria/alternative networks converge instead of oscillating.
+        """
+        matrix = (supermatrix + np.eye(len(supermatrix))) / 2
+        for iteration in range(1, max_squarings + 1):
+            squared = matrix @ matrix
+            if np.abs(squared - matrix).max() < tol:
+                return squared, True, iteration
+            matrix = squared
+        return matrix, False, max_squarings
+    
+    def perform_ahp_analysis(self, criteria, judgments, alternatives=None, alternative_judgments=None,
+                             cr_threshold=0.1, max_edits=5):
+        """AHP analysis from user pairwise judgments.
+        
+        judgments is an (n, n) matrix or an (n_raters, n, n) stack; NaN (or non-positive) entries
+        are missing and either a_ij or a_ji may be given. Raters are aggregated by geometric mean,
+        missing entries are filled by logarithmic least squares and inconsistent matrices get
+        suggested Saaty-scale edits. alternative_judgments holds one judgment set per criterion.
+        """
+        try:
+            solved = self._solve_judgments(judgments, len(criteria), cr_threshold, max_edits)
+            weights = solved["weights"]
+            results = {
+                "criteria": criteria,
+                "criteria_weights": weights.tolist(),
+                "judgment_matrix": solved["matrix"],
+                "filled_entries": solved["filled"],
+                "n_raters": solved["n_raters"],
+                "lambda_max": solved["lambda_max"],
+                "consistency_ratio": solved["cr"],
+                "rater_consistency_ratios": solved["rater_cr"],
+                "suggested_edits": self._name_edits(solved["edits"], criteria),
+                "repaired_consistency_ratio": solved["repaired_cr"]
+            }
+            
+            if alternatives and alternative_judgments is not None:
+                if len(alternative_judgments) != len(criteria):
+                    raise ValueError("Provide one set of alternative judgments per criterion")
+                solved_alternatives = [
+                    self._solve_judgments(j, len(alternatives), cr_threshold, max_edits) for j in alternative_judgments
+                ]
+                alternative_priorities = np.column_stack([a["weights"] for a in solved_alternatives])
+                final_scores = alternative_priorities @ weights
+                results.update({
+                    "alternatives": alternatives,
+                    "alternative_priorities": alternative_priorities,
+                    "final_scores": final_scores.tolist(),
+                    "ranking": sorted(zip(alternatives, final_scores), key=lambda x: x[1], reverse=True),
+                    "alternative_consistency_ratios": [a["cr"] for a in solved_alternatives],
+                    "alternative_suggested_edits": {
+                        criterion: self._name_edits(a["edits"], alternatives)
+                        for criterion, a in zip(criteria, solved_alternatives) if a["edits"]
+                    }
+                })
+            
+            return results
+        
+        except Exception as e:
+            return {"error": f"AHP Analysis error: {str(e)}"}
+    
+    @staticmethod
+    def _name_edits(edits, names):
+        """Replace matrix indices in suggested edits with item names"""
+        return [dict(edit, row=names[edit["row"]], col=names[edit["col"]]) for edit in edits]
+    
+    def _solve_judgments(self, judgments, n, cr_threshold=0.1, max_edits=5):
+        """Aggregate, complete and check one judgment set; suggest edits when inconsistent"""
+        matrices = np.asarray(judgments, dtype=np.float64)
+        if matrices.ndim == 2:
+            matrices = matrices[None]
+        if matrices.ndim != 3 or matrices.shape[1:] != (n, n):
+            raise ValueError(f"Judgment matrices must be {n}x{n}")
+        
+        rater_logs, group_log = self._aggregate_judgments(matrices)
+        completed, connected = self._complete_log_judgments(group_log[None])
+        if not connected[0]:
+            raise ValueError("Judgments must link every item to the others through at least one chain of comparisons")
+        priority = self._calculate_priority_vectors(np.exp(completed[0]))
+        
+        # Per-rater consistency where a rater's own comparisons are connected
+        rater_cr = np.full(len(matrices), np.nan)
+        rater_completed, rater_connected = self._complete_log_judgments(rater_logs)
+        if rater_connected.any():
+            rater_cr[rater_connected] = self._calculate_priority_vectors(np.exp(rater_completed[rater_connected]))["cr"]
+        
+        edits, repaired_cr = [], float(priority["cr"])
+        if priority["cr"] >= cr_threshold:
+            edits, repaired_cr = self._repair_judgments(group_log, cr_threshold, max_edits)
+        
+        filled = np.isnan(group_log)
+        return {
+            "weights": priority["weights"],
+            "matrix": np.exp(completed[0]),
+            "filled": filled,
+            "n_raters": len(matrices),
+            "lambda_max": float(priority["lambda_max"]),
+            "cr": float(priority["cr"]),
+            "rater_cr": rater_cr.tolist(),
+            "edits": edits,
+            "repaired_cr": repaired_cr
+        }
+    
+    @staticmethod
+    def _nan_mean(values, axis):
+        counts = (~np.isnan(values)).sum(axis=axis)
+        totals = np.nansum(values, axis=axis)
+        return np.divide(totals, counts, out=np.full(totals.shape, np.nan), where=counts > 0)
+    
+    def _aggregate_judgments(self, matrices):
+        """Log judgments per rater (a_ij and 1/a_ji averaged) and their geometric-mean group matrix"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.where(matrices > 0, np.log(matrices), np.nan)
+        rater_logs = self._nan_mean(np.stack([logs, -np.swapaxes(logs, 1, 2)]), axis=0)
+        group_log = self._nan_mean(rater_logs, axis=0)
+        diagonal = np.arange(matrices.shape[-1])
+        rater_logs[:, diagonal, diagonal] = 0.0
+        group_log[diagonal, diagonal] = 0.0
+        return rater_logs, group_log
     
-    def perform_anp_analysis(self, criteria, alternatives, dependencies=None):
-        """Simulate ANP analysis"""
-        try:
-            n_criteria = len(criteria)
-            n_alternatives = len(alternatives)
-            
-            # Generate pairwise comparison matrices
-            criteria_matrix = self._generate_comparison_matrix(n_criteria)
-            alternative_matrices = [self._generate_comparison_matrix(n_alternatives) for _ in range(n_criteria)]
+    @staticmethod
+    def _complete_log_judgments(log_matrices):
+        """Fill missing log judgments of a (k, n, n) stack by logarithmic least squares.
+        
+        The log weights solve the comparison-graph Laplacian system (L + 11^T) y = b, which has
+        a unique zero-sum solution exactly when the known comparisons form a connected graph.
+        Missing entries become y_i - y_j; disconnected matrices come back as NaN.
+        """
+        n = log_matrices.shape[-1]
+        diagonal = np.arange(n)
+        known = ~np.isnan(log_matrices)
+        known[:, diagonal, diagonal] = False
+        adjacency = known.astype(np.float64)
+        
+        # Connectivity by repeated squaring of the reachability matrix
+        reach = adjacency + np.eye(n)
+        for _ in range(max(1, int(np.ceil(np.log2(max(n, 2)))))):
+            reach = np.minimum(np.matmul(reach, reach), 1.0)
+        connected = (reach > 0).all(axis=(1, 2))
+        
+        laplacian = -adjacency
+        laplacian[:, diagonal, diagonal] = adjacency.sum(axis=2)
+        system = np.where(connected[:, None, None], laplacian + 1.0, np.eye(n))
+        rhs = np.where(known, log_matrices, 0.0).sum(axis=2)
+        y = np.linalg.solve(system, rhs[..., None])[..., 0]
+        
+        completed = np.where(known, log_matrices, y[:, :, None] - y[:, None, :])
+        completed[:, diagonal, diagonal] = 0.0
+        completed[~connected] = np.nan
+        return completed, connected
+    
+    def _repair_judgments(self, log_matrix, cr_threshold=0.1, max_edits=5):
+        """Greedy consistency repair: each round tries every given judgment at every Saaty value
+        as one batch and keeps the edit that lowers CR the most"""
+        n = len(log_matrix)
+        upper_i, upper_j = np.triu_indices(n, 1)
+        given = ~np.isnan(log_matrix[upper_i, upper_j])
+        pair_i, pair_j = upper_i[given], upper_j[given]
+        scale = np.log(self.SAATY_SCALE)
+        
+        current = log_matrix.copy()
+        completed, _ = self._complete_log_judgments(current[None])
+        cr = float(self._calculate_priority_vectors(np.exp(completed[0]))["cr"])
+        edits = []
+        while cr >= cr_threshold and len(edits) < max_edits and len(pair_i):
+            rows, cols = np.repeat(pair_i, len(scale)), np.repeat(pair_j, len(scale))
+            values = np.tile(scale, len(pair_i))
+            candidates = np.repeat(current[None], len(values), axis=0)
+            index = np.arange(len(values))
+            candidates[index, rows, cols] = values
+            candidates[index, cols, rows] = -values
             
-            # Calculate priorities
-            criteria_weights = self._calculate_eigenvector(criteria_matrix)
-            alternative_scores = []
+            completed, _ = self._complete_log_judgments(candidates)
+            candidate_cr = self._calculate_priority_vectors(np.exp(completed))["cr"]
+            best = int(np.argmin(candidate_cr))
+            if candidate_cr[best] >= cr - 1e-12:
+                break
             
-            for matrix in alternative_matrices:
-                scores = self._calculate_eigenvector(matrix)
-                alternative_scores.append(scores)
+            i, j = rows[best], cols[best]
+            edits.append({
+                "row": int(i),
+                "col": int(j),
+                "current": float(np.exp(current[i, j])),
+                "suggested": float(self.SAATY_SCALE[best % len(scale)]),
+                "cr_after": float(candidate_cr[best])
+            })
+            current[i, j], current[j, i] = values[best], -values[best]
+            cr = float(candidate_cr[best])
+            keep = ~((pair_i == i) & (pair_j == j))
+            pair_i, pair_j = pair_i[keep], pair_j[keep]
+        return edits, cr
+    
+    def perform_sensitivity_analysis(self, anp_results, n_perturbations=10000, concentration=50.0,
+                                     grid_points=101, seed=None):
+        """Rank-reversal probabilities and weight thresholds for an ANP or AHP result"""
+        try:
+            criteria, alternatives = anp_results["criteria"], anp_results["alternatives"]
+            supermatrix = anp_results.get("supermatrix")
+            shares = (
+                np.asarray(supermatrix)[len(criteria):, :len(criteria)].sum(axis=0)
+                if supermatrix is not None else None
+            )
+            engine = SensitivityEngine(anp_results["criteria_weights"], anp_results["alternative_priorities"], shares)
             
-            # Final priorities
-            final_scores = np.zeros(n_alternatives)
-            for i, weight in enumerate(criteria_weights):
-                final_scores += weight * alternative_scores[i]
+            simulation = engine.monte_carlo(n_perturbations, concentration, np.random.default_rng(seed))
+            grid, sweep = engine.sweep(grid_points)
+            thresholds = engine.thresholds()
+            for criterion, threshold in zip(criteria, thresholds):
+                threshold["criterion"] = criterion
+                for side in ("lower_winner", "upper_winner"):
+                    if threshold[side] is not None:
+                        threshold[side] = alternatives[threshold[side]]
             
-            # Create results
-            results = {
+            return {
                 "criteria": criteria,
                 "alternatives": alternatives,
-                "criteria_weights": criteria_weights.tolist(),
-                "final_scores": final_scores.tolist(),
-                "ranking": sorted(zip(alternatives, final_scores), key=lambda x: x[1], reverse=True),
-                "consistency_ratio": np.random.uniform(0.05, 0.12)  # Simulated CR
+                "n_perturbations": n_perturbations,
+                "concentration": concentration,
+                **simulation,
+                "thresholds": thresholds,
+                "sweep_grid": grid,
+                "sweep_scores": sweep
             }
             
-            return results
-            
         except Exception as e:
-            return {"error": f"ANP Analysis error: {str(e)}"}
+            return {"error": f"Sensitivity analysis error: {str(e)}"}
     
-    def perform_scenario_analysis(self, base_params, n_simulations=1000):
-        """Monte Carlo scenario analysis"""
+    def perform_scenario_analysis(self, base_params, n_simulations=1000, correlation=None, seed=None,
+                                  streaming=None, progress_callback=None, n_workers=1):
+        """Monte Carlo scenario analysis with optional parameter correlation"""
         try:
-            results = {}
-            
-            for param, config in base_params.items():
-                if config['distribution'] == 'normal':
-                    samples = np.random.normal(config['mean'], config['std'], n_simulations)
-                elif config['distribution'] == 'uniform':
-                    samples = np.random.uniform(config['min'], config['max'], n_simulations)
-                elif config['distribution'] == 'beta':
-                    samples = np.random.beta(config['alpha'], config['beta'], n_simulations)
-                else:
-                    samples = np.random.normal(config.get('mean', 100), config.get('std', 10), n_simulations)
-                
-                results[param] = {
-                    'samples': samples.tolist(),
-                    'mean': float(np.mean(samples)),
-                    'std': float(np.std(samples)),
-                    'percentiles': {
-                        '5th': float(np.percentile(samples, 5)),
-                        '25th': float(np.percentile(samples, 25)),
-                        '50th': float(np.percentile(samples, 50)),
-                        '75th': float(np.percentile(samples, 75)),
-                        '95th': float(np.percentile(samples, 95))
-                    }
-                }
+            if n_simulations < 1:
+                raise ValueError("the number of simulations must be at least 1")
+            engine = MonteCarloEngine(base_params, correlation=correlation)
+            if streaming is None:
+                streaming = n_simulations > self.config.MC_STREAMING_THRESHOLD or n_workers > 1
             
-            return results
+            if streaming:
+                # Bounded memory: running moments plus quantile sketches, no sample buffer
+                moments, sketches = engine.run_streaming(
+                    n_simulations, seed=seed, progress_callback=progress_callback, n_workers=n_workers
+                )
+                return engine.summarize_streaming(moments, sketches)
+            
+            samples = engine.run(n_simulations, np.random.default_rng(seed))
+            if progress_callback is not None:
+                progress_callback(n_simulations, n_simulations)
+            return engine.summarize(samples)
             
         except Exception as e:
             return {"error": f"Scenario analysis error: {str(e)}"}
     
-    def _generate_comparison_matrix(self, n):
+    def _generate_comparison_matrix(self, n, rng=None):
         """Generate random pairwise comparison matrix"""
-        matrix = np.ones((n, n))
-        for i in range(n):
-            for j in range(i+1, n):
-                value = np.random.uniform(1/9, 9)
-                matrix[i, j] = value
-                matrix[j, i] = 1/value
-        return matrix
+        return self._generate_comparison_matrices(1, n, rng)[0]
+    
+    def _generate_comparison_matrices(self, k, n, rng=None):
+        """Stack of k random reciprocal (n, n) comparison matrices from a single draw"""
+        rng = rng if rng is not None else np.random.default_rng()
+        upper_i, upper_j = np.triu_indices(n, 1)
+        values = rng.uniform(1/9, 9, size=(k, len(upper_i)))
+        
+        matrices = np.ones((k, n, n))
+        matrices[:, upper_i, upper_j] = values
+        matrices[:, upper_j, upper_i] = 1 / values
+        return matrices
     
     def _calculate_eigenvector(self, matrix):
         """Calculate principal eigenvector for priorities"""
-        eigenvals, eigenvecs = np.linalg.eig(matrix)
-        max_idx = np.argmax(eigenvals.real)
-        eigenvector = eigenvecs[:, max_idx].real
-        return eigenvector / eigenvector.sum()
+        return self._calculate_priority_vectors(matrix)["weights"]
+    
+    def _calculate_priority_vectors(self, matrices, tol=1e-12, max_iter=500):
+        """Perron eigenvectors, lambda_max, CI and CR for one (n, n) or a stack of (k, n, n) matrices.
+        
+        Batched power iteration started from the row geometric means, which are already close
+        to the principal eigenvector of a positive reciprocal matrix.
+        """
+        matrices = np.asarray(matrices, dtype=np.float64)
+        single = matrices.ndim == 2
+        if single:
+            matrices = matrices[None]
+        n = matrices.shape[-1]
+        
+        weights = np.exp(np.log(matrices).mean(axis=2))
+        weights /= weights.sum(axis=1, keepdims=True)
+        for _ in range(max_iter):
+            updated = np.matmul(matrices, weights[..., None])[..., 0]
+            updated /= updated.sum(axis=1, keepdims=True)
+            converged = np.abs(updated - weights).max() < tol
+            weights = updated
+            if converged:
+                break
+        
+        # With weights summing to one, lambda_max is the sum of A @ w
+        lambda_max = np.matmul(matrices, weights[..., None])[..., 0].sum(axis=1)
+        ci = (lambda_max - n) / (n - 1) if n > 2 else np.zeros(len(matrices))
+        ri = self._random_consistency_index(n)
+        cr = ci / ri if ri > 0 else np.zeros(len(matrices))
+        
+        result = {"weights": weights, "lambda_max": lambda_max, "ci": ci, "cr": cr}
+        return {key: value[0] for key, value in result.items()} if single else result
+    
+    @staticmethod
+    def _random_consistency_index(n):
+        """Saaty's random index; beyond the table, the 1.98 (n - 2) / n curve scaled to meet its last entry"""
+        table = [0.0, 0.0, 0.0, 0.58, 0.90, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49, 1.51, 1.48, 1.56, 1.57, 1.59]
+        if n < len(table):
+            return table[n]
+        last = len(table) - 1
+        return table[last] * ((n - 2) / n) / ((last - 2) / last)
+    
+    def fingerprint(self, data):
+        """dataframe_fingerprint, remembered for the last frame object (session frames are never edited in place).
+        
+        While session statistics are held, the same pass fingerprints the rows they were built
+        from, so recognising an append costs no second hash.
+        """
+        if self._last_fingerprint is not None and self._last_fingerprint[0] is data:
+            return self._last_fingerprint[1]
+        prefix_rows = len(self._incremental[0]) if self._incremental is not None else None
+        if prefix_rows is not None and prefix_rows <= len(data):
+            fingerprint, prefix = dataframe_fingerprint(data, prefix_rows)
+        else:
+            fingerprint, prefix_rows, prefix = dataframe_fingerprint(data), None, None
+        self._last_fingerprint = (data, fingerprint, prefix_rows, prefix)
+        return fingerprint
+    
+    def _prefix_fingerprint(self, data, rows):
+        """Fingerprint of data.iloc[:rows], taken from the last fingerprint pass when it covered them"""
+        self.fingerprint(data)
+        _, _, prefix_rows, prefix = self._last_fingerprint
+        return prefix if prefix_rows == rows else dataframe_fingerprint(data.iloc[:rows])
+    
+    def analyze_multimodal_data(self, data, correlation_method="pearson", use_cache=True):
+        """Comprehensive multimodal data analysis, cached by data fingerprint"""
+        key = None
+        if use_cache:
+            try:
+                key = (self.fingerprint(data), correlation_method)
+            except TypeError:
+                key = None  # Unhashable cell values - analyse without caching
+        
+        if key is not None:
+            cached = self.analysis_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        analysis = self._compute_multimodal_analysis(data, correlation_method)
+        if key is not None and "error" not in analysis:
+            self.analysis_cache.put(key, analysis)
+        return analysis
+    
+    def _cached_aggregate(self, data, kind, build):
+        """build() for this dataset version, kept in the aggregate cache under (fingerprint, kind)"""
+        try:
+            key = (self.fingerprint(data), kind)
+        except TypeError:
+            return build()  # Unhashable cell values - build without caching
+        return self.aggregate_cache.get_or_compute(key, build)
+    
+    def time_series_store(self, data):
+        """TimeSeriesStore for data (None without a datetime column), kept in the aggregate cache"""
+        return self._cached_aggregate(data, "time_series", lambda: TimeSeriesStore.from_data(data))
+    
+    def olap_cube(self, data):
+        """OLAPCube over the configured dimensions for this dataset version, kept in the aggregate cache"""
+        return self._cached_aggregate(data, "olap_cube", lambda: OLAPCube(data))
+    
+    def department_cube(self, data):
+        """DepartmentCube for this dataset version, built once and kept in the aggregate cache"""
+        return self._cached_aggregate(data, "department_cube", lambda: DepartmentCube(data))
+    
+    def build_visualization(self, data, viz_type, x_col=None, y_col=None, color_col=None, theme="Dark",
+                            time_resolution="auto", rolling_window=7):
+        """create_enhanced_visualizations through the shared figure cache.
+        
+        Figures are stored serialized, keyed by data fingerprint, chart settings and theme, so
+        returning to a chart rebuilds it from JSON instead of recomputing it.
+        """
+        try:
+            key = (self.fingerprint(data), viz_type, x_col, y_col, color_col, theme, time_resolution, rolling_window)
+        except TypeError:
+            key = None  # Unhashable cell values - build without caching
+        
+        if key is not None:
+            cached = self.figure_cache.get(key)
+            if cached is not None:
+                return pio.from_json(cached)
+        
+        time_series = self.time_series_store(data) if viz_type == "time_series" else None
+        cube = self.department_cube(data) if viz_type in ("radar_chart", "department_performance") else None
+        fig = create_enhanced_visualizations(data, viz_type, x_col, y_col, color_col, theme,
+                                             time_resolution, rolling_window, time_series, cube)
+        if key is not None and fig is not None:
+            self.figure_cache.put(key, fig.to_json())
+        return fig
+    
+    def _row_delta(self, previous, previous_fingerprint, data):
+        """(removed, added) rows turning previous into data, matched by index label, or None.
+        
+        An append is recognised from the length plus the fingerprint of the prefix; other
+        changes need unique labels, unchanged shared rows and fewer changed rows than kept ones.
+        """
+        if not (previous.index.is_unique and data.index.is_unique):
+            return None
+        n = len(previous)
+        if len(data) >= n and data.index[:n].equals(previous.index):
+            if self._prefix_fingerprint(data, n) != previous_fingerprint:
+                return None
+            return data.iloc[:0], data.iloc[n:]
+        
+        in_data = previous.index.isin(data.index)
+        in_previous = data.index.isin(previous.index)
+        removed, added = previous[~in_data], data[~in_previous]
+        if len(removed) + len(added) >= in_previous.sum():
+            return None  # Mostly new rows - a rebuild is no slower
+        kept = data if in_previous.all() else data[in_previous]
+        if not previous[in_data].reset_index(drop=True).equals(kept.reset_index(drop=True)):
+            return None
+        return removed, added
+    
+    def _incremental_statistics(self, data, numeric_cols):
+        """Session statistics brought up to date with data in O(changed rows).
+        
+        Rows appended to the frame analysed last are folded in and rows that disappeared from
+        it (e.g. dropped by a filter) are subtracted; any other change rebuilds them.
+        """
+        group_column = 'Department' if 'Department' in data.columns else None
+        try:
+            fingerprint = self.fingerprint(data)
+        except TypeError:
+            self._incremental = None  # Unhashable cell values - nothing to match against
+            return IncrementalStatistics(numeric_cols, group_column, data.columns).update(data)
+        
+        delta = None
+        if self._incremental is not None:
+            previous, previous_fingerprint, stats = self._incremental
+            if stats.compatible(data, numeric_cols, group_column):
+                delta = self._row_delta(previous, previous_fingerprint, data)
+        if delta is None:
+            stats = IncrementalStatistics(numeric_cols, group_column, data.columns).update(data)
+        else:
+            removed, added = delta
+            if len(removed):
+                stats.remove(removed)
+            if len(added):
+                stats.update(added)
+        self._incremental = (data, fingerprint, stats)
+        return stats
     
-    def analyze_multimodal_data(self, data):
-        """Comprehensive multimodal data analysis"""
+    def _compute_multimodal_analysis(self, data, correlation_method="pearson"):
         try:
             analysis = {
                 "summary": {},
@@ -793,55 +3098,218 @@ Integrate multiple data sources for comprehensive healthcare insights.
             
             # Basic summary statistics
             numeric_cols = data.select_dtypes(include=[np.number]).columns
-            categorical_cols = data.select_dtypes(include=['object']).columns
+            categorical_cols = categorical_columns(data)
+            
+            stats = self._incremental_statistics(data, numeric_cols)
             
             analysis["summary"] = {
                 "total_records": len(data),
                 "numeric_features": len(numeric_cols),
                 "categorical_features": len(categorical_cols),
-                "missing_data": data.isnull().sum().to_dict()
+                "missing_data": stats.missing_counts()
             }
             
             # Correlation analysis
             if len(numeric_cols) > 1:
-                corr_matrix = data[numeric_cols].corr()
+                if correlation_method == "pearson":
+                    corr_matrix = stats.correlation()
+                else:
+                    corr_matrix = data[numeric_cols].corr(method=correlation_method)
                 analysis["correlations"] = corr_matrix.to_dict()
             
             # Pattern detection
             if 'Department' in data.columns:
-                dept_stats = data.groupby('Department').agg({
-                    col: ['mean', 'std'] for col in numeric_cols if col in data.columns
-                }).round(2)
+                dept_stats = stats.group_summary().round(2)
                 analysis["patterns"]["department_analysis"] = dept_stats.to_dict()
             
-            # Generate insights
-            insights = []
-            if 'HCAHPS_Overall' in data.columns:
-                avg_hcahps = data['HCAHPS_Overall'].mean()
-                if avg_hcahps >= 9:
-                    insights.append("🟢 Excellent patient experience scores - maintain current practices")
-                elif avg_hcahps >= 8:
-                    insights.append("🟡 Good patient experience with room for improvement")
-                else:
-                    insights.append("🔴 Patient experience needs immediate attention")
+            analysis["insights"] = self._generate_insights(stats.means())
+            return analysis
             
-            if 'Safety_Score' in data.columns:
-                avg_safety = data['Safety_Score'].mean()
-                if avg_safety >= 95:
-                    insights.append("🟢 Outstanding safety performance")
-                elif avg_safety >= 90:
-                    insights.append("🟡 Good safety scores with improvement opportunities")
+        except Exception as e:
+            return {"error": f"Multimodal analysis error: {str(e)}"}
+    
+    def analyze_csv_stream(self, source, total_bytes=None, chunk_rows=None, preview_rows=None,
+                           progress_callback=None):
+        """Multimodal analysis of a CSV streamed in row chunks, never holding the full frame.
+        
+        source is a path or binary file object. Column types come from the first chunk; numeric
+        columns in later chunks are coerced, so stray text becomes missing. Correlations are
+        Pearson only. The result matches analyze_multimodal_data plus a preview sample.
+        """
+        chunk_rows = chunk_rows or self.config.CSV_CHUNK_ROWS
+        preview_rows = preview_rows or self.config.STREAMING_PREVIEW_ROWS
+        handle = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+        try:
+            if total_bytes is None and isinstance(source, (str, os.PathLike)):
+                total_bytes = os.path.getsize(source)
+            
+            stats, preview, numeric_cols, categorical_cols, n_chunks = None, None, None, None, 0
+            for chunk in pd.read_csv(handle, chunksize=chunk_rows):
+                if stats is None:
+                    numeric_cols = chunk.select_dtypes(include=[np.number]).columns
+                    categorical_cols = categorical_columns(chunk)
+                    group_column = 'Department' if 'Department' in chunk.columns else None
+                    stats = IncrementalStatistics(numeric_cols, group_column, chunk.columns)
+                    preview = chunk.head(preview_rows).copy()
+                elif list(chunk.columns) != stats.all_columns:
+                    raise ValueError("CSV columns changed between chunks")
                 else:
-                    insights.append("🔴 Safety improvement required - priority focus needed")
+                    for col in numeric_cols:
+                        if not pd.api.types.is_numeric_dtype(chunk[col]):
+                            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+                
+                stats.update(chunk)
+                n_chunks += 1
+                if progress_callback is not None:
+                    progress_callback(handle.tell() if total_bytes else None, total_bytes, stats.n_rows)
+            
+            if stats is None or stats.n_rows == 0:
+                raise ValueError("CSV file has no data rows")
             
-            analysis["insights"] = insights
+            analysis = {
+                "summary": {
+                    "total_records": stats.n_rows,
+                    "numeric_features": len(numeric_cols),
+                    "categorical_features": len(categorical_cols),
+                    "missing_data": stats.missing_counts()
+                },
+                "correlations": stats.correlation().to_dict() if len(numeric_cols) > 1 else {},
+                "patterns": {},
+                "insights": self._generate_insights(stats.means()),
+                "streamed": True,
+                "chunks": n_chunks,
+                "sample": preview
+            }
+            if stats.group_column is not None:
+                analysis["patterns"]["department_analysis"] = stats.group_summary().round(2).to_dict()
             return analysis
             
         except Exception as e:
-            return {"error": f"Multimodal analysis error: {str(e)}"}
+            return {"error": f"Streaming analysis error: {str(e)}"}
+        finally:
+            if handle is not source:
+                handle.close()
+    
+    def _generate_insights(self, means):
+        """Quality insights from overall column means"""
+        insights = []
+        if 'HCAHPS_Overall' in means:
+            avg_hcahps = means['HCAHPS_Overall']
+            if avg_hcahps >= 9:
+                insights.append("🟢 Excellent patient experience scores - maintain current practices")
+            elif avg_hcahps >= 8:
+                insights.append("🟡 Good patient experience with room for improvement")
+            else:
+                insights.append("🔴 Patient experience needs immediate attention")
+        
+        if 'Safety_Score' in means:
+            avg_safety = means['Safety_Score']
+            if avg_safety >= 95:
+                insights.append("🟢 Outstanding safety performance")
+            elif avg_safety >= 90:
+                insights.append("🟡 Good safety scores with improvement opportunities")
+            else:
+                insights.append("🔴 Safety improvement required - priority focus needed")
+        
+        return insights
+
+def stratified_sample(data, n, by=None, seed=0):
+    """At most about n rows, sampled at random within each group of `by` in proportion to its size.
+    
+    Every group keeps at least one row, so small departments stay visible; row order is preserved.
+    """
+    if len(data) <= n:
+        return data
+    rng = np.random.default_rng(seed)
+    if by is not None and by in data.columns:
+        codes, groups = pd.factorize(data[by], use_na_sentinel=False)
+    else:
+        codes, groups = np.zeros(len(data), dtype=np.int64), [None]
+    sizes = np.bincount(codes, minlength=len(groups))
+    quotas = np.minimum(np.maximum(np.floor(n * sizes / len(data)), 1), sizes).astype(np.int64)
+    
+    # Random order within each group, then keep the first quota rows of every group
+    order = np.argsort(codes + rng.random(len(data)))
+    rank = np.arange(len(data)) - (np.cumsum(sizes) - sizes)[codes[order]]
+    keep = np.sort(order[rank < quotas[codes[order]]])
+    return data.iloc[keep]
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: positions of n_out points that keep the visual shape of a line"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x = np.nanmean(x[end:edges[i + 2]])
+        next_y = np.nanmean(y[end:edges[i + 2]])
+        area = np.abs((x[anchor] - next_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (next_y - y[anchor]))
+        anchor = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = anchor
+    return selected
+
+def create_scatter_figure(data, x, y, z=None, color=None, size=None, title="", template="plotly_dark", **kwargs):
+    """2D or 3D scatter rendered within the configured point budget.
+    
+    Small frames plot as before; larger ones switch to WebGL, then to a stratified sample
+    (by the colour column when it is categorical), and 2D plots of numeric columns past the
+    density threshold become a server-side binned heatmap. The title keeps the exact row count.
+    """
+    n_rows = len(data)
+    numeric = all(pd.api.types.is_numeric_dtype(data[col]) for col in (x, y))
+    if z is None and numeric and n_rows > HealthConfig.SCATTER_DENSITY_POINTS:
+        values = data[[x, y]].to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values).all(axis=1)]
+        counts, x_edges, y_edges = np.histogram2d(values[:, 0], values[:, 1], bins=HealthConfig.DENSITY_BINS)
+        fig = go.Figure(go.Heatmap(
+            z=np.where(counts.T > 0, counts.T, np.nan),
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            colorscale="Viridis",
+            colorbar=dict(title="Rows")
+        ))
+        fig.update_layout(
+            title=f"{title}<br><sup>{n_rows:,} rows binned into a {HealthConfig.DENSITY_BINS}×{HealthConfig.DENSITY_BINS} density grid</sup>",
+            xaxis_title=x,
+            yaxis_title=y,
+            template=template
+        )
+        return fig
+    
+    plot_data = data
+    note = None
+    if n_rows > HealthConfig.SCATTER_POINT_BUDGET:
+        stratify = color if color in categorical_columns(data) else None
+        plot_data = stratified_sample(data, HealthConfig.SCATTER_POINT_BUDGET, by=stratify)
+        note = f"{len(plot_data):,} of {n_rows:,} rows shown ({'stratified ' if stratify else ''}random sample)"
+    elif n_rows > HealthConfig.SCATTER_WEBGL_POINTS:
+        note = f"{n_rows:,} rows (WebGL)"
+    if note:
+        title = f"{title}<br><sup>{note}</sup>"
+    
+    if z is not None:
+        # 3D scatter is always WebGL
+        fig = px.scatter_3d(plot_data, x=x, y=y, z=z, color=color, size=size, title=title, **kwargs)
+    else:
+        render_mode = "webgl" if len(plot_data) > HealthConfig.SCATTER_WEBGL_POINTS else "auto"
+        fig = px.scatter(plot_data, x=x, y=y, color=color, size=size, title=title,
+                         render_mode=render_mode, **kwargs)
+    fig.update_layout(template=template)
+    return fig
 
-def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color_col=None):
+def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color_col=None, theme="Dark",
+                                   time_resolution="auto", rolling_window=7, time_series=None, department_cube=None):
     """Create enhanced interactive visualizations"""
+    template = HealthConfig.THEMES.get(theme, HealthConfig.THEMES["Dark"])["plotly_template"]
     try:
         if viz_type == "correlation_heatmap":
             numeric_cols = data.select_dtypes(include=[np.number]).columns
@@ -855,7 +3323,7 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
                     text_auto=True
                 )
                 fig.update_layout(
-                    template="plotly_dark",
+                    template=template,
                     height=600,
                     title_font_size=16
                 )
@@ -863,15 +3331,40 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
         
         elif viz_type == "department_performance":
             if 'Department' in data.columns and y_col:
-                fig = px.box(
-                    data,
-                    x='Department',
-                    y=y_col,
-                    title=f"🏥 {y_col} by Department",
-                    color='Department'
-                )
+                # Boxes drawn from precomputed quartiles and fences instead of every row
+                cube = department_cube or DepartmentCube(data)
+                boxes = cube.box_stats(y_col)
+                palette = px.colors.qualitative.Plotly
+                fig = go.Figure()
+                for i, (dept, box) in enumerate(boxes[boxes['count'] > 0].iterrows()):
+                    color = palette[i % len(palette)]
+                    fig.add_trace(go.Box(
+                        name=str(dept),
+                        x=[str(dept)],
+                        q1=[box['q1']],
+                        median=[box['median']],
+                        q3=[box['q3']],
+                        mean=[box['mean']],
+                        lowerfence=[box['lowerfence']],
+                        upperfence=[box['upperfence']],
+                        marker_color=color,
+                        legendgroup=str(dept)
+                    ))
+                    if len(box['outliers']):
+                        fig.add_trace(go.Scatter(
+                            x=[str(dept)] * len(box['outliers']),
+                            y=box['outliers'],
+                            mode='markers',
+                            marker=dict(color=color, size=5),
+                            name=f"{dept} outliers",
+                            legendgroup=str(dept),
+                            showlegend=False
+                        ))
                 fig.update_layout(
-                    template="plotly_dark",
+                    title=f"🏥 {y_col} by Department<br><sup>{int(boxes['count'].sum()):,} rows summarized</sup>",
+                    xaxis_title='Department',
+                    yaxis_title=y_col,
+                    template=template,
                     height=500,
                     xaxis_tickangle=-45
                 )
@@ -880,7 +3373,7 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
         elif viz_type == "scatter_3d":
             if x_col and y_col and color_col:
                 size_col = 'Total_Cost' if 'Total_Cost' in data.columns else None
-                fig = px.scatter_3d(
+                fig = create_scatter_figure(
                     data,
                     x=x_col,
                     y=y_col,
@@ -888,33 +3381,53 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
                     color=color_col,
                     size=size_col,
                     title=f"🔮 3D Analysis: {x_col} vs {y_col} vs {color_col}",
+                    template=template,
                     opacity=0.7
                 )
-                fig.update_layout(
-                    template="plotly_dark",
-                    height=700
-                )
+                fig.update_layout(height=700)
                 return fig
         
         elif viz_type == "time_series":
-            if 'Patient_ID' in data.columns:
-                # Create synthetic time series based on patient IDs
-                data_copy = data.copy()
-                data_copy['Date'] = pd.date_range(start='2024-01-01', periods=len(data), freq='D')
-                
-                if y_col:
-                    fig = px.line(
-                        data_copy,
-                        x='Date',
-                        y=y_col,
-                        title=f"📈 Time Series: {y_col}",
-                        markers=True
-                    )
-                    fig.update_layout(
-                        template="plotly_dark",
-                        height=500
-                    )
-                    return fig
+            store = time_series if time_series is not None else TimeSeriesStore.from_data(data)
+            if store is not None and y_col in store.columns:
+                resolution = time_resolution
+                if resolution not in store.RESOLUTIONS:
+                    resolution = store.resolution_for(HealthConfig.TIME_SERIES_AUTO_POINTS)
+                series = store.series(y_col, resolution, rolling_window)
+                title = (f"📈 {store.RESOLUTIONS[resolution]} {y_col} by {store.date_column}"
+                         f"<br><sup>{store.n_dated:,} dated rows of {store.n_rows:,}</sup>")
+                # Very long daily series keep their shape with LTTB instead of sending every bucket
+                keep = lttb_indices(series.index.asi8, series['mean'].to_numpy(), HealthConfig.LINE_POINT_BUDGET)
+                shown = series.iloc[keep]
+                
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=shown.index, y=shown['mean'], mode='lines+markers' if len(shown) <= 400 else 'lines',
+                    name=f"Mean {y_col}", customdata=shown['count'],
+                    hovertemplate="%{x|%Y-%m-%d}<br>Mean: %{y:.2f}<br>Rows: %{customdata:,}<extra></extra>"
+                ))
+                fig.add_trace(go.Scatter(
+                    x=shown.index, y=shown['rolling_mean'], mode='lines', name=f"{rolling_window}-period rolling mean"
+                ))
+                for limit, dash in [('center', 'solid'), ('ucl', 'dash'), ('lcl', 'dash')]:
+                    fig.add_trace(go.Scatter(
+                        x=shown.index, y=shown[limit], mode='lines', name=limit.upper(),
+                        line=dict(dash=dash, width=1, color='#ff3d71' if limit != 'center' else '#e0e0e0')
+                    ))
+                flagged = series[series['out_of_control']]
+                if len(flagged):
+                    fig.add_trace(go.Scatter(
+                        x=flagged.index, y=flagged['mean'], mode='markers', name="Out of control",
+                        marker=dict(color='#ff3d71', size=10, symbol='x')
+                    ))
+                fig.update_layout(
+                    title=title,
+                    xaxis_title=store.date_column,
+                    yaxis_title=y_col,
+                    template=template,
+                    height=500
+                )
+                return fig
         
         elif viz_type == "radar_chart":
             if 'Department' in data.columns:
@@ -923,7 +3436,8 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
                 available_cols = [col for col in numeric_cols if col in data.columns]
                 
                 if len(available_cols) >= 3:
-                    dept_means = data.groupby('Department')[available_cols].mean()
+                    cube = department_cube or DepartmentCube(data)
+                    dept_means = cube.stat("mean")[available_cols]
                     
                     fig = go.Figure()
                     
@@ -942,26 +3456,24 @@ def create_enhanced_visualizations(data, viz_type, x_col=None, y_col=None, color
                                 range=[0, 100]
                             )),
                         title="🎯 Department Performance Radar",
-                        template="plotly_dark",
+                        template=template,
                         height=600
                     )
                     return fig
         
         else:
             # Default scatter plot
-            fig = px.scatter(
+            fig = create_scatter_figure(
                 data,
                 x=x_col or 'Age',
                 y=y_col or 'Total_Cost',
                 color=color_col or 'Department',
                 title=f"📊 {y_col or 'Total_Cost'} vs {x_col or 'Age'}",
                 size='Length_of_Stay' if 'Length_of_Stay' in data.columns else None,
+                template=template,
                 hover_data=['Patient_ID'] if 'Patient_ID' in data.columns else None
             )
-            fig.update_layout(
-                template="plotly_dark",
-                height=500
-            )
+            fig.update_layout(height=500)
             return fig
     
     except Exception as e:
@@ -994,11 +3506,11 @@ def create_comprehensive_sample_data():
     # Generate realistic healthcare metrics
     data = {
         'Patient_ID': [f'PT{i:05d}' for i in range(1, n+1)],
-        'Age': np.random.gamma(3.5, 18).astype(int).clip(18, 95),
+        'Age': np.random.gamma(3.5, 18, n).astype(int).clip(18, 95),
         'Gender': np.random.choice(['Male', 'Female'], n, p=[0.47, 0.53]),
         'Department': np.random.choice(departments, n),
-        'Length_of_Stay': np.random.exponential(4.2).round(1).clip(1, 28),
-        'Total_Cost': np.random.lognormal(9.3, 0.75).round(2),
+        'Length_of_Stay': np.random.exponential(4.2, n).round(1).clip(1, 28),
+        'Total_Cost': np.random.lognormal(9.3, 0.75, n).round(2),
         'HCAHPS_Overall': np.random.beta(7, 2.5, n) * 10,
         'Safety_Score': np.random.beta(8.5, 1.5, n) * 100,
         'Communication_Score': np.random.normal(83, 13, n).clip(35, 100),
@@ -1022,35 +3534,212 @@ def create_comprehensive_sample_data():
     
     df = pd.DataFrame(data)
     
+    # Admission dates across 2024, drawn last so the columns above keep their values
+    df['Admission_Date'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.random.randint(0, 366, n), unit='D')
+    
     # Add sentiment analysis
-    sentiments = []
-    for feedback in df['Patient_Feedback']:
-        sentiment, _ = analyze_sentiment(feedback)
-        sentiments.append(sentiment)
-    df['Sentiment'] = sentiments
+    sentiment = analyze_sentiment_batch(df['Patient_Feedback'])
+    df['Sentiment'] = sentiment['Sentiment']
+    df['Sentiment_Score'] = sentiment['Sentiment_Score'].round(2)
     
     return df
 
+class SentimentEngine:
+    """Lexicon sentiment with whole-word tokens, phrases, negation scope, intensifiers and "but" contrast.
+    
+    Scoring follows VADER: each sentiment word contributes its valence, boosted by preceding
+    intensifiers (decaying with distance), flipped and damped by a negator up to three tokens
+    before it in the same clause, halved before a "but" and raised by half after it. The summed
+    valence is normalized to a compound score in [-1, 1].
+    """
+    TOKEN_PATTERN = re.compile(r"[a-z0-9']+|[.,;:!?]")
+    PUNCTUATION = set(".,;:!?")
+    NEGATION_SCALAR = -0.74
+    INTENSIFIER_DECAY = (1.0, 0.95, 0.9)
+    CONTRAST_WEIGHTS = (0.5, 1.5)
+    ALPHA = 15.0
+    CHUNK_TEXTS = 200_000
+    
+    def __init__(self, lexicon=None, phrases=None, negators=None, intensifiers=None, threshold=0.05):
+        self.lexicon = {k.lower(): float(v) for k, v in (lexicon or HealthConfig.SENTIMENT_LEXICON).items()}
+        self.phrases = {tuple(k.lower().split()): float(v)
+                        for k, v in (phrases or HealthConfig.SENTIMENT_PHRASES).items()}
+        self.negators = {w.lower() for w in (negators or HealthConfig.SENTIMENT_NEGATORS)}
+        self.intensifiers = {k.lower(): float(v) for k, v in (intensifiers or HealthConfig.SENTIMENT_INTENSIFIERS).items()}
+        self.threshold = threshold
+        if any(len(words) != 2 for words in self.phrases):
+            raise ValueError("Sentiment phrases must be two words")
+        # Every token the engine reacts to, with its role, in one hash lookup
+        self.roles = {}
+        words = set(self.lexicon) | self.negators | set(self.intensifiers) | {"but"}
+        for word in words | {w for phrase in self.phrases for w in phrase}:
+            self.roles[word] = (self.lexicon.get(word, 0.0), word in self.negators,
+                                self.intensifiers.get(word, 0.0), word == "but")
+    
+    def _tokenize(self, texts):
+        """Flat token codes, vocabulary and per-text token counts.
+        
+        Texts are split on whitespace (vectorized with pyarrow when available); each distinct
+        raw word is then lowercased and broken into word and punctuation tokens only once.
+        """
+        if pa is not None:
+            words = pc.ascii_split_whitespace(pa.array(texts, type=pa.large_string()))
+            offsets = words.offsets.to_numpy()
+            encoded = pc.dictionary_encode(words.flatten())
+            raw_codes, raw_vocabulary = encoded.indices.to_numpy(), encoded.dictionary.to_pylist()
+        else:
+            word_lists = [text.split() for text in texts]
+            offsets = np.concatenate([[0], np.cumsum([len(words) for words in word_lists])])
+            raw_codes, raw_vocabulary = pd.factorize(pd.Series([w for words in word_lists for w in words], dtype=object))
+        
+        pieces = [self.TOKEN_PATTERN.findall(word.lower()) for word in raw_vocabulary]
+        lengths = np.array([len(piece) for piece in pieces], dtype=np.int64)
+        piece_codes, vocabulary = pd.factorize(pd.Series([t for piece in pieces for t in piece], dtype=object))
+        
+        # Expand every raw word into its tokens
+        first_piece = np.cumsum(lengths) - lengths
+        n_pieces = lengths[raw_codes]
+        ends = np.cumsum(n_pieces)
+        within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - n_pieces, n_pieces)
+        codes = piece_codes[np.repeat(first_piece[raw_codes], n_pieces) + within]
+        ends = np.concatenate([[0], ends])
+        return codes, list(vocabulary), ends[offsets[1:]] - ends[offsets[:-1]]
+    
+    def _valences(self, codes, vocabulary, counts):
+        """Summed valence per text"""
+        # Token roles for the whole vocabulary in one hash lookup
+        known = pd.Index(list(self.roles)).get_indexer(vocabulary)
+        roles = np.array(list(self.roles.values()) + [(0.0, False, 0.0, False)])[known]
+        valence, boost = roles[:, 0], roles[:, 2]
+        negator = (roles[:, 1] > 0) | pd.Series(vocabulary, dtype=object).str.endswith("n't").to_numpy(dtype=bool)
+        contrast = roles[:, 3] > 0
+        punctuation = np.isin(np.array(vocabulary, dtype=object), list(self.PUNCTUATION))
+        
+        ends = np.cumsum(counts)
+        text_start = ends - counts
+        base = valence[codes]
+        for (first, second), value in self.phrases.items():
+            if first not in vocabulary or second not in vocabulary:
+                continue
+            hits = np.flatnonzero(codes[:-1] == vocabulary.index(first))
+            hits = hits[(codes[hits + 1] == vocabulary.index(second))
+                        & (np.searchsorted(ends, hits, side="right") == np.searchsorted(ends, hits + 1, side="right"))]
+            base[hits] = value
+            base[hits + 1] = 0.0
+        
+        # Only sentiment-bearing tokens need their context examined
+        positions = np.flatnonzero(base)
+        text_id = np.searchsorted(ends, positions, side="right")
+        scaled = base[positions]
+        breaks = np.concatenate([[0], np.cumsum(punctuation[codes])])
+        negated = np.zeros(len(positions), dtype=bool)
+        for distance, decay in enumerate(self.INTENSIFIER_DECAY, start=1):
+            prior = positions - distance
+            # Same text and no punctuation in between
+            same = (prior >= text_start[text_id]) & (breaks[positions] == breaks[np.maximum(prior, 0) + 1])
+            prior_codes = codes[np.maximum(prior, 0)]
+            scaled += np.where(same, boost[prior_codes] * decay, 0.0) * np.sign(base[positions])
+            negated |= same & negator[prior_codes]
+        scaled = np.where(negated, scaled * self.NEGATION_SCALAR, scaled)
+        
+        # "but": earlier words count less, later ones more
+        buts = np.concatenate([[0], np.cumsum(contrast[codes])])
+        buts_before = buts[positions] - buts[text_start[text_id]]
+        has_but = buts[ends[text_id]] > buts[text_start[text_id]]
+        before, after = self.CONTRAST_WEIGHTS
+        scaled *= np.where(buts_before > 0, after, np.where(has_but, before, 1.0))
+        return np.bincount(text_id, weights=scaled, minlength=len(counts))
+    
+    def score(self, texts):
+        """Compound score in [-1, 1] per text; NaN for missing or empty text"""
+        texts = list(texts)
+        valid = np.array([isinstance(text, str) and bool(text) for text in texts], dtype=bool)
+        scores = np.full(len(texts), np.nan)
+        positions = np.flatnonzero(valid)
+        for chunk in range(0, len(positions), self.CHUNK_TEXTS):
+            rows = positions[chunk:chunk + self.CHUNK_TEXTS]
+            total = self._valences(*self._tokenize([texts[i] for i in rows]))
+            scores[rows] = total / np.sqrt(total * total + self.ALPHA)
+        return scores
+    
+    def labels(self, scores):
+        """Positive / Negative / Neutral by the compound threshold, Unknown for NaN"""
+        scores = np.asarray(scores, dtype=float)
+        return np.select(
+            [np.isnan(scores), scores >= self.threshold, scores <= -self.threshold],
+            ["Unknown", "Positive", "Negative"],
+            default="Neutral"
+        )
+
+SENTIMENT_ENGINE = SentimentEngine()
+
+@st.cache_resource(show_spinner=False)
+def get_sentiment_memo():
+    """Process-wide memo of sentiment scores keyed on normalized feedback text"""
+    return LRUCache(max_entries=HealthConfig.SENTIMENT_MEMO_SIZE)
+
+def normalize_feedback(texts):
+    """Memo keys: lowercased text with whitespace runs collapsed, None when blank or not text.
+    
+    The engine ignores case and spacing, so texts sharing a key always share a score.
+    """
+    return np.array([" ".join(text.lower().split()) or None if isinstance(text, str) else None
+                     for text in texts], dtype=object)
+
+def score_feedback(keys):
+    """Compound scores for distinct normalized keys, served from the memo where possible"""
+    memo = get_sentiment_memo()
+    keys = list(keys)
+    if len(keys) > memo.max_entries:
+        # More distinct texts than the memo holds: caching them would only evict everything
+        return SENTIMENT_ENGINE.score(keys)
+    scores = np.array([memo.get(key, np.nan) for key in keys], dtype=float)
+    missing = np.flatnonzero(np.isnan(scores))
+    if len(missing):
+        scores[missing] = SENTIMENT_ENGINE.score([keys[i] for i in missing])
+        for i in missing:
+            memo.put(keys[i], scores[i])
+    return scores
+
 def analyze_sentiment(text):
     """Enhanced sentiment analysis"""
-    if not text or not isinstance(text, str):
-        return "Unknown", "#666666"
-    
-    positive_words = ['excellent', 'outstanding', 'great', 'good', 'satisfied', 'professional', 
-                     'caring', 'helpful', 'clean', 'comfortable', 'impressed', 'responsive']
-    negative_words = ['bad', 'poor', 'terrible', 'slow', 'problem', 'disappointed', 
-                     'frustrated', 'dirty', 'rude', 'confusing', 'long wait', 'delayed']
-    
-    text_lower = text.lower()
-    positive_count = sum(2 if word in text_lower else 0 for word in positive_words)
-    negative_count = sum(2 if word in text_lower else 0 for word in negative_words)
-    
-    if positive_count > negative_count and positive_count >= 2:
-        return "Positive", "#00ff88"
-    elif negative_count > positive_count and negative_count >= 2:
-        return "Negative", "#ff3d71"
-    else:
-        return "Neutral", "#ff6b35"
+    key = normalize_feedback([text])[0]
+    score = score_feedback([key])[0] if key is not None else np.nan
+    label = str(SENTIMENT_ENGINE.labels([score])[0])
+    return label, HealthConfig.SENTIMENT_COLORS[label]
+
+def analyze_sentiment_batch(texts):
+    """Sentiment for a whole column: same labels as analyze_sentiment plus the compound score.
+    
+    Rows are deduplicated twice, on the exact string and then on its normalized key, so each
+    distinct feedback is scored once (or found in the memo) and broadcast back to its rows.
+    """
+    texts = pd.Series(texts)
+    codes, uniques = pd.factorize(texts)
+    key_codes, keys = pd.factorize(pd.Series(normalize_feedback(uniques), dtype=object))
+    memo = get_sentiment_memo()
+    hits_before = memo.hits
+    scores = score_feedback(keys)
+    labels = SENTIMENT_ENGINE.labels(scores)
+    
+    # Broadcast back to every row; missing or blank values (code -1) are Unknown
+    row_codes = np.append(key_codes, -1)[codes]
+    result = pd.DataFrame({
+        "Sentiment": np.append(labels, "Unknown")[row_codes],
+        "Sentiment_Score": np.append(scores, np.nan)[row_codes]
+    }, index=texts.index)
+    result.attrs["sentiment_stats"] = {
+        "rows": len(texts),
+        "unique_texts": len(keys),
+        "memo_hits": memo.hits - hits_before,
+        "dedupe_ratio": len(texts) / len(keys) if len(keys) else 0.0
+    }
+    return result
+
+@st.cache_resource(show_spinner=False)
+def get_shared_resources():
+    """Process-wide knowledge index and caches, shared across all sessions"""
+    return EnhancedHealthcareAI.build_shared_resources()
 
 def main():
     """Enhanced main application"""
@@ -1063,7 +3752,7 @@ def main():
     
     # Initialize session state
     if 'ai_manager' not in st.session_state:
-        st.session_state.ai_manager = EnhancedHealthcareAI()
+        st.session_state.ai_manager = EnhancedHealthcareAI(get_shared_resources())
     if 'current_data' not in st.session_state:
         st.session_state.current_data = None
     if 'analysis_results' not in st.session_state:
@@ -1076,6 +3765,8 @@ def main():
         st.session_state.anp_results = None
     if 'scenario_results' not in st.session_state:
         st.session_state.scenario_results = None
+    if 'sensitivity_results' not in st.session_state:
+        st.session_state.sensitivity_results = None
     
     # Enhanced sidebar
     with st.sidebar:
@@ -1126,15 +3817,23 @@ def main():
         with col1:
             if st.button("📈 Generate Data", use_container_width=True):
                 with st.spinner("🔄 Generating comprehensive dataset..."):
-                    st.session_state.current_data = create_comprehensive_sample_data()
+                    st.session_state.current_data = st.session_state.ai_manager.ingest_dataframe(
+                        create_comprehensive_sample_data()
+                    )
+                    st.session_state.analysis_results = None
+                    # Forget the last upload so a file still in the uploader loads again
+                    for key in ['loaded_upload', 'streamed_upload', 'upload_source']:
+                        st.session_state.pop(key, None)
                     st.success("✅ Dataset ready!")
                     st.balloons()
                 st.rerun()
         
         with col2:
             if st.button("🧹 Clear All", use_container_width=True):
-                for key in ['current_data', 'analysis_results', 'chat_history', 'anp_results', 'scenario_results']:
+                for key in ['current_data', 'analysis_results', 'chat_history', 'anp_results', 'scenario_results', 'sensitivity_results']:
                     st.session_state[key] = None if 'results' in key else []
+                for key in ['loaded_upload', 'streamed_upload', 'upload_source']:
+                    st.session_state.pop(key, None)
                 st.success("✅ All cleared!")
                 st.rerun()
         
@@ -1142,14 +3841,15 @@ def main():
         if st.session_state.current_data is not None:
             st.markdown("### 📊 Quick Stats")
             data = st.session_state.current_data
+            cube = st.session_state.ai_manager.department_cube(data)
             st.metric("📋 Records", f"{len(data):,}")
             
-            if 'HCAHPS_Overall' in data.columns:
-                avg_hcahps = data['HCAHPS_Overall'].mean()
+            if 'HCAHPS_Overall' in cube.metrics:
+                avg_hcahps = cube.totals('HCAHPS_Overall')['mean']
                 st.metric("😊 HCAHPS", f"{avg_hcahps:.1f}/10")
             
-            if 'Safety_Score' in data.columns:
-                avg_safety = data['Safety_Score'].mean()
+            if 'Safety_Score' in cube.metrics:
+                avg_safety = cube.totals('Safety_Score')['mean']
                 st.metric("🛡️ Safety", f"{avg_safety:.1f}%")
     
     # Load enhanced CSS
@@ -1236,6 +3936,8 @@ For specific analysis methods like ANP/AHP or scenario planning, please explore
         
         # Enhanced chat interface
         st.markdown("#### 💭 Ask Your Healthcare Question")
+        retriever = st.session_state.ai_manager.retriever
+        st.caption(f"📚 {retriever.n_passages:,} knowledge passages indexed from {len(retriever.sources):,} sources")
         
         col1, col2 = st.columns([4, 1])
         with col1:
@@ -1253,31 +3955,9 @@ For specific analysis methods like ANP/AHP or scenario planning, please explore
                     # Generate contextual response
                     context = st.session_state.analysis_results if st.session_state.current_data is not None else None
                     
-                    # Simple knowledge-based response
-                    if "readmission" in user_input.lower():
-                        response = """
-**Reducing Hospital Readmission Rates:**
-
-**Data Analytics Approach:**
-• **Predictive Modeling**: Identify high-risk patients using historical data
-• **Risk Stratification**: Segment patients by readmission probability
-• **Discharge Planning**: Use data to optimize discharge processes
-• **Follow-up Protocols**: Implement data-driven follow-up schedules
-
-**Key Strategies:**
-• Medication reconciliation and education
-• Transitional care programs
-• Patient engagement initiatives
-• Care coordination improvements
-• Social determinants integration
-
-**Analytics Tools:**
-- Machine learning for risk prediction
-- Time series analysis for trend identification
-- Statistical process control for monitoring
-- Dashboard development for real-time tracking
-                        """
-                    else:
+                    # Retrieval-augmented response from the knowledge base
+                    response = st.session_state.ai_manager.generate_rag_response(user_input)
+                    if response is None:
                         response = f"""
 **Healthcare Analysis Insights:**
 
@@ -1362,15 +4042,27 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                                             placeholder="EHR Upgrade, Staff Training Program, Equipment Purchase, Process Redesign",
                                             height=100)
             
+            st.markdown("**Dependencies (optional, one per line):**")
+            dependencies_input = st.text_area("Criteria that influence another criterion:",
+                                              placeholder="Patient Safety, Staff Impact -> Cost Effectiveness",
+                                              height=80)
+            
             if st.button("🔄 Run ANP Analysis", use_container_width=True, type="primary"):
                 if criteria_input and alternatives_input:
                     criteria = [c.strip() for c in criteria_input.split(',') if c.strip()]
                     alternatives = [a.strip() for a in alternatives_input.split(',') if a.strip()]
                     
+                    # "Source A, Source B -> Target" lines become (source, target) pairs
+                    dependencies = []
+                    for line in dependencies_input.splitlines():
+                        if '->' in line:
+                            sources, target = line.split('->', 1)
+                            dependencies += [(src.strip(), target.strip()) for src in sources.split(',') if src.strip()]
+                    
                     with st.spinner("🧮 Performing ANP analysis..."):
-                        results = st.session_state.ai_manager.perform_anp_analysis(criteria, alternatives)
+                        results = st.session_state.ai_manager.perform_anp_analysis(criteria, alternatives, dependencies)
                         st.session_state.anp_results = results
-                        time.sleep(1)  # Simulate processing
+                        st.session_state.sensitivity_results = None
                     
                     st.success("✅ ANP Analysis completed!")
                     st.rerun()
@@ -1408,10 +4100,98 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 fig_weights.update_layout(template="plotly_dark", height=400)
                 st.plotly_chart(fig_weights, use_container_width=True)
                 
+                # Network structure and limit matrix convergence
+                if results.get('dependencies'):
+                    st.markdown("**🔗 Criteria Dependencies:**")
+                    for target, sources in results['dependencies'].items():
+                        st.write(f"• {', '.join(sources)} → {target}")
+                convergence = "converged" if results['converged'] else "did not converge"
+                st.caption(f"Limit matrix {convergence} after {results['iterations']} squarings of the "
+                           f"{len(results['supermatrix'])}×{len(results['supermatrix'])} supermatrix")
+                
                 # Consistency ratio
                 cr = results['consistency_ratio']
                 cr_status = "✅ Acceptable" if cr < 0.1 else "⚠️ Review needed"
                 st.metric("🎯 Consistency Ratio", f"{cr:.3f}", cr_status)
+                alt_crs = results['alternative_consistency_ratios']
+                inconsistent = sum(1 for value in alt_crs if value >= 0.1)
+                st.caption(f"λmax = {results['lambda_max']:.3f} • {inconsistent} of {len(alt_crs)} "
+                           f"alternative comparison matrices have CR ≥ 0.1")
+                
+                # Sensitivity and rank reversal
+                st.markdown("**🎲 Sensitivity & Rank Reversal:**")
+                sens_col1, sens_col2 = st.columns(2)
+                with sens_col1:
+                    n_perturbations = st.select_slider("Weight perturbations:", options=[1000, 5000, 10000, 25000, 50000],
+                                                       value=10000)
+                with sens_col2:
+                    concentration = st.slider("Weight concentration:", 5, 200, 50,
+                                              help="Higher values keep perturbed weights closer to the base weights")
+                
+                if st.button("🎲 Run Sensitivity Analysis", use_container_width=True):
+                    with st.spinner("🎲 Perturbing criteria weights..."):
+                        st.session_state.sensitivity_results = st.session_state.ai_manager.perform_sensitivity_analysis(
+                            results, n_perturbations=n_perturbations, concentration=float(concentration)
+                        )
+                
+                sensitivity = st.session_state.sensitivity_results
+                if sensitivity and 'error' in sensitivity:
+                    st.error(sensitivity['error'])
+                elif sensitivity:
+                    st.metric("🔄 Ranking Change Probability", f"{sensitivity['ranking_change_probability']:.1%}",
+                              f"Top choice changes in {sensitivity['top_change_probability']:.1%}", delta_color="off")
+                    
+                    fig_first = px.bar(
+                        x=sensitivity['rank_first_probability'],
+                        y=sensitivity['alternatives'],
+                        orientation='h',
+                        title=f"Probability of Ranking First ({sensitivity['n_perturbations']:,} perturbations)",
+                        labels={'x': 'Probability', 'y': 'Alternative'}
+                    )
+                    fig_first.update_layout(template="plotly_dark", height=350)
+                    st.plotly_chart(fig_first, use_container_width=True)
+                    
+                    fig_reversal = px.imshow(
+                        sensitivity['reversal_matrix'],
+                        x=sensitivity['alternatives'],
+                        y=sensitivity['alternatives'],
+                        color_continuous_scale='RdYlGn_r',
+                        zmin=0, zmax=1,
+                        title="Pairwise Rank Reversal Probability"
+                    )
+                    fig_reversal.update_layout(template="plotly_dark", height=400)
+                    st.plotly_chart(fig_reversal, use_container_width=True)
+                    
+                    st.markdown("**📏 Weight Thresholds (top choice changes):**")
+                    threshold_df = pd.DataFrame([{
+                        'Criterion': t['criterion'],
+                        'Weight': round(t['weight'], 3),
+                        'Lower': None if t['lower'] is None else round(t['lower'], 3),
+                        'New Leader Below': t['lower_winner'],
+                        'Upper': None if t['upper'] is None else round(t['upper'], 3),
+                        'New Leader Above': t['upper_winner']
+                    } for t in sensitivity['thresholds']])
+                    st.dataframe(threshold_df, use_container_width=True, hide_index=True)
+                    
+                    sweep_criterion = st.selectbox("Sweep criterion weight:", sensitivity['criteria'])
+                    sweep_index = sensitivity['criteria'].index(sweep_criterion)
+                    fig_sweep = go.Figure()
+                    for a, alternative in enumerate(sensitivity['alternatives']):
+                        fig_sweep.add_trace(go.Scatter(
+                            x=sensitivity['sweep_grid'],
+                            y=sensitivity['sweep_scores'][sweep_index, :, a],
+                            mode='lines',
+                            name=alternative
+                        ))
+                    fig_sweep.add_vline(x=results['criteria_weights'][sweep_index], line_dash="dash")
+                    fig_sweep.update_layout(
+                        title=f"Scores as the {sweep_criterion} Weight Varies",
+                        xaxis_title="Criterion Weight",
+                        yaxis_title="Priority Score",
+                        template="plotly_dark",
+                        height=400
+                    )
+                    st.plotly_chart(fig_sweep, use_container_width=True)
                 
             elif st.session_state.anp_results and 'error' in st.session_state.anp_results:
                 st.error(st.session_state.anp_results['error'])
@@ -1436,6 +4216,45 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 - Resource allocation with dependencies
                 """)
         
+        # AHP from the user's own pairwise judgments
+        with st.expander("📊 AHP with Your Own Judgments"):
+            ahp_criteria = [c.strip() for c in criteria_input.split(',') if c.strip()] if criteria_input else []
+            if len(ahp_criteria) < 2:
+                st.info("Enter at least two criteria above to compare them pairwise")
+            else:
+                st.markdown("Enter how much more important each **row** criterion is than each **column** "
+                            "criterion (1-9, or fractions such as 0.333). Leave cells blank to have them estimated.")
+                blank_matrix = pd.DataFrame(np.where(np.eye(len(ahp_criteria)) == 1, 1.0, np.nan),
+                                            index=ahp_criteria, columns=ahp_criteria)
+                judgment_df = st.data_editor(
+                    blank_matrix,
+                    key=f"ahp_judgments_{'|'.join(ahp_criteria)}",
+                    use_container_width=True
+                )
+                
+                if st.button("📊 Run AHP Analysis", use_container_width=True):
+                    ahp_results = st.session_state.ai_manager.perform_ahp_analysis(
+                        ahp_criteria, judgment_df.to_numpy(dtype=float)
+                    )
+                    if 'error' in ahp_results:
+                        st.error(ahp_results['error'])
+                    else:
+                        ahp_col1, ahp_col2 = st.columns(2)
+                        with ahp_col1:
+                            weights_df = pd.DataFrame({'Criteria': ahp_criteria, 'Weight': ahp_results['criteria_weights']})
+                            st.dataframe(weights_df.sort_values('Weight', ascending=False), use_container_width=True, hide_index=True)
+                        with ahp_col2:
+                            cr = ahp_results['consistency_ratio']
+                            st.metric("🎯 Consistency Ratio", f"{cr:.3f}", "✅ Acceptable" if cr < 0.1 else "⚠️ Review needed")
+                            st.caption(f"λmax = {ahp_results['lambda_max']:.3f} • "
+                                       f"{int(ahp_results['filled_entries'].sum()) // 2} comparisons estimated")
+                        
+                        if ahp_results['suggested_edits']:
+                            st.markdown("**🛠️ Suggested Judgment Revisions:**")
+                            for edit in ahp_results['suggested_edits']:
+                                st.write(f"• {edit['row']} vs {edit['col']}: {edit['current']:.3g} → "
+                                         f"{edit['suggested']:.3g} (CR {edit['cr_after']:.3f})")
+        
         st.markdown('</div>', unsafe_allow_html=True)
     
     with tab3:
@@ -1454,7 +4273,30 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 ["Custom Parameters", "Bed Occupancy Forecast", "Cost Analysis", "Quality Metrics"]
             )
             
-            n_simulations = st.slider("🔄 Number of Simulations:", 100, 5000, 1000, step=100)
+            large_scale = st.checkbox(
+                "🚀 Large-scale Simulation",
+                help="Stream millions of draws through running statistics and quantile sketches"
+            )
+            if large_scale:
+                n_simulations = st.select_slider(
+                    "🔄 Number of Simulations:",
+                    options=[1_000_000, 5_000_000, 10_000_000, 50_000_000, 100_000_000],
+                    value=10_000_000,
+                    format_func=lambda n: f"{n:,}"
+                )
+                seed_col, worker_col = st.columns(2)
+                with seed_col:
+                    scenario_seed = st.number_input("🎲 Random Seed:", min_value=0, value=42, step=1)
+                with worker_col:
+                    if HealthConfig.MC_MAX_WORKERS > 1:
+                        n_workers = st.slider("⚙️ Worker Processes:", 1, HealthConfig.MC_MAX_WORKERS,
+                                              HealthConfig.MC_MAX_WORKERS)
+                    else:
+                        n_workers = 1
+                        st.caption("⚙️ Single CPU available - running in-process")
+            else:
+                n_simulations = st.slider("🔄 Number of Simulations:", 100, 5000, 1000, step=100)
+                scenario_seed, n_workers = None, 1
             
             if scenario_type == "Custom Parameters":
                 st.markdown("**Define Custom Parameters:**")
@@ -1493,11 +4335,38 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                     "Readmission_Rate": {"distribution": "beta", "alpha": 2, "beta": 15}
                 }
             
+            # Default parameter correlations for the preset scenarios
+            scenario_correlations = {
+                "Bed Occupancy Forecast": [[1.0, 0.55, 0.65], [0.55, 1.0, 0.2], [0.65, 0.2, 1.0]],
+                "Cost Analysis": [[1.0, -0.4, 0.3], [-0.4, 1.0, 0.5], [0.3, 0.5, 1.0]],
+                "Quality Metrics": [[1.0, 0.5, -0.4], [0.5, 1.0, -0.5], [-0.4, -0.5, 1.0]]
+            }
+            
+            correlation = None
+            param_names = list(base_params)
+            if st.checkbox("🔗 Correlated Parameters (Gaussian copula)", value=scenario_type in scenario_correlations):
+                default_corr = scenario_correlations.get(scenario_type, np.eye(len(param_names)).tolist())
+                corr_df = st.data_editor(
+                    pd.DataFrame(default_corr, index=param_names, columns=param_names),
+                    key=f"correlation_{scenario_type}",
+                    use_container_width=True
+                )
+                # Keep the edited matrix symmetric with a unit diagonal
+                correlation = corr_df.to_numpy(dtype=float)
+                correlation = (correlation + correlation.T) / 2
+                np.fill_diagonal(correlation, 1.0)
+            
             if st.button("🚀 Run Scenario Analysis", use_container_width=True, type="primary"):
-                with st.spinner("🎲 Running Monte Carlo simulations..."):
-                    results = st.session_state.ai_manager.perform_scenario_analysis(base_params, n_simulations)
-                    st.session_state.scenario_results = results
-                    time.sleep(1)
+                progress_bar = st.progress(0.0, text="🎲 Running Monte Carlo simulations...")
+                
+                def update_progress(done, total):
+                    progress_bar.progress(done / total, text=f"🎲 {done:,} / {total:,} simulations")
+                
+                results = st.session_state.ai_manager.perform_scenario_analysis(
+                    base_params, n_simulations, correlation=correlation, seed=scenario_seed,
+                    streaming=large_scale, progress_callback=update_progress, n_workers=n_workers
+                )
+                st.session_state.scenario_results = results
                 
                 st.success("✅ Scenario analysis completed!")
                 st.rerun()
@@ -1520,13 +4389,20 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                     with col_c:
                         st.metric("95th %ile", f"{param_results['percentiles']['95th']:.2f}")
                     
-                    # Create distribution plot
-                    samples = param_results['samples']
-                    fig_dist = px.histogram(
-                        x=samples,
-                        nbins=50,
+                    # Distribution plot from server-side bins - only counts reach the browser
+                    histogram = param_results['histogram']
+                    edges = histogram['edges']
+                    fig_dist = go.Figure(go.Bar(
+                        x=(edges[:-1] + edges[1:]) / 2,
+                        y=histogram['counts'],
+                        width=np.diff(edges),
+                        name=param_name
+                    ))
+                    fig_dist.update_layout(
                         title=f"{param_name} Distribution",
-                        labels={'x': param_name, 'y': 'Frequency'}
+                        xaxis_title=param_name,
+                        yaxis_title="Frequency",
+                        bargap=0
                     )
                     
                     # Add percentile lines
@@ -1596,34 +4472,112 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
             help="Upload your healthcare data in CSV or Excel format"
         )
         
+        def stream_csv(source, total_bytes, label):
+            """Analyse a CSV chunk by chunk and keep only the results and a preview.
+            
+            The preview stays inside the results: it is not the dataset, so the dashboard, cubes and
+            charts never run on it as if it were.
+            """
+            progress_bar = st.progress(0.0, text=f"🌊 Streaming {label}...")
+            
+            def update_progress(done_bytes, total, rows):
+                fraction = min(done_bytes / total, 1.0) if total else 0.0
+                progress_bar.progress(fraction, text=f"🌊 {rows:,} records analysed")
+            
+            analysis = st.session_state.ai_manager.analyze_csv_stream(
+                source, total_bytes=total_bytes, progress_callback=update_progress
+            )
+            progress_bar.empty()
+            if 'error' in analysis:
+                st.error(analysis['error'])
+                return
+            st.session_state.analysis_results = analysis
+            st.session_state.current_data = None
+        
         if uploaded_file:
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    st.session_state.current_data = pd.read_csv(uploaded_file)
-                else:
-                    st.session_state.current_data = pd.read_excel(uploaded_file)
+                config = st.session_state.ai_manager.config
+                if uploaded_file.name.endswith('.csv') and uploaded_file.size > config.STREAMING_UPLOAD_BYTES:
+                    # Large CSVs are analysed chunk by chunk once per upload, never as one frame
+                    if st.session_state.get('streamed_upload') != uploaded_file.file_id:
+                        stream_csv(uploaded_file, uploaded_file.size, uploaded_file.name)
+                        st.session_state.streamed_upload = uploaded_file.file_id
+                elif st.session_state.get('loaded_upload') != uploaded_file.file_id:
+                    # Parsed once per upload; identical files reopen from the columnar cache
+                    started = time.perf_counter()
+                    data, source = st.session_state.ai_manager.load_dataset(uploaded_file.getvalue(), uploaded_file.name)
+                    st.session_state.current_data = data
+                    st.session_state.analysis_results = None
+                    st.session_state.loaded_upload = uploaded_file.file_id
+                    st.session_state.upload_source = (source, time.perf_counter() - started)
                 
-                st.success(f"✅ Successfully loaded {len(st.session_state.current_data):,} records")
+                if st.session_state.current_data is not None:
+                    st.success(f"✅ Successfully loaded {len(st.session_state.current_data):,} records")
+                    if st.session_state.get('upload_source') and st.session_state.get('loaded_upload') == uploaded_file.file_id:
+                        source, elapsed = st.session_state.upload_source
+                        labels = {"memory": "shared in-memory copy", "disk": "memory-mapped columnar cache",
+                                  "parsed": "parsed and cached"}
+                        if not st.session_state.ai_manager.dataset_cache.enabled:
+                            labels["parsed"] = "parsed without caching (install pyarrow to enable the columnar cache)"
+                        st.caption(f"⚡ {labels[source]} in {elapsed * 1000:.0f} ms")
                 
             except Exception as e:
                 st.error(f"Error loading file: {str(e)}")
         
+        with st.expander("🗄️ Large Server-side Datasets", expanded=False):
+            datasets_dir = st.session_state.ai_manager.config.DATASETS_DIR
+            server_files = sorted(
+                name for name in (os.listdir(datasets_dir) if os.path.isdir(datasets_dir) else [])
+                if name.lower().endswith('.csv')
+            )
+            if server_files:
+                server_file = st.selectbox("📄 Dataset:", server_files)
+                server_path = os.path.join(datasets_dir, server_file)
+                st.caption(f"{os.path.getsize(server_path) / 1024 ** 2:,.1f} MB • streamed in chunks, "
+                           f"only the results and a preview are kept in memory")
+                if st.button("🌊 Stream Analysis", use_container_width=True):
+                    stream_csv(server_path, None, server_file)
+                    st.rerun()
+            else:
+                st.caption(f"Place CSV extracts in `{datasets_dir}` to analyse files larger than the upload limit")
+        
         # Data analysis section
-        if st.session_state.current_data is not None:
-            data = st.session_state.current_data
+        streamed = st.session_state.current_data is None and bool((st.session_state.analysis_results or {}).get('streamed'))
+        if st.session_state.current_data is not None or streamed:
+            data = st.session_state.analysis_results['sample'] if streamed else st.session_state.current_data
+            
+            dtype_report = data.attrs.get("dtype_report")
+            if dtype_report and dtype_report["conversions"]:
+                st.caption(
+                    f"🗜️ Memory {dtype_report['memory_before'] / 1024 ** 2:,.2f} MB → "
+                    f"{dtype_report['memory_after'] / 1024 ** 2:,.2f} MB "
+                    f"({len(dtype_report['conversions'])} columns converted to compact dtypes)"
+                )
             
             # Multimodal analysis
             st.markdown("#### 🔬 Multimodal Data Analysis")
             
-            if st.button("🧮 Perform Comprehensive Analysis", use_container_width=True, type="primary"):
+            if streamed:
+                analysis = st.session_state.analysis_results
+                st.caption(f"🌊 Streamed analysis of {analysis['summary']['total_records']:,} records in "
+                           f"{analysis['chunks']} chunks • preview shows the first {len(data):,} rows; "
+                           f"dashboard and charts need a dataset that fits in memory")
+            elif st.button("🧮 Perform Comprehensive Analysis", use_container_width=True, type="primary"):
                 with st.spinner("🔍 Analyzing multimodal healthcare data..."):
                     analysis = st.session_state.ai_manager.analyze_multimodal_data(data)
                     st.session_state.analysis_results = analysis
-                    time.sleep(1)
                 
                 st.success("✅ Multimodal analysis completed!")
                 st.rerun()
             
+            cache_stats = st.session_state.ai_manager.analysis_cache.stats()
+            if cache_stats["hits"] + cache_stats["misses"]:
+                st.caption(
+                    f"⚡ Analysis cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                    f"({cache_stats['entries']}/{cache_stats['max_entries']} results, "
+                    f"{cache_stats['bytes'] / 1024 ** 2:.1f} MB)"
+                )
+            
             # Display analysis results
             if st.session_state.analysis_results:
                 analysis = st.session_state.analysis_results
@@ -1640,7 +4594,7 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                     st.metric("📝 Categorical Features", analysis['summary']['categorical_features'])
                 with col4:
                     missing_pct = (sum(analysis['summary']['missing_data'].values()) / 
-                                 (len(data) * len(data.columns))) * 100
+                                 max(analysis['summary']['total_records'] * len(analysis['summary']['missing_data']), 1)) * 100
                     st.metric("❓ Missing Data", f"{missing_pct:.1f}%")
                 
                 # Key insights
@@ -1741,7 +4695,7 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
             
             with col2:
                 numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-                categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
+                categorical_cols = categorical_columns(data).tolist()
                 
                 if viz_type in ["department_performance", "scatter_3d", "time_series", "custom_scatter"]:
                     y_col = st.selectbox("📊 Y-Axis:", numeric_cols)
@@ -1754,17 +4708,39 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                         color_col = None
                 else:
                     x_col = y_col = color_col = None
+                
+                time_resolution, rolling_window = "auto", 7
+                if viz_type == "time_series":
+                    time_resolution = st.selectbox(
+                        "📅 Resolution:",
+                        ["auto"] + list(TimeSeriesStore.RESOLUTIONS),
+                        format_func=lambda x: "Auto" if x == "auto" else TimeSeriesStore.RESOLUTIONS[x]
+                    )
+                    rolling_window = st.slider("📈 Rolling Window (periods):", 2, 30, 7)
             
             # Generate visualization
             if st.button("🎨 Generate Visualization", use_container_width=True, type="primary"):
                 with st.spinner("🎨 Creating interactive visualization..."):
-                    fig = create_enhanced_visualizations(data, viz_type, x_col, y_col, color_col)
+                    fig = st.session_state.ai_manager.build_visualization(
+                        data, viz_type, x_col, y_col, color_col, theme=st.session_state.theme,
+                        time_resolution=time_resolution, rolling_window=rolling_window
+                    )
                     
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
+                    elif viz_type == "time_series":
+                        st.error("Time series charts need a date column (e.g. Admission_Date)")
                     else:
                         st.error("Unable to create visualization with current settings")
             
+            figure_stats = st.session_state.ai_manager.figure_cache.stats()
+            if figure_stats["hits"] + figure_stats["misses"]:
+                st.caption(
+                    f"⚡ Figure cache: {figure_stats['hits']} hits / {figure_stats['misses']} misses "
+                    f"({figure_stats['entries']}/{figure_stats['max_entries']} figures, "
+                    f"{figure_stats['bytes'] / 1024 ** 2:.1f} MB)"
+                )
+            
             # Additional visualization options
             st.markdown("#### 📊 Quick Visualizations")
             
@@ -1772,20 +4748,22 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
             
             with viz_cols[0]:
                 if st.button("🔥 Correlation Matrix", use_container_width=True):
-                    fig = create_enhanced_visualizations(data, "correlation_heatmap")
+                    fig = st.session_state.ai_manager.build_visualization(data, "correlation_heatmap", theme=st.session_state.theme)
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
             
             with viz_cols[1]:
                 if st.button("🎯 Department Radar", use_container_width=True):
-                    fig = create_enhanced_visualizations(data, "radar_chart")
+                    fig = st.session_state.ai_manager.build_visualization(data, "radar_chart", theme=st.session_state.theme)
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
             
             with viz_cols[2]:
                 if st.button("🏥 Performance Box Plot", use_container_width=True):
                     if 'HCAHPS_Overall' in data.columns:
-                        fig = create_enhanced_visualizations(data, "department_performance", y_col='HCAHPS_Overall')
+                        fig = st.session_state.ai_manager.build_visualization(
+                            data, "department_performance", y_col='HCAHPS_Overall', theme=st.session_state.theme
+                        )
                         if fig:
                             st.plotly_chart(fig, use_container_width=True)
             
@@ -1823,7 +4801,7 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 
                 # Show filtered visualization
                 if len(filtered_data) > 0 and 'HCAHPS_Overall' in filtered_data.columns:
-                    fig_filtered = px.scatter(
+                    fig_filtered = create_scatter_figure(
                         filtered_data,
                         x='Age' if 'Age' in filtered_data.columns else filtered_data.columns[0],
                         y='HCAHPS_Overall',
@@ -1831,7 +4809,7 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                         title="📊 Filtered Data Visualization",
                         size='Total_Cost' if 'Total_Cost' in filtered_data.columns else None
                     )
-                    fig_filtered.update_layout(template="plotly_dark", height=500)
+                    fig_filtered.update_layout(height=500)
                     st.plotly_chart(fig_filtered, use_container_width=True)
         
         else:
@@ -1861,6 +4839,7 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
         
         if st.session_state.current_data is not None:
             data = st.session_state.current_data
+            cube = st.session_state.ai_manager.department_cube(data)
             
             # Key Performance Indicators
             st.markdown("#### 📊 Key Performance Indicators")
@@ -1872,20 +4851,20 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 st.metric("👥 Total Patients", f"{total_patients:,}")
             
             with kpi_col2:
-                if 'HCAHPS_Overall' in data.columns:
-                    avg_hcahps = data['HCAHPS_Overall'].mean()
+                if 'HCAHPS_Overall' in cube.metrics:
+                    avg_hcahps = cube.totals('HCAHPS_Overall')['mean']
                     hcahps_trend = "📈" if avg_hcahps >= 8.5 else "📉"
                     st.metric("😊 HCAHPS Score", f"{avg_hcahps:.1f}/10", hcahps_trend)
             
             with kpi_col3:
-                if 'Safety_Score' in data.columns:
-                    avg_safety = data['Safety_Score'].mean()
+                if 'Safety_Score' in cube.metrics:
+                    avg_safety = cube.totals('Safety_Score')['mean']
                     safety_trend = "📈" if avg_safety >= 90 else "📉"
                     st.metric("🛡️ Safety Score", f"{avg_safety:.1f}%", safety_trend)
             
             with kpi_col4:
-                if 'Readmission_30_Day' in data.columns:
-                    readmit_rate = (data['Readmission_30_Day'].sum() / len(data)) * 100
+                if 'Readmission_30_Day' in cube.metrics:
+                    readmit_rate = cube.totals('Readmission_30_Day')['mean'] * 100
                     readmit_trend = "📉" if readmit_rate <= 10 else "📈"
                     st.metric("🔄 Readmission Rate", f"{readmit_rate:.1f}%", readmit_trend)
             
@@ -1935,21 +4914,15 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
             if 'Department' in data.columns:
                 st.markdown("#### 🏥 Department Performance Dashboard")
                 
-                # Create comprehensive department analysis
-                dept_metrics = []
-                for dept in data['Department'].unique():
-                    dept_data = data[data['Department'] == dept]
-                    
-                    metrics = {
-                        'Department': dept,
-                        'Patients': len(dept_data),
-                        'Avg_HCAHPS': dept_data['HCAHPS_Overall'].mean() if 'HCAHPS_Overall' in dept_data.columns else 0,
-                        'Avg_Safety': dept_data['Safety_Score'].mean() if 'Safety_Score' in dept_data.columns else 0,
-                        'Avg_Cost': dept_data['Total_Cost'].mean() if 'Total_Cost' in dept_data.columns else 0
-                    }
-                    dept_metrics.append(metrics)
-                
-                dept_df = pd.DataFrame(dept_metrics)
+                # Create comprehensive department analysis from the shared aggregate cube
+                dept_means = cube.stat("mean")
+                dept_df = pd.DataFrame({
+                    'Department': cube.group_sizes().index.astype(str),
+                    'Patients': cube.group_sizes().to_numpy(),
+                    'Avg_HCAHPS': dept_means['HCAHPS_Overall'].to_numpy() if 'HCAHPS_Overall' in cube.metrics else 0,
+                    'Avg_Safety': dept_means['Safety_Score'].to_numpy() if 'Safety_Score' in cube.metrics else 0,
+                    'Avg_Cost': dept_means['Total_Cost'].to_numpy() if 'Total_Cost' in cube.metrics else 0
+                })
                 
                 # Create department comparison chart
                 fig_dept = make_subplots(
@@ -1992,10 +4965,82 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                 
                 st.plotly_chart(fig_dept, use_container_width=True)
             
+            # Multi-dimensional KPI explorer: every slice is answered from the precomputed cube
+            olap = st.session_state.ai_manager.olap_cube(data)
+            if olap.dimensions and olap.measures:
+                st.markdown("#### 🧊 Multi-dimensional KPI Explorer")
+                
+                olap_col1, olap_col2, olap_col3 = st.columns(3)
+                with olap_col1:
+                    group_by = st.multiselect("📐 Group By:", olap.dimensions, default=olap.dimensions[:1])
+                with olap_col2:
+                    measure = st.selectbox(
+                        "📏 KPI:",
+                        olap.measures,
+                        index=olap.measures.index('HCAHPS_Overall') if 'HCAHPS_Overall' in olap.measures else 0
+                    )
+                with olap_col3:
+                    statistic = st.selectbox("🧮 Statistic:", OLAPCube.STATISTICS)
+                
+                filters = {}
+                for filter_col, dim, members in zip(st.columns(len(olap.dimensions)), olap.dimensions, olap.members):
+                    with filter_col:
+                        labels = [str(member) for member in members]
+                        chosen = st.multiselect(f"🔎 {dim}:", labels, default=labels, key=f"olap_filter_{dim}")
+                        if len(chosen) < len(labels):
+                            filters[dim] = [member for member, label in zip(members, labels) if label in chosen]
+                
+                started = time.perf_counter()
+                olap_result = olap.query(group_by, filters, statistic, measures=[measure])
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                st.caption(
+                    f"⚡ {len(olap_result):,} cells answered in {elapsed_ms:.1f} ms from a "
+                    f"{olap.n_cells:,}-cell cube over {olap.n_rows:,} rows"
+                )
+                
+                if olap_result.empty:
+                    st.info("No records match the selected slice")
+                else:
+                    title = f"🧊 {statistic.title()} {measure}" + (f" by {' × '.join(group_by)}" if group_by else "")
+                    if len(group_by) == 2:
+                        fig_olap = px.imshow(
+                            olap_result[measure].unstack(),
+                            title=title,
+                            color_continuous_scale="Viridis",
+                            aspect="auto",
+                            text_auto=".2f"
+                        )
+                    elif len(group_by) == 1:
+                        fig_olap = px.bar(
+                            olap_result.reset_index(),
+                            x=group_by[0],
+                            y=measure,
+                            hover_data=['Rows'],
+                            title=title
+                        )
+                    else:
+                        fig_olap = None
+                    
+                    if fig_olap is not None:
+                        fig_olap.update_layout(template="plotly_dark", height=500)
+                        st.plotly_chart(fig_olap, use_container_width=True)
+                    st.dataframe(olap_result, use_container_width=True)
+            
             # Patient Sentiment Analysis
+            if 'Sentiment' not in data.columns and 'Patient_Feedback' in data.columns:
+                # Uploaded feedback without labels: score each distinct comment once
+                data = data.assign(Sentiment=analyze_sentiment_batch(data['Patient_Feedback'])['Sentiment'])
+            
             if 'Sentiment' in data.columns:
                 st.markdown("#### 😊 Patient Sentiment Analysis")
                 
+                memo_stats = get_sentiment_memo().stats()
+                if memo_stats["hits"] + memo_stats["misses"]:
+                    st.caption(
+                        f"⚡ Sentiment memo: {memo_stats['hit_rate']:.0%} hit rate "
+                        f"({memo_stats['entries']}/{memo_stats['max_entries']} texts cached)"
+                    )
+                
                 sentiment_col1, sentiment_col2 = st.columns(2)
                 
                 with sentiment_col1:
@@ -2019,6 +5064,10 @@ For detailed analysis, please use our specialized tools in the ANP Analysis, Sce
                     # Sentiment by department
                     if 'Department' in data.columns:
                         sentiment_dept = pd.crosstab(data['Department'], data['Sentiment'], normalize='index') * 100
+                        # Plain labels (categorical Sentiment gives a CategoricalIndex) and every
+                        # sentiment present, even when a label does not occur in the data
+                        sentiment_dept.columns = sentiment_dept.columns.astype(str)
+                        sentiment_dept = sentiment_dept.reindex(columns=['Positive', 'Neutral', 'Negative'], fill_value=0)
                         
                         fig_sent_dept = px.bar(
                             sentiment_dept.reset_index(),
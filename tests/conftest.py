@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Runtime caches go to a scratch directory, not the checkout; set before app is imported
+_CACHE_DIR = tempfile.mkdtemp(prefix="healthcare-ai-tests-")
+os.environ.setdefault("KNOWLEDGE_INDEX_DIR", os.path.join(_CACHE_DIR, "knowledge_index"))
+os.environ.setdefault("DATASET_CACHE_DIR", os.path.join(_CACHE_DIR, "datasets"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
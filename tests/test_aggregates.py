@@ -0,0 +1,195 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import DepartmentCube, EnhancedHealthcareAI, OLAPCube, TimeSeriesStore, create_comprehensive_sample_data
+
+
+@pytest.fixture(scope="module")
+def ai():
+    return EnhancedHealthcareAI()
+
+
+@pytest.fixture(scope="module")
+def sample_data():
+    return create_comprehensive_sample_data()
+
+
+@pytest.fixture
+def visits():
+    rng = np.random.default_rng(5)
+    dates = pd.Timestamp("2024-01-03") + pd.to_timedelta(rng.integers(0, 150 * 24, size=3000), unit="h")
+    frame = pd.DataFrame({"Visit_Date": dates, "Wait": rng.gamma(2, 30, size=3000) + 1e4})
+    frame.loc[rng.random(3000) < 0.05, "Wait"] = np.nan
+    frame.loc[rng.random(3000) < 0.02, "Visit_Date"] = pd.NaT
+    # A gap of empty days inside the range
+    return frame[(frame["Visit_Date"] < "2024-02-10") | (frame["Visit_Date"] >= "2024-02-20")].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("resolution, rule", [("D", "D"), ("W", "W-SUN"), ("M", "MS")])
+def test_rollups_match_resample(visits, resolution, rule):
+    store = TimeSeriesStore(visits, "Visit_Date")
+    rollup = store.rollup("Wait", resolution)
+    expected = visits.set_index("Visit_Date").sort_index()["Wait"].resample(rule).agg(["count", "mean", "std"])
+    assert len(rollup) == len(expected)
+    np.testing.assert_array_equal(rollup["count"], expected["count"])
+    np.testing.assert_allclose(rollup["mean"], expected["mean"], rtol=1e-12)
+    np.testing.assert_allclose(rollup["std"], expected["std"], rtol=1e-6)
+
+
+def test_store_reports_dated_rows_and_resolution(visits):
+    store = TimeSeriesStore.from_data(visits)
+    assert store.date_column == "Visit_Date"
+    assert store.n_rows == len(visits) and store.n_dated == visits["Visit_Date"].notna().sum()
+    assert store.resolution_for(500) == "D" and store.resolution_for(30) == "W" and store.resolution_for(3) == "M"
+    assert store.rollup("Wait", "D", "2024-02-12", "2024-02-18")["count"].sum() == 0
+
+
+def test_text_dates_are_detected_and_missing_dates_give_no_store(visits):
+    text = visits.assign(Visit_Date=visits["Visit_Date"].dt.strftime("%Y-%m-%d %H:%M"))
+    assert TimeSeriesStore.from_data(text).n_dated == visits["Visit_Date"].notna().sum()
+    assert TimeSeriesStore.from_data(visits.drop(columns="Visit_Date")) is None
+
+
+def test_aggregates_are_cached_per_dataset_version(ai, sample_data):
+    store = ai.time_series_store(sample_data)
+    assert ai.time_series_store(sample_data.copy()) is store
+    assert ai.department_cube(sample_data) is ai.department_cube(sample_data.copy())
+    assert ai.time_series_store(sample_data.iloc[:-1]) is not store
+
+    unhashable = pd.DataFrame({"Department": ["ICU", "ER"], "Score": [1.0, 2.0], "Tags": [["a"], ["b"]]})
+    assert ai.department_cube(unhashable) is not ai.department_cube(unhashable)
+
+
+@pytest.fixture
+def wards():
+    rng = np.random.default_rng(9)
+    frame = pd.DataFrame({
+        "Department": rng.choice(["ER", "ICU", "Surgery", None], size=2000, p=[0.5, 0.3, 0.18, 0.02]),
+        "Score": rng.normal(80, 5, size=2000),
+        "Cost": rng.lognormal(8, 1, size=2000),
+    })
+    frame.loc[rng.random(2000) < 0.05, "Score"] = np.nan
+    frame.loc[frame["Department"] == "Surgery", "Cost"] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize("name", ["count", "sum", "min", "max", "mean", "var", "std"])
+def test_cube_stats_match_groupby(wards, name):
+    cube = DepartmentCube(wards)
+    expected = wards.groupby("Department")[cube.metrics].agg(name)
+    pd.testing.assert_frame_equal(cube.stat(name), expected, check_dtype=False, check_names=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("q", DepartmentCube.QUANTILES)
+def test_cube_quantiles_match_groupby(wards, q):
+    cube = DepartmentCube(wards)
+    expected = wards.groupby("Department")[cube.metrics].quantile(q)
+    pd.testing.assert_frame_equal(cube.quantile(q), expected, check_names=False, rtol=1e-12)
+
+
+def test_cube_totals_summary_and_sizes(wards):
+    cube = DepartmentCube(wards)
+    totals = cube.totals("Score")
+    assert totals["count"] == wards["Score"].count()
+    assert totals["mean"] == pytest.approx(wards["Score"].mean())
+    assert totals["std"] == pytest.approx(wards["Score"].std())
+    summary = wards.groupby("Department")[["Score"]].agg(["mean", "std"])
+    pd.testing.assert_frame_equal(cube.summary()[["Score"]], summary, check_names=False, rtol=1e-9)
+    pd.testing.assert_series_equal(cube.group_sizes(), wards["Department"].value_counts().sort_index(),
+                                   check_names=False)
+    assert DepartmentCube(wards.drop(columns="Department")).totals("Cost")["count"] == wards["Cost"].count()
+
+
+def test_box_stats_place_tukey_whiskers_on_observations(wards):
+    boxes = DepartmentCube(wards).box_stats("Cost")
+    for dept, values in wards.dropna(subset=["Department"]).groupby("Department")["Cost"]:
+        values = values.dropna().to_numpy()
+        box = boxes.loc[dept]
+        if not len(values):
+            assert box["count"] == 0 and np.isnan(box["lowerfence"]) and not len(box["outliers"])
+            continue
+        q1, q3 = np.quantile(values, [0.25, 0.75])
+        inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+        assert box["lowerfence"] == inside.min() and box["upperfence"] == inside.max()
+        np.testing.assert_array_equal(np.sort(box["outliers"]), np.sort(np.setdiff1d(values, inside)))
+        assert box["count"] == len(values) and box["median"] == pytest.approx(np.median(values))
+
+
+DIMENSIONS = ["Department", "Insurance_Type", "Gender"]
+
+
+@pytest.fixture(scope="module")
+def encounters():
+    rng = np.random.default_rng(11)
+    frame = pd.DataFrame({
+        "Department": rng.choice(["ER", "ICU", "Surgery", None], size=3000, p=[0.5, 0.3, 0.17, 0.03]),
+        "Insurance_Type": rng.choice(["BPJS", "Private", "Self-pay"], size=3000),
+        "Gender": rng.choice(["F", "M"], size=3000),
+        "Score": rng.normal(80, 5, size=3000),
+        "Cost": rng.lognormal(8, 1, size=3000),
+        "Patient_ID": np.arange(3000).astype(str),
+    })
+    frame.loc[rng.random(3000) < 0.05, "Score"] = np.nan
+    return frame
+
+
+def expected_query(frame, group_by, statistic):
+    measures = ["Score", "Cost"]
+    if not group_by:
+        expected = frame[measures].agg(statistic).to_frame("All").T
+        expected.insert(0, "Rows", len(frame))
+        return expected
+    grouped = frame.groupby(list(group_by), dropna=False)
+    expected = grouped[measures].agg(statistic)
+    expected.insert(0, "Rows", grouped.size())
+    return expected
+
+
+@pytest.mark.parametrize("statistic", OLAPCube.STATISTICS)
+def test_roll_ups_match_groupby(encounters, statistic):
+    cube = OLAPCube(encounters, dimensions=DIMENSIONS)
+    assert cube.dimensions == DIMENSIONS and cube.measures == ["Score", "Cost"]
+    for size in range(len(DIMENSIONS) + 1):
+        for group_by in combinations(DIMENSIONS, size):
+            result = cube.query(group_by, statistic=statistic)
+            expected = expected_query(encounters, group_by, statistic)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False,
+                                          check_index_type=False, rtol=1e-9)
+
+
+def test_dice_matches_a_filtered_groupby(encounters):
+    cube = OLAPCube(encounters, dimensions=DIMENSIONS)
+    filters = {"Department": ["ER", "ICU"], "Insurance_Type": ["Private"]}
+    subset = encounters[encounters["Department"].isin(["ER", "ICU"]) & (encounters["Insurance_Type"] == "Private")]
+    for statistic in ("mean", "std", "max"):
+        pd.testing.assert_frame_equal(cube.query(["Gender", "Department"], filters, statistic),
+                                      expected_query(subset, ["Gender", "Department"], statistic),
+                                      check_dtype=False, check_names=False, rtol=1e-9)
+    assert cube.query(["Gender"], {"Department": ["Nowhere"]}).empty
+
+
+def test_orderings_share_one_memoized_cuboid(encounters):
+    cube = OLAPCube(encounters, dimensions=DIMENSIONS)
+    forward = cube.query(["Department", "Gender"], measures=["Cost"])
+    backward = cube.query(["Gender", "Department"], measures=["Cost"])
+    assert list(cube._cuboids) == [("Department", "Gender")]
+    pd.testing.assert_frame_equal(backward.reorder_levels([1, 0]).sort_index(), forward)
+    cube.query(["Department"], {"Gender": ["F"]})
+    assert len(cube._cuboids) == 1
+
+    for size in range(len(DIMENSIONS) + 1):
+        for group_by in combinations(DIMENSIONS, size):
+            cube.query(group_by)
+    memo_bytes = sum(array.nbytes for rolled, _ in cube._cuboids.values() for array in rolled.values())
+    assert memo_bytes <= cube.nbytes
+
+
+def test_oversized_dimensions_are_skipped(encounters):
+    cube = OLAPCube(encounters, dimensions=DIMENSIONS + ["Patient_ID"], max_members=10)
+    assert cube.dimensions == DIMENSIONS
+    assert OLAPCube(encounters, dimensions=DIMENSIONS, max_cells=12).dimensions == ["Department", "Insurance_Type"]
+    with pytest.raises(ValueError, match="Unknown statistic"):
+        cube.query(["Gender"], statistic="median")
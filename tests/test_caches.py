@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import EnhancedHealthcareAI, LRUCache, create_comprehensive_sample_data, dataframe_fingerprint
+
+
+@pytest.fixture(scope="module")
+def ai():
+    return EnhancedHealthcareAI()
+
+
+@pytest.fixture(scope="module")
+def sample_data():
+    return create_comprehensive_sample_data()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == pytest.approx(0.5)
+
+
+def test_lru_byte_bound_keeps_newest_entry():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    cache.put("c", "zzzz")
+    assert len(cache) == 2 and "a" not in cache
+    assert cache.stats()["bytes"] == 8
+    cache.put("huge", "w" * 50)
+    assert len(cache) == 1 and cache.stats()["bytes"] == 50
+    cache.put("huge", "w")
+    assert cache.stats()["bytes"] == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()["bytes"] == 0
+
+
+def test_get_or_compute_caches_falsy_values():
+    cache, calls = LRUCache(), []
+    for _ in range(3):
+        assert cache.get_or_compute("key", lambda: calls.append(1) or None) is None
+    assert len(calls) == 1
+
+
+def test_lru_is_consistent_under_threads():
+    cache = LRUCache(max_entries=50, max_bytes=400, sizeof=len)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.put((offset, i % 80), "x" * (i % 13))
+            cache.get((offset, (i * 7) % 80))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["entries"] <= 50 and stats["bytes"] <= 400
+    assert stats["hits"] + stats["misses"] == 8 * 2000
+    assert stats["bytes"] == sum(len(cache.get(key)) for key in list(cache._entries))
+
+
+def test_fingerprint_tracks_content(sample_data):
+    fingerprint = dataframe_fingerprint(sample_data)
+    assert dataframe_fingerprint(sample_data.copy()) == fingerprint
+
+    edited = sample_data.copy()
+    edited.iloc[5, edited.columns.get_loc("Safety_Score")] += 0.1
+    assert dataframe_fingerprint(edited) != fingerprint
+    text = sample_data.copy()
+    text.loc[3, "Department"] = "Radiology" if text.loc[3, "Department"] != "Radiology" else "ICU"
+    assert dataframe_fingerprint(text) != fingerprint
+    assert dataframe_fingerprint(sample_data.rename(columns={"Safety_Score": "Safety"})) != fingerprint
+    assert dataframe_fingerprint(sample_data.iloc[::-1].reset_index(drop=True)) != fingerprint
+    assert dataframe_fingerprint(sample_data.set_index(sample_data.index + 1)) != fingerprint
+    assert dataframe_fingerprint(sample_data.astype({"Department": "category"})) != fingerprint
+
+
+def test_fingerprint_distinguishes_arrow_string_slices():
+    column = pd.Series(["a", "b", "c", "d"], dtype="string[pyarrow]")
+    first = pd.DataFrame({"x": column.iloc[:2].reset_index(drop=True)})
+    second = pd.DataFrame({"x": column.iloc[2:].reset_index(drop=True)})
+    assert dataframe_fingerprint(first) != dataframe_fingerprint(second)
+
+
+def test_analysis_is_served_from_the_shared_cache(ai, sample_data):
+    first = ai.analyze_multimodal_data(sample_data)
+    hits = ai.analysis_cache.stats()["hits"]
+    assert ai.analyze_multimodal_data(sample_data.copy()) is first
+    assert ai.analysis_cache.stats()["hits"] == hits + 1
+    assert ai.analysis_cache.stats()["bytes"] > 0
+    assert ai.analyze_multimodal_data(sample_data, correlation_method="spearman") is not first
+    np.testing.assert_allclose(pd.DataFrame(first["correlations"]).to_numpy(),
+                               sample_data.select_dtypes(include=[np.number]).corr().to_numpy(), atol=1e-9)
+
+
+def test_fingerprint_prefix_matches_the_sliced_frame():
+    text = pd.Series(["alpha", None, "gamma", "", "epsilon", "zeta"], dtype="str")
+    frame = pd.DataFrame({"text": text, "x": np.arange(6.0),
+                          "kind": pd.Categorical(list("ababab")), "when": pd.date_range("2024-01-01", periods=6)})
+    chunked = pd.concat([frame.iloc[:2], frame.iloc[2:]], ignore_index=True)
+    for rows in (0, 1, 2, 3, 6):
+        full, prefix = dataframe_fingerprint(chunked, rows)
+        assert full == dataframe_fingerprint(frame)
+        assert prefix == dataframe_fingerprint(frame.iloc[:rows])
+    assert dataframe_fingerprint(frame.set_index("x"), 4)[1] == dataframe_fingerprint(frame.set_index("x").iloc[:4])
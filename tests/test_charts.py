@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import (EnhancedHealthcareAI, HealthConfig, create_comprehensive_sample_data, create_scatter_figure,
+                 lttb_indices, stratified_sample)
+
+
+@pytest.fixture(scope="module")
+def ai():
+    return EnhancedHealthcareAI()
+
+
+@pytest.fixture(scope="module")
+def sample_data():
+    return create_comprehensive_sample_data()
+
+
+@pytest.mark.parametrize("viz_type", ["correlation_heatmap", "department_performance", "time_series", "radar_chart"])
+def test_second_build_is_a_figure_cache_hit(ai, sample_data, viz_type):
+    first = ai.build_visualization(sample_data, viz_type, y_col="Safety_Score")
+    hits = ai.figure_cache.stats()["hits"]
+    second = ai.build_visualization(sample_data.copy(), viz_type, y_col="Safety_Score")
+    assert ai.figure_cache.stats()["hits"] == hits + 1
+    assert second is not first and json.loads(second.to_json()) == json.loads(first.to_json())
+
+
+def test_settings_theme_and_data_are_part_of_the_key(ai, sample_data):
+    ai.build_visualization(sample_data, "time_series", time_resolution="W")
+    misses = ai.figure_cache.stats()["misses"]
+    ai.build_visualization(sample_data, "time_series", time_resolution="M")
+    ai.build_visualization(sample_data, "time_series", time_resolution="W", theme="Light")
+    ai.build_visualization(sample_data.iloc[:-1], "time_series", time_resolution="W")
+    assert ai.figure_cache.stats()["misses"] == misses + 3
+
+
+def test_missing_figures_are_not_cached(ai, sample_data):
+    entries = len(ai.figure_cache)
+    assert ai.build_visualization(sample_data, "scatter_3d") is None
+    assert len(ai.figure_cache) == entries
+
+
+@pytest.fixture
+def departments():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        "Department": np.repeat(["ER", "ICU", "Rare"], [7000, 2990, 10]),
+        "x": rng.normal(size=10000),
+        "y": rng.normal(size=10000),
+    })
+
+
+def test_stratified_sample_keeps_proportions_and_small_groups(departments):
+    sample = stratified_sample(departments, 1000, by="Department")
+    counts = sample["Department"].value_counts()
+    assert counts["ER"] == 700 and counts["ICU"] == 299 and counts["Rare"] == 1
+    assert sample.index.is_monotonic_increasing and sample.index.is_unique
+    pd.testing.assert_frame_equal(stratified_sample(departments, 1000, by="Department"), sample)
+    assert stratified_sample(departments, 20000) is departments
+    assert len(stratified_sample(departments, 500)) == 500
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 300)
+    y[4321] = 50.0
+    selected = lttb_indices(x, y, 200)
+    assert len(selected) == 200 and selected[0] == 0 and selected[-1] == len(x) - 1
+    assert (np.diff(selected) > 0).all() and 4321 in selected
+    np.testing.assert_array_equal(lttb_indices(x[:10], y[:10], 20), np.arange(10))
+
+
+def test_scatter_mode_follows_the_point_budget(departments, monkeypatch):
+    figure = create_scatter_figure(departments.iloc[:100], "x", "y", color="Department")
+    assert figure.data[0].type == "scatter"
+
+    monkeypatch.setattr(HealthConfig, "SCATTER_WEBGL_POINTS", 50)
+    assert create_scatter_figure(departments.iloc[:100], "x", "y").data[0].type == "scattergl"
+
+    monkeypatch.setattr(HealthConfig, "SCATTER_POINT_BUDGET", 1000)
+    sampled = create_scatter_figure(departments, "x", "y", color="Department", title="T")
+    assert sum(len(trace.x) for trace in sampled.data) == 1000
+    assert "stratified" in sampled.layout.title.text and "10,000" in sampled.layout.title.text
+
+    monkeypatch.setattr(HealthConfig, "SCATTER_DENSITY_POINTS", 5000)
+    density = create_scatter_figure(departments, "x", "y")
+    assert density.data[0].type == "heatmap" and np.nansum(density.data[0].z) == len(departments)
@@ -0,0 +1,113 @@
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from app import DatasetCache, EnhancedHealthcareAI, create_comprehensive_sample_data, optimize_dataframe_dtypes
+
+
+@pytest.fixture(scope="module")
+def csv_bytes():
+    return create_comprehensive_sample_data().to_csv(index=False).encode("utf-8")
+
+
+def test_round_trip_is_parsed_once_then_shared_then_mapped(tmp_path, csv_bytes):
+    parses = []
+
+    def parse(buffer):
+        parses.append(1)
+        return pd.read_csv(buffer)
+
+    cache = DatasetCache(str(tmp_path))
+    first, source = cache.load(csv_bytes, "upload.csv", parse)
+    assert source == "parsed"
+    second, source = cache.load(csv_bytes, "upload.csv", parse)
+    assert source == "memory" and second is first
+
+    reopened, source = DatasetCache(str(tmp_path)).load(csv_bytes, "upload.csv", parse)
+    assert source == "disk" and len(parses) == 1
+    pd.testing.assert_frame_equal(reopened, pd.read_csv(BytesIO(csv_bytes)), check_dtype=False)
+    assert cache.key_for(csv_bytes, "upload.csv") != cache.key_for(csv_bytes, "upload.xlsx")
+
+
+def test_mixed_object_columns_are_shared_without_a_file(tmp_path):
+    frame = pd.DataFrame({"mixed": [1, "two", 3.0]})
+    cache = DatasetCache(str(tmp_path))
+    loaded, source = cache.load(b"mixed", "mixed.csv", lambda buffer: frame)
+    assert source == "parsed" and loaded is frame
+    assert cache.load(b"mixed", "mixed.csv", lambda buffer: frame)[1] == "memory"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".feather")]
+
+
+def test_prune_keeps_the_newest_file_within_max_bytes(tmp_path):
+    cache = DatasetCache(str(tmp_path), max_bytes=1)
+    for n in range(3):
+        cache.load(f"v{n}".encode(), "a.csv", lambda buffer, n=n: pd.DataFrame({"x": np.arange(100) + n}))
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".feather")]
+    assert files == [os.path.basename(cache.path_for(cache.key_for(b"v2", "a.csv")))]
+
+
+def test_without_pyarrow_uploads_are_parsed_every_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "pa", None)
+    cache = DatasetCache(str(tmp_path))
+    assert not cache.enabled
+    assert cache.load(b"x\n1\n", "a.csv", pd.read_csv)[1] == "parsed"
+    assert cache.load(b"x\n1\n", "a.csv", pd.read_csv)[1] == "parsed"
+
+
+def test_load_dataset_ingests_before_caching(csv_bytes):
+    data, _ = EnhancedHealthcareAI().load_dataset(csv_bytes, "sample.csv")
+    assert "dtype_report" in data.attrs
+    assert isinstance(data["Department"].dtype, pd.CategoricalDtype)
+
+
+def test_dtype_pass_is_lossless():
+    frame = pd.DataFrame({
+        "whole": [1.0, 2.0, 300.0, -4.0],
+        "halves": [0.5, 1.25, np.nan, 2.0],
+        "tenths": [0.1, 0.2, 0.3, 0.4],
+        "infinite": [1.0, np.inf, 2.0, 3.0],
+        "huge": [1e19, 2.0, 3.0, 4.0],
+        "beyond_int53": [2.0 ** 53 + 2, 1.0, 2.0, 3.0],
+        "flag": [True, False, True, True],
+        "count": np.array([1, 2, 3, 4], dtype=np.int64),
+    })
+    optimized, report = optimize_dataframe_dtypes(frame)
+
+    assert optimized["whole"].dtype == np.int16 and optimized["count"].dtype == np.int8
+    assert optimized["halves"].dtype == np.float32 and optimized["infinite"].dtype == np.float32
+    for col in ["tenths", "huge", "beyond_int53"]:
+        assert optimized[col].dtype == np.float64, col
+    assert optimized["flag"].dtype == bool
+    pd.testing.assert_frame_equal(optimized.astype(frame.dtypes.to_dict()), frame)
+    assert set(report["conversions"]) == {"whole", "count", "halves", "infinite"}
+    assert report["memory_after"] < report["memory_before"]
+
+
+def test_only_low_cardinality_text_becomes_categorical():
+    frame = pd.DataFrame({
+        "ward": ["A", "B", "A", "B", None, "A"],
+        "note": ["one", "two", "three", "four", "five", "six"],
+        "mixed": ["A", 1, "A", 1, "A", 1],
+    })
+    optimized, report = optimize_dataframe_dtypes(frame)
+    assert isinstance(optimized["ward"].dtype, pd.CategoricalDtype)
+    assert optimized["ward"].isna().sum() == 1
+    assert optimized["note"].dtype == frame["note"].dtype
+    assert optimized["mixed"].dtype == object
+    assert list(report["conversions"]) == ["ward"]
+
+
+def test_ingest_keeps_the_analysis_unchanged():
+    raw = create_comprehensive_sample_data()
+    ai = EnhancedHealthcareAI()
+    ingested = ai.ingest_dataframe(raw)
+    assert ingested.attrs["dtype_report"]["memory_after"] < ingested.attrs["dtype_report"]["memory_before"]
+    before = ai.analyze_multimodal_data(raw, use_cache=False)
+    after = ai.analyze_multimodal_data(ingested, use_cache=False)
+    assert before["summary"]["missing_data"] == after["summary"]["missing_data"]
+    pd.testing.assert_frame_equal(pd.DataFrame(before["correlations"]), pd.DataFrame(after["correlations"]),
+                                  check_dtype=False, atol=1e-6)
@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+
+from app import EnhancedHealthcareAI, SensitivityEngine
+
+CRITERIA = ["Patient Safety", "Cost Effectiveness", "Staff Impact", "Quality Outcomes"]
+ALTERNATIVES = ["Telehealth", "New Wing", "Staff Training"]
+
+
+@pytest.fixture(scope="module")
+def ai():
+    return EnhancedHealthcareAI()
+
+
+def consistent_matrix(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights[:, None] / weights[None, :]
+
+
+def test_anp_limit_matrix_is_stationary(ai):
+    dependencies = {"Cost Effectiveness": ["Patient Safety", "Staff Impact"]}
+    results = ai.perform_anp_analysis(CRITERIA, ALTERNATIVES, dependencies, seed=11)
+    assert "error" not in results and results["converged"]
+    supermatrix, limit = results["supermatrix"], results["limit_matrix"]
+    np.testing.assert_allclose(supermatrix.sum(axis=0), 1.0)
+    np.testing.assert_allclose(supermatrix @ limit, limit, atol=1e-9)
+    np.testing.assert_allclose(limit, limit[:, :1].repeat(limit.shape[1], axis=1), atol=1e-9)
+    assert sum(results["final_scores"]) == pytest.approx(1.0)
+    assert results["dependencies"] == {"Cost Effectiveness": ["Patient Safety", "Staff Impact"]}
+
+
+def test_anp_without_dependencies_reduces_to_weighted_sum(ai):
+    results = ai.perform_anp_analysis(CRITERIA, ALTERNATIVES, seed=3)
+    # Bipartite network: limiting alternative scores are the priorities weighted by criteria weights
+    expected = results["alternative_priorities"] @ np.asarray(results["local_criteria_weights"])
+    np.testing.assert_allclose(results["final_scores"], expected / expected.sum(), atol=1e-9)
+    np.testing.assert_allclose(results["criteria_weights"], results["local_criteria_weights"], atol=1e-9)
+
+
+def test_anp_is_reproducible_with_a_seed(ai):
+    first = ai.perform_anp_analysis(CRITERIA, ALTERNATIVES, [("Staff Impact", "Quality Outcomes")], seed=5)
+    second = ai.perform_anp_analysis(CRITERIA, ALTERNATIVES, [("Staff Impact", "Quality Outcomes")], seed=5)
+    assert first["final_scores"] == second["final_scores"]
+
+
+def test_priority_vectors_match_eigendecomposition(ai):
+    matrices = ai._generate_comparison_matrices(200, 6, np.random.default_rng(2))
+    priority = ai._calculate_priority_vectors(matrices)
+    for matrix, weights, lambda_max in zip(matrices, priority["weights"], priority["lambda_max"]):
+        eigenvalues, eigenvectors = np.linalg.eig(matrix)
+        principal = np.argmax(eigenvalues.real)
+        expected = np.abs(eigenvectors[:, principal].real)
+        assert lambda_max == pytest.approx(eigenvalues.real.max(), rel=1e-9)
+        np.testing.assert_allclose(weights, expected / expected.sum(), atol=1e-9)
+    ri = ai._random_consistency_index(6)
+    np.testing.assert_allclose(priority["cr"], (priority["lambda_max"] - 6) / 5 / ri)
+
+
+def test_consistent_matrix_has_zero_consistency_ratio(ai):
+    weights = np.array([0.5, 0.2, 0.2, 0.1])
+    priority = ai._calculate_priority_vectors(consistent_matrix(weights))
+    np.testing.assert_allclose(priority["weights"], weights)
+    assert priority["lambda_max"] == pytest.approx(4.0)
+    assert priority["cr"] == pytest.approx(0.0, abs=1e-12)
+
+
+def test_random_index_continues_the_table_smoothly(ai):
+    values = np.array([ai._random_consistency_index(n) for n in range(13, 60)])
+    assert values[2] == 1.59  # n = 15, last tabulated size
+    assert np.all(np.diff(values) > 0)
+    assert values[3] - values[2] < 0.02  # no jump at n = 16
+    assert values[-1] < 1.98
+
+
+def test_generated_matrices_are_reciprocal_and_seeded(ai):
+    matrices = ai._generate_comparison_matrices(50, 5, np.random.default_rng(1))
+    assert matrices.shape == (50, 5, 5)
+    np.testing.assert_allclose(matrices * np.swapaxes(matrices, 1, 2), 1.0)
+    np.testing.assert_array_equal(np.diagonal(matrices, axis1=1, axis2=2), 1.0)
+    assert np.all((matrices >= 1 / 9) & (matrices <= 9))
+    np.testing.assert_array_equal(matrices, ai._generate_comparison_matrices(50, 5, np.random.default_rng(1)))
+    single = ai._generate_comparison_matrix(5, np.random.default_rng(1))
+    np.testing.assert_array_equal(single, ai._generate_comparison_matrices(1, 5, np.random.default_rng(1))[0])
+
+
+def test_sensitivity_thresholds_are_exact_ties():
+    rng = np.random.default_rng(8)
+    engine = SensitivityEngine(rng.dirichlet(np.ones(4)), rng.dirichlet(np.ones(3), size=4).T)
+    top = engine.base_order[0]
+    crossings = 0
+    for i, threshold in enumerate(engine.thresholds()):
+        for bound, winner in (("lower", "lower_winner"), ("upper", "upper_winner")):
+            if threshold[bound] is None:
+                continue
+            crossings += 1
+            scores = engine.scores(engine.one_at_a_time_weights([threshold[bound]])[i, 0])
+            assert scores[top] == pytest.approx(scores[threshold[winner]], abs=1e-12)
+    assert crossings
+
+
+def test_one_at_a_time_weights_stay_on_the_simplex():
+    engine = SensitivityEngine([0.5, 0.3, 0.2], np.eye(3))
+    weights = engine.one_at_a_time_weights(np.linspace(0, 1, 11))
+    np.testing.assert_allclose(weights.sum(axis=-1), 1.0)
+    # Untouched criteria keep their relative proportions
+    np.testing.assert_allclose(weights[0, 3, 1] / weights[0, 3, 2], 1.5)
+
+
+def test_sensitivity_monte_carlo_probabilities():
+    engine = SensitivityEngine([0.5, 0.3, 0.2], np.array([[0.6, 0.2, 0.3], [0.4, 0.8, 0.7]]))
+    result = engine.monte_carlo(5000, rng=np.random.default_rng(0))
+    np.testing.assert_allclose(result["rank_probabilities"].sum(axis=0), 1.0)
+    np.testing.assert_allclose(result["rank_probabilities"].sum(axis=1), 1.0)
+    np.testing.assert_allclose(result["outrank_matrix"] + result["outrank_matrix"].T, 1 - np.eye(2))
+    assert 0.0 <= result["top_change_probability"] <= result["ranking_change_probability"] <= 1.0
+
+
+def test_sensitivity_analysis_of_an_anp_result(ai):
+    anp = ai.perform_anp_analysis(CRITERIA, ALTERNATIVES, {"Cost Effectiveness": ["Patient Safety"]}, seed=2)
+    result = ai.perform_sensitivity_analysis(anp, n_perturbations=2000, seed=1)
+    assert "error" not in result
+    # With the alternatives' share of each criterion column, base scores are the ANP limit scores
+    shares = anp["supermatrix"][len(CRITERIA):, :len(CRITERIA)].sum(axis=0)
+    engine = SensitivityEngine(anp["criteria_weights"], anp["alternative_priorities"], shares)
+    np.testing.assert_allclose(engine.base_scores / engine.base_scores.sum(), anp["final_scores"], atol=1e-9)
+    assert result["sweep_scores"].shape == (len(CRITERIA), 101, len(ALTERNATIVES))
+    assert [threshold["criterion"] for threshold in result["thresholds"]] == CRITERIA
+
+
+def test_ahp_lambda_max_matches_eigvals(ai):
+    rng = np.random.default_rng(4)
+    judgments = consistent_matrix([0.4, 0.3, 0.2, 0.1]) * np.exp(rng.normal(0, 0.1, (4, 4)))
+    judgments = np.sqrt(judgments / judgments.T)  # reciprocal again after the noise
+    results = ai.perform_ahp_analysis(CRITERIA, judgments)
+    assert "error" not in results
+    assert results["lambda_max"] == pytest.approx(np.linalg.eigvals(judgments).real.max(), rel=1e-9)
+    assert results["consistency_ratio"] < 0.1 and not results["suggested_edits"]
+    assert sum(results["criteria_weights"]) == pytest.approx(1.0)
+
+
+def test_ahp_recovers_weights_from_incomplete_consistent_judgments(ai):
+    weights = np.array([0.5, 0.25, 0.15, 0.1])
+    judgments = consistent_matrix(weights)
+    judgments[0, 3] = judgments[3, 0] = np.nan
+    judgments[1, 2] = np.nan  # either half of a pair is enough
+    results = ai.perform_ahp_analysis(CRITERIA, judgments)
+    np.testing.assert_allclose(results["criteria_weights"], weights, atol=1e-9)
+    assert results["consistency_ratio"] == pytest.approx(0.0, abs=1e-9)
+    assert results["filled_entries"][0, 3] and not results["filled_entries"][1, 2]
+
+
+def test_ahp_aggregates_raters_by_geometric_mean(ai):
+    first, second = consistent_matrix([0.4, 0.3, 0.2, 0.1]), consistent_matrix([0.1, 0.2, 0.3, 0.4])
+    results = ai.perform_ahp_analysis(CRITERIA, np.stack([first, second]))
+    assert results["n_raters"] == 2
+    np.testing.assert_allclose(results["judgment_matrix"], np.sqrt(first * second))
+    np.testing.assert_allclose(results["rater_consistency_ratios"], 0.0, atol=1e-9)
+
+
+def test_ahp_suggests_edits_for_inconsistent_judgments(ai):
+    judgments = consistent_matrix([0.4, 0.3, 0.2, 0.1])
+    judgments[0, 3], judgments[3, 0] = 1 / 9, 9.0
+    results = ai.perform_ahp_analysis(CRITERIA, judgments)
+    assert results["consistency_ratio"] >= 0.1
+    assert results["suggested_edits"]
+    assert results["repaired_consistency_ratio"] < results["consistency_ratio"]
+    assert {results["suggested_edits"][0]["row"], results["suggested_edits"][0]["col"]} <= set(CRITERIA)
+
+
+def test_ahp_rejects_disconnected_judgments(ai):
+    judgments = np.full((4, 4), np.nan)
+    judgments[0, 1], judgments[2, 3] = 3.0, 5.0
+    assert "link every item" in ai.perform_ahp_analysis(CRITERIA, judgments)["error"]
+
+
+def test_ahp_ranks_alternatives(ai):
+    alternative_judgments = [consistent_matrix(w) for w in ([0.6, 0.3, 0.1], [0.2, 0.5, 0.3],
+                                                            [0.3, 0.3, 0.4], [0.5, 0.25, 0.25])]
+    results = ai.perform_ahp_analysis(CRITERIA, consistent_matrix([0.4, 0.3, 0.2, 0.1]),
+                                      ALTERNATIVES, alternative_judgments)
+    expected = np.array([[0.6, 0.2, 0.3, 0.5], [0.3, 0.5, 0.3, 0.25], [0.1, 0.3, 0.4, 0.25]]) @ [0.4, 0.3, 0.2, 0.1]
+    np.testing.assert_allclose(results["final_scores"], expected, atol=1e-9)
+    assert results["ranking"][0][0] == ALTERNATIVES[int(np.argmax(expected))]
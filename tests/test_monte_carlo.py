@@ -0,0 +1,156 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from app import EnhancedHealthcareAI, MonteCarloEngine, QuantileSketch
+
+PARAMS = {
+    "Patient Volume": {"distribution": "normal", "mean": 1000, "std": 100},
+    "Cost Per Case": {"distribution": "uniform", "min": 2000, "max": 5000},
+    "Satisfaction": {"distribution": "beta", "alpha": 8, "beta": 2}
+}
+CORRELATION = np.array([
+    [1.0, 0.4, -0.3],
+    [0.4, 1.0, 0.0],
+    [-0.3, 0.0, 1.0]
+])
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return MonteCarloEngine(PARAMS, correlation=CORRELATION, chunk_size=100_000)
+
+
+@pytest.fixture(scope="module")
+def ai():
+    return EnhancedHealthcareAI()
+
+
+def test_correlated_draws_follow_the_copula(engine):
+    samples = engine.run(200_000, np.random.default_rng(5), dtype=np.float64)
+    ranks = samples.argsort(axis=0).argsort(axis=0)
+    spearman = np.corrcoef(ranks, rowvar=False)
+    # Spearman correlation of a Gaussian copula: 6/pi * asin(rho/2)
+    np.testing.assert_allclose(spearman, 6 / np.pi * np.arcsin(CORRELATION / 2), atol=0.01)
+    assert samples[:, 1].min() >= 2000 and samples[:, 1].max() <= 5000
+    assert 0 < samples[:, 2].min() and samples[:, 2].max() < 1
+
+
+def test_marginals_match_their_distributions(engine):
+    summary = engine.summarize(engine.run(400_000, np.random.default_rng(6)), keep_samples=False)
+    assert summary["Patient Volume"]["mean"] == pytest.approx(1000, abs=1)
+    assert summary["Patient Volume"]["std"] == pytest.approx(100, rel=0.01)
+    assert summary["Cost Per Case"]["percentiles"]["50th"] == pytest.approx(3500, abs=15)
+    assert summary["Satisfaction"]["mean"] == pytest.approx(0.8, abs=0.002)
+    assert "samples" not in summary["Satisfaction"]
+
+
+def test_run_is_reproducible_with_a_seed(engine):
+    first = engine.run(250_000, np.random.default_rng(9))
+    second = engine.run(250_000, np.random.default_rng(9))
+    np.testing.assert_array_equal(first, second)
+
+
+@pytest.mark.parametrize("correlation", [
+    np.eye(2),
+    np.array([[1.0, 0.5, 0.0], [0.4, 1.0, 0.0], [0.0, 0.0, 1.0]]),
+    np.array([[1.0, 0.9, 0.9], [0.9, 1.0, -0.9], [0.9, -0.9, 1.0]])
+])
+def test_rejects_invalid_correlation(correlation):
+    with pytest.raises(ValueError):
+        MonteCarloEngine(PARAMS, correlation=correlation)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_scenario_analysis_requires_simulations(ai, streaming):
+    result = ai.perform_scenario_analysis(PARAMS, n_simulations=0, streaming=streaming)
+    assert result == {"error": "Scenario analysis error: the number of simulations must be at least 1"}
+
+
+def test_streamed_percentiles_match_in_memory(engine):
+    n = 1_000_000
+    in_memory = engine.summarize(engine.run(n, np.random.default_rng(1), dtype=np.float64), keep_samples=False)
+    streamed = engine.summarize_streaming(*engine.run_streaming(n, seed=2))
+    for name in PARAMS:
+        spread = in_memory[name]["percentiles"]["95th"] - in_memory[name]["percentiles"]["5th"]
+        assert streamed[name]["mean"] == pytest.approx(in_memory[name]["mean"], abs=0.005 * spread)
+        assert streamed[name]["std"] == pytest.approx(in_memory[name]["std"], rel=0.01)
+        for label in MonteCarloEngine.PERCENTILES:
+            assert streamed[name]["percentiles"][label] == pytest.approx(
+                in_memory[name]["percentiles"][label], abs=0.01 * spread
+            ), (name, label)
+        assert streamed[name]["histogram"]["counts"].sum() == pytest.approx(n, rel=0.01)
+
+
+def test_streamed_normal_percentiles_match_theory(engine):
+    summary = engine.summarize_streaming(*engine.run_streaming(1_000_000, seed=3))["Patient Volume"]
+    distribution = NormalDist(1000, 100)
+    for label, q in MonteCarloEngine.PERCENTILES.items():
+        assert summary["percentiles"][label] == pytest.approx(distribution.inv_cdf(q), abs=1.5)
+
+
+@pytest.mark.parametrize("capacity", [256, 2048])
+def test_quantile_sketch_rank_error_bound(capacity):
+    rng = np.random.default_rng(capacity)
+    values = rng.lognormal(size=500_000)
+    sketch = QuantileSketch(capacity, seed=1)
+    for i, block in enumerate(np.array_split(values, 10)):
+        sketch.merge(QuantileSketch(capacity, seed=i).update(block))
+    assert sketch.count == len(values)
+    assert sum(len(level) for level in sketch.levels) <= capacity * len(sketch.levels)
+
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+    # Compactions lose O(1/capacity) rank per level, with log2(n / capacity) levels
+    assert np.abs(ranks - qs).max() <= np.log2(len(values) / capacity) / capacity
+
+
+def test_quantile_sketch_exact_below_capacity():
+    values = np.random.default_rng(5).normal(size=1000)
+    sketch = QuantileSketch(2048).update(values)
+    sorted_values = np.sort(values)
+    np.testing.assert_array_equal(sketch.quantiles([0.001, 0.5, 1.0]), sorted_values[[0, 499, 999]])
+    counts, edges = sketch.histogram(10)
+    np.testing.assert_array_equal(counts, np.histogram(values, bins=10)[0])
+
+
+def test_streaming_is_reproducible_across_worker_counts(engine):
+    single = engine.summarize_streaming(*engine.run_streaming(800_000, seed=7, n_workers=1))
+    pooled = engine.summarize_streaming(*engine.run_streaming(800_000, seed=7, n_workers=2))
+    for name in PARAMS:
+        assert single[name]["percentiles"] == pooled[name]["percentiles"]
+        assert single[name]["mean"] == pooled[name]["mean"]
+
+
+def test_streaming_progress_is_monotonic_when_the_pool_fails(engine, monkeypatch):
+    import app
+    from concurrent.futures.process import BrokenProcessPool
+
+    def broken_pool(tasks):
+        for i, task in enumerate(tasks):
+            if i == 2:
+                raise BrokenProcessPool("worker died")
+            yield app._simulate_block_group(task)
+
+    class FailingPool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, function, tasks):
+            return broken_pool(tasks)
+
+    monkeypatch.setattr(app, "ProcessPoolExecutor", FailingPool)
+    progress = []
+    moments, _ = engine.run_streaming(1_000_000, seed=4, n_workers=4, blocks_per_task=1,
+                                      progress_callback=lambda done, total: progress.append(done))
+    assert progress == sorted(progress) and len(set(progress)) == len(progress)
+    assert progress[-1] == 1_000_000 and moments.count[0] == 1_000_000
+    reference, _ = engine.run_streaming(1_000_000, seed=4, blocks_per_task=1)
+    np.testing.assert_array_equal(moments.mean, reference.mean)
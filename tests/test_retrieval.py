@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app import EnhancedHealthcareAI, HealthConfig, KnowledgeRetriever
+
+DOCS_DIR = os.path.join(HealthConfig.BASE_DIR, "data", "knowledge")
+
+
+@pytest.fixture(scope="module")
+def knowledge_base():
+    return EnhancedHealthcareAI._initialize_comprehensive_knowledge()
+
+
+@pytest.fixture(scope="module")
+def retriever(knowledge_base):
+    return KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=DOCS_DIR)
+
+
+def test_tokenize_drops_stop_words_and_stems():
+    assert KnowledgeRetriever.tokenize("How to REDUCE the readmissions?") == ["reduc", "readmission"]
+    stems = {KnowledgeRetriever.stem(word) for word in ("reducing", "reduces", "reduced", "reduction", "reduce")}
+    assert stems == {"reduc"}
+
+
+def test_bm25_scores_match_reference(knowledge_base):
+    passages = [
+        {"key": "a", "title": "Falls", "text": "fall risk fall prevention bed alarm"},
+        {"key": "b", "title": "Sepsis", "text": "sepsis bundle lactate fall"},
+        {"key": "c", "title": "Hygiene", "text": "hand hygiene alcohol rub"}
+    ]
+    retriever = KnowledgeRetriever(k1=1.2, b=0.75)
+    retriever.build_from_passages(passages)
+    docs = [retriever.tokenize(f"{p['title']} {p['text']}") for p in passages]
+    avg_length = np.mean([len(doc) for doc in docs])
+
+    def bm25(query, doc):
+        score = 0.0
+        for term in set(retriever.tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if tf:
+                idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(doc) / avg_length))
+        return score
+
+    results = retriever.search("falls prevention", top_k=3)
+    assert [hit["key"] for hit in results] == ["a", "b"]
+    for hit in results:
+        doc = docs[[p["key"] for p in passages].index(hit["key"])]
+        assert hit["score"] == pytest.approx(bm25("falls prevention", doc), rel=1e-6)
+    assert retriever.search("unrelated words only") == []
+
+
+def test_readmission_query_ranks_the_readmission_entry_first(retriever):
+    results = retriever.search("how to reduce readmission", top_k=3)
+    assert results[0]["title"] == "Reducing Hospital Readmission Rates"
+
+
+def test_passages_round_trip_text(retriever):
+    titles = {retriever.get_passage(i)["title"] for i in range(retriever.n_passages)}
+    assert "Hand Hygiene Standard Operating Procedure" in titles
+    assert all(retriever.get_passage(i)["text"] for i in range(retriever.n_passages))
+
+
+def write_doc(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    return path
+
+
+def test_persisted_index_is_memory_mapped_on_reload(tmp_path, knowledge_base):
+    docs, index = tmp_path / "docs", str(tmp_path / "index")
+    docs.mkdir()
+    write_doc(docs, "falls.md", "# Falls Prevention\nHourly rounding prevents inpatient falls.\n")
+    built = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index)
+    reloaded = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index)
+    assert isinstance(reloaded.postings_weight, np.memmap)
+    assert reloaded.search("inpatient falls") == built.search("inpatient falls")
+    assert reloaded.search("inpatient falls")[0]["title"] == "Falls Prevention"
+
+
+def test_index_rebuilds_when_documents_change(tmp_path, knowledge_base):
+    docs, index = tmp_path / "docs", str(tmp_path / "index")
+    docs.mkdir()
+    path = write_doc(docs, "falls.md", "# Falls Prevention\nHourly rounding prevents inpatient falls.\n")
+    KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index)
+    write_doc(docs, "falls.md", "# Falls Prevention\nBed alarms and non-slip socks for every delirium patient.\n")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    rebuilt = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index)
+    assert rebuilt.search("delirium")[0]["title"] == "Falls Prevention"
+    assert os.listdir(tmp_path / "index")
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".index")] == []
+
+
+def test_incomplete_manifest_triggers_rebuild(tmp_path, knowledge_base):
+    index = str(tmp_path / "index")
+    KnowledgeRetriever.load_or_build(knowledge_base, index_dir=index)
+    manifest_path = os.path.join(index, "manifest.json")
+    with open(manifest_path, encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    del manifest["k1"]
+    with open(manifest_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle)
+    assert KnowledgeRetriever.load(index, manifest["signature"]) is None
+    rebuilt = KnowledgeRetriever.load_or_build(knowledge_base, index_dir=index)
+    assert rebuilt.n_passages and KnowledgeRetriever.load(index, manifest["signature"]) is not None
+
+
+def load_protocol(path):
+    """Test loader: one passage per '::'-separated line"""
+    with open(path, encoding="utf-8") as handle:
+        yield "Protocol " + os.path.basename(path), (line.replace("::", " ") for line in handle)
+
+
+def test_registered_loaders_are_ingested_and_signed(tmp_path, knowledge_base):
+    docs, index = tmp_path / "docs", str(tmp_path / "index")
+    docs.mkdir()
+    write_doc(docs, "stroke.proto", "door-to-needle::under sixty minutes::thrombolysis\n")
+    plain = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index)
+    assert plain.search("thrombolysis") == []
+    extended = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index,
+                                                loaders={".proto": load_protocol})
+    assert extended.search("thrombolysis")[0]["title"] == "Protocol stroke.proto"
+    # The loader set is part of the signature, so the extended index is reused only with it
+    reloaded = KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index,
+                                                loaders={".proto": load_protocol})
+    assert isinstance(reloaded.postings_weight, np.memmap)
+    assert KnowledgeRetriever.load_or_build(knowledge_base, docs_dir=str(docs), index_dir=index).search("thrombolysis") == []
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from app import (HealthConfig, SentimentEngine, analyze_sentiment, analyze_sentiment_batch,
+                 create_comprehensive_sample_data, get_sentiment_memo, normalize_feedback, score_feedback)
+
+
+@pytest.fixture(scope="module")
+def feedback():
+    return create_comprehensive_sample_data()["Patient_Feedback"]
+
+
+def test_batch_labels_match_single_text_analysis(feedback):
+    result = analyze_sentiment_batch(feedback)
+    assert result.index.equals(feedback.index)
+    assert list(result["Sentiment"]) == [analyze_sentiment(text)[0] for text in feedback]
+    assert result["Sentiment_Score"].between(-1, 1).all()
+
+
+def test_batch_handles_missing_text_and_keeps_the_index():
+    texts = pd.Series(["Excellent care", None, "", "   ", np.nan, "Terrible wait"], index=list("abcdef"))
+    result = analyze_sentiment_batch(texts)
+    assert list(result.index) == list("abcdef")
+    assert list(result["Sentiment"]) == ["Positive", "Unknown", "Unknown", "Unknown", "Unknown", "Negative"]
+    assert result["Sentiment_Score"].isna().sum() == 4
+    assert analyze_sentiment(None) == ("Unknown", HealthConfig.SENTIMENT_COLORS["Unknown"])
+
+
+def test_batch_scores_each_distinct_text_once():
+    texts = pd.Series(["Good staff", "good  STAFF", "Good staff", "Rude nurse"] * 50)
+    stats = analyze_sentiment_batch(texts).attrs["sentiment_stats"]
+    assert stats["rows"] == 200 and stats["unique_texts"] == 2
+    assert stats["dedupe_ratio"] == pytest.approx(100.0)
+    assert analyze_sentiment_batch([]).attrs["sentiment_stats"]["dedupe_ratio"] == 0.0
+
+
+@pytest.fixture
+def engine():
+    return SentimentEngine()
+
+
+def score(engine, text):
+    return engine.score([text])[0]
+
+
+def test_negation_scope_stops_at_punctuation(engine):
+    good = score(engine, "good")
+    negated = HealthConfig.SENTIMENT_LEXICON["good"] * SentimentEngine.NEGATION_SCALAR
+    assert score(engine, "not good") == pytest.approx(negated / np.sqrt(negated ** 2 + SentimentEngine.ALPHA))
+    assert score(engine, "wasn't helpful") < 0
+    assert score(engine, "not. good") == pytest.approx(good)
+    assert score(engine, "The staff were good, not rude") > 0
+
+
+def test_phrases_intensifiers_and_whole_words(engine):
+    assert score(engine, "long wait") < 0 and score(engine, "well informed") > 0
+    assert score(engine, "wait long") == 0 and score(engine, "long") == 0
+    assert score(engine, "very good") > score(engine, "good") > score(engine, "slightly good")
+    assert score(engine, "goodness") == 0
+
+
+def test_but_shifts_weight_to_the_second_clause(engine):
+    assert score(engine, "good but rude") < 0 < score(engine, "rude but good")
+
+
+def test_phrases_do_not_span_texts(engine):
+    scores = engine.score(["it was long", "wait times were fine"])
+    assert scores.tolist() == [0.0, 0.0]
+
+
+def test_python_fallback_and_chunking_match_pyarrow(engine, feedback, monkeypatch):
+    texts = list(feedback) + ["Not very helpful, but the nurse was KIND!", "no problems at all"]
+    expected = engine.score(texts)
+    monkeypatch.setattr(SentimentEngine, "CHUNK_TEXTS", 7)
+    np.testing.assert_allclose(engine.score(texts), expected)
+    monkeypatch.setattr(app, "pa", None)
+    np.testing.assert_allclose(engine.score(texts), expected)
+
+
+def test_scores_are_bounded_and_missing_text_is_nan(engine):
+    scores = engine.score(["excellent " * 50, "terrible " * 50, None, ""])
+    assert 0.99 < scores[0] <= 1 and -1 <= scores[1] < -0.99
+    assert np.isnan(scores[2:]).all()
+    assert list(engine.labels([0.5, -0.5, 0.0, np.nan])) == ["Positive", "Negative", "Neutral", "Unknown"]
+    with pytest.raises(ValueError, match="two words"):
+        SentimentEngine(phrases={"far too long": -1.0})
+
+
+@pytest.fixture
+def memo():
+    memo = get_sentiment_memo()
+    memo.clear()
+    yield memo
+    memo.clear()
+
+
+def test_normalized_keys_ignore_case_and_spacing():
+    keys = normalize_feedback(["  Very GOOD\tcare ", "very good care", "", "   ", None, 3.5])
+    assert list(keys) == ["very good care", "very good care", None, None, None, None]
+
+
+def test_scores_are_served_from_the_memo(memo):
+    first = score_feedback(["good care", "rude staff"])
+    hits = memo.hits
+    np.testing.assert_array_equal(score_feedback(["rude staff", "good care"]), first[::-1])
+    assert memo.hits == hits + 2 and len(memo) == 2
+
+    stats = analyze_sentiment_batch(pd.Series(["Good care", "RUDE staff", "new text"])).attrs["sentiment_stats"]
+    assert stats["memo_hits"] == 2 and stats["unique_texts"] == 3
+
+
+def test_oversized_batches_bypass_the_memo(memo, monkeypatch):
+    monkeypatch.setattr(memo, "max_entries", 2)
+    keys = ["good", "bad", "slow"]
+    np.testing.assert_array_equal(score_feedback(keys), SentimentEngine().score(keys))
+    assert len(memo) == 0
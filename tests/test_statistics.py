@@ -0,0 +1,130 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import EnhancedHealthcareAI, IncrementalStatistics, RunningMoments, create_comprehensive_sample_data
+
+
+@pytest.fixture(scope="module")
+def sample_data():
+    return create_comprehensive_sample_data()
+
+
+@pytest.fixture
+def gappy():
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame(rng.normal(size=(400, 4)) * [1, 10, 1e3, 0.1] + 1e6, columns=list("abcd"))
+    frame["c"] = frame["a"] * 2 + rng.normal(size=400)
+    frame["Department"] = rng.choice(["ICU", "ER", "Surgery"], size=400)
+    frame = frame.mask(rng.random(frame.shape) < 0.1)
+    return frame
+
+
+def numeric(frame):
+    return frame.select_dtypes(include=[np.number]).columns
+
+
+def test_chunked_correlation_matches_pandas(gappy):
+    stats = IncrementalStatistics(numeric(gappy), "Department", gappy.columns)
+    for start in range(0, len(gappy), 70):
+        stats.update(gappy.iloc[start:start + 70])
+    pd.testing.assert_frame_equal(stats.correlation(), gappy[numeric(gappy)].corr(), atol=1e-9)
+    assert stats.missing_counts() == gappy.isna().sum().to_dict()
+    assert stats.means() == pytest.approx(gappy[numeric(gappy)].mean().to_dict())
+
+
+def test_group_summary_matches_groupby(gappy):
+    stats = IncrementalStatistics(numeric(gappy), "Department", gappy.columns).update(gappy)
+    expected = gappy.groupby("Department")[list(numeric(gappy))].agg(["mean", "std"])
+    pd.testing.assert_frame_equal(stats.group_summary(), expected, check_names=False, atol=1e-6)
+
+
+def test_running_moments_merge_and_remove():
+    rng = np.random.default_rng(0)
+    values = rng.normal(5, 2, size=(1000, 3))
+    moments = RunningMoments(3).update(values[:300]).merge(RunningMoments(3).update(values[300:]))
+    np.testing.assert_allclose(moments.mean, values.mean(axis=0))
+    np.testing.assert_allclose(moments.std(ddof=1), values.std(axis=0, ddof=1))
+
+    part = RunningMoments(3).update(values[:300])
+    moments.remove_stats(part.count, part.mean, part.m2)
+    np.testing.assert_allclose(moments.mean, values[300:].mean(axis=0))
+    np.testing.assert_allclose(moments.variance(), values[300:].var(axis=0))
+
+
+def test_remove_undoes_update(gappy):
+    stats = IncrementalStatistics(numeric(gappy), "Department", gappy.columns).update(gappy)
+    stats.remove(gappy.iloc[::3])
+    rest = gappy.drop(gappy.index[::3])
+    pd.testing.assert_frame_equal(stats.correlation(), rest[numeric(rest)].corr(), atol=1e-9)
+    expected = rest.groupby("Department")[list(numeric(rest))].agg(["mean", "std"])
+    pd.testing.assert_frame_equal(stats.group_summary(), expected, check_names=False, atol=1e-6)
+    assert stats.n_rows == len(rest) and stats.missing_counts() == rest.isna().sum().to_dict()
+
+
+def assert_same_analysis(analysis, data):
+    expected = EnhancedHealthcareAI()._compute_multimodal_analysis(data)
+    assert analysis["summary"] == expected["summary"]
+    pd.testing.assert_frame_equal(pd.DataFrame(analysis["correlations"]), pd.DataFrame(expected["correlations"]),
+                                  atol=1e-9)
+    pd.testing.assert_frame_equal(pd.DataFrame(analysis["patterns"]["department_analysis"]),
+                                  pd.DataFrame(expected["patterns"]["department_analysis"]), atol=0.011)
+
+
+def test_session_statistics_follow_appends_and_filters(sample_data):
+    ai = EnhancedHealthcareAI()
+    ai.analyze_multimodal_data(sample_data, use_cache=False)
+    stats = ai._incremental[2]
+
+    appended = pd.concat([sample_data, sample_data.iloc[:40]], ignore_index=True)
+    assert_same_analysis(ai.analyze_multimodal_data(appended, use_cache=False), appended)
+    assert ai._incremental[2] is stats and stats.n_rows == len(appended)
+
+    filtered = appended[appended["Safety_Score"] > appended["Safety_Score"].quantile(0.25)]
+    assert_same_analysis(ai.analyze_multimodal_data(filtered, use_cache=False), filtered)
+    assert ai._incremental[2] is stats and stats.n_rows == len(filtered)
+
+    widened = appended[appended["Safety_Score"] > appended["Safety_Score"].quantile(0.1)]
+    assert_same_analysis(ai.analyze_multimodal_data(widened, use_cache=False), widened)
+    assert ai._incremental[2] is stats
+
+
+def test_session_statistics_rebuild_when_old_rows_change(sample_data):
+    ai = EnhancedHealthcareAI()
+    ai.analyze_multimodal_data(sample_data, use_cache=False)
+    stats = ai._incremental[2]
+    edited = pd.concat([sample_data, sample_data.iloc[:10]], ignore_index=True)
+    edited.loc[0, "Safety_Score"] += 1
+    assert_same_analysis(ai.analyze_multimodal_data(edited, use_cache=False), edited)
+    assert ai._incremental[2] is not stats
+
+
+def test_csv_stream_matches_in_memory_analysis(sample_data, tmp_path):
+    path = tmp_path / "sample.csv"
+    sample_data.to_csv(path, index=False)
+    progress = []
+    streamed = EnhancedHealthcareAI().analyze_csv_stream(
+        path, chunk_rows=37, preview_rows=5, progress_callback=lambda done, total, rows: progress.append(rows)
+    )
+    in_memory = EnhancedHealthcareAI().analyze_multimodal_data(pd.read_csv(path))
+
+    assert streamed["streamed"] and streamed["chunks"] == -(-len(sample_data) // 37)
+    assert streamed["summary"] == in_memory["summary"]
+    assert streamed["insights"] == in_memory["insights"]
+    pd.testing.assert_frame_equal(pd.DataFrame(streamed["correlations"]), pd.DataFrame(in_memory["correlations"]),
+                                  atol=1e-9)
+    pd.testing.assert_frame_equal(pd.DataFrame(streamed["patterns"]["department_analysis"]),
+                                  pd.DataFrame(in_memory["patterns"]["department_analysis"]), atol=0.011)
+    assert len(streamed["sample"]) == 5 and progress[-1] == len(sample_data)
+
+
+def test_csv_stream_coerces_stray_text_and_rejects_empty_files():
+    text = "Department,a,b\nICU,1,2\nER,2,4\nICU,n/a,6\nER,4,8\n"
+    streamed = EnhancedHealthcareAI().analyze_csv_stream(BytesIO(text.encode()), chunk_rows=2)
+    assert streamed["summary"]["missing_data"] == {"Department": 0, "a": 1, "b": 0}
+    assert streamed["correlations"]["a"]["b"] == pytest.approx(1.0)
+
+    empty = EnhancedHealthcareAI().analyze_csv_stream(BytesIO(b"a,b\n"))
+    assert "CSV file has no data rows" in empty["error"]